@@ -0,0 +1,255 @@
+# auditoria_cli.py
+"""
+Auditoria em lote, sem Streamlit: lê um ou vários relatórios "Vendas BR"
+(.xlsx), cruza com uma planilha de custos local e grava um relatório de
+auditoria por arquivo. Os arquivos são processados em paralelo, um por
+processo.
+
+Uso:
+    python auditoria_cli.py vendas_jan.xlsx vendas_fev.xlsx --custos custos.xlsx
+    python auditoria_cli.py exports/ --saida relatorios/ --processos 4 --completo
+    python auditoria_cli.py exports/2025-*.xlsx --consolidar   # um relatório só para o ano
+    python auditoria_cli.py vendas.xlsx --regras regras_status.json   # Status com regras próprias
+"""
+import argparse
+import os
+from collections import Counter
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from sku_utils import SkuCostIndex
+from utils.auditoria import (
+    PARAMETROS_PADRAO,
+    abas_extras_auditoria,
+    auditar_arquivo,
+    auditar_vendas,
+    ler_custos_arquivo,
+    preparar_custos,
+)
+from utils.custos import ARQUIVO_CUSTOS
+from utils.exportacao import gerar_pacote_exportacoes, gerar_relatorio_auditoria
+from utils.leitura import MOTORES_LEITURA
+from utils.pipeline import REGRAS_STATUS, consolidar_vendas, ler_varios_relatorios
+from utils.regras import carregar_regras
+
+# Índice de custos do processo (montado uma vez por processo no inicializador)
+_INDICE_CUSTOS = None
+
+
+def listar_relatorios(entradas):
+    """Arquivos e pastas (todos os .xlsx dentro) → lista de caminhos, sem repetidos."""
+    arquivos = []
+    for entrada in entradas:
+        caminho = Path(entrada)
+        if caminho.is_dir():
+            arquivos.extend(sorted(p for p in caminho.glob("*.xlsx") if not p.name.startswith("~$")))
+        else:
+            arquivos.append(caminho)
+    return list(dict.fromkeys(arquivos))
+
+
+def _inicializar_processo(custo_df):
+    global _INDICE_CUSTOS
+    _INDICE_CUSTOS = SkuCostIndex(custo_df) if custo_df is not None and not custo_df.empty else None
+
+
+def nomes_saida(arquivos):
+    """
+    Nome de saída de cada relatório: o nome do arquivo ou, quando dois arquivos
+    têm o mesmo nome (jan/vendas.xlsx e fev/vendas.xlsx), pasta + nome; se ainda
+    repetir, um número no fim. Nenhum relatório sobrescreve o de outro.
+    """
+    caminhos = [Path(a) for a in arquivos]
+    contagem = Counter(c.stem for c in caminhos)
+    candidatos = []
+    for c in caminhos:
+        pasta = c.resolve().parent.name
+        candidatos.append(f"{pasta}_{c.stem}" if contagem[c.stem] > 1 and pasta else c.stem)
+    repetidos = Counter(candidatos)
+    nomes, usados = [], set()
+    for candidato in candidatos:
+        nome, numero = candidato, 0
+        while nome in usados or (repetidos[candidato] > 1 and numero == 0):
+            numero += 1
+            nome = f"{candidato}_{numero}"
+        usados.add(nome)
+        nomes.append(nome)
+    return nomes
+
+
+def gravar_relatorio(resultado, pasta_saida, nome, completo=False):
+    """Grava o relatório de auditoria (ou o pacote completo) e devolve o caminho."""
+    pasta_saida = Path(pasta_saida)
+    pasta_saida.mkdir(parents=True, exist_ok=True)
+    if completo:
+        destino = pasta_saida / f"Auditoria_ML_Completo_{nome}.xlsx"
+        abas_extras = abas_extras_auditoria(
+            resultado["df"], resultado["tipo_counts"], resultado["vendas_afetadas"]
+        )
+        destino.write_bytes(gerar_pacote_exportacoes(resultado["df_relatorio"], abas_extras, formato="xlsx"))
+    else:
+        destino = pasta_saida / f"Auditoria_ML_{nome}.xlsx"
+        gerar_relatorio_auditoria(resultado["df_relatorio"], destino=str(destino))
+    return destino
+
+
+def auditar_para_arquivo(caminho, pasta_saida, parametros, motor="auto", completo=False, nome=None):
+    """
+    Audita um relatório e grava o xlsx (como `nome`, ou o nome do arquivo);
+    devolve só o resumo (não o DataFrame) para o processo principal.
+    """
+    inicio = time.perf_counter()
+    caminho = Path(caminho)
+    try:
+        resultado = auditar_arquivo(caminho, indice_custos=_INDICE_CUSTOS, motor=motor, **parametros)
+
+        destino = gravar_relatorio(resultado, pasta_saida, nome or caminho.stem, completo)
+        return {
+            "arquivo": str(caminho),
+            "saida": str(destino),
+            "linhas": len(resultado["df"]),
+            "metricas": resultado["metricas"],
+            "periodo": resultado["periodo"],
+            "avisos": resultado["avisos"],
+            "custo_carregado": resultado["custo_carregado"],
+            "segundos": time.perf_counter() - inicio,
+            "erro": None,
+        }
+    except Exception as e:
+        return {"arquivo": str(caminho), "erro": f"{type(e).__name__}: {e}", "segundos": time.perf_counter() - inicio}
+
+
+def auditar_lote(arquivos, custo_df, pasta_saida, parametros, processos=None, motor="auto", completo=False):
+    """
+    Audita vários relatórios em paralelo (um processo por arquivo, até `processos`).
+    Gera os resumos na ordem em que terminam. Com processos=1 roda tudo no próprio processo.
+    """
+    custo_df = preparar_custos(custo_df) if custo_df is not None else None
+    processos = max(1, min(processos or os.cpu_count() or 1, len(arquivos)))
+    nomes = nomes_saida(arquivos)
+
+    if processos == 1:
+        _inicializar_processo(custo_df)
+        for arquivo, nome in zip(arquivos, nomes):
+            yield auditar_para_arquivo(arquivo, pasta_saida, parametros, motor, completo, nome)
+        return
+
+    with ProcessPoolExecutor(processos, initializer=_inicializar_processo, initargs=(custo_df,)) as executor:
+        futuros = [
+            executor.submit(auditar_para_arquivo, arquivo, pasta_saida, parametros, motor, completo, nome)
+            for arquivo, nome in zip(arquivos, nomes)
+        ]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+
+
+def auditar_consolidado(arquivos, custo_df, pasta_saida, parametros, processos=None, motor="auto", completo=False):
+    """
+    Vários relatórios (ex: os 12 meses) num só: leitura em paralelo, vendas
+    repetidas descartadas e pacotes/custos calculados uma vez sobre o conjunto.
+    """
+    inicio = time.perf_counter()
+    relatorios = ler_varios_relatorios([Path(a).read_bytes() for a in arquivos], processos, motor)
+    df, coluna_unidades, info = consolidar_vendas(relatorios)
+
+    custo_df = preparar_custos(custo_df) if custo_df is not None else None
+    indice = SkuCostIndex(custo_df) if custo_df is not None and not custo_df.empty else None
+    resultado = auditar_vendas(df, coluna_unidades, indice, **parametros)
+    destino = gravar_relatorio(resultado, pasta_saida, "Consolidado", completo)
+
+    return {
+        "arquivo": f"{info['arquivos']} relatórios ({info['linhas_repetidas']} linhas repetidas descartadas)",
+        "saida": str(destino),
+        "linhas": len(resultado["df"]),
+        "metricas": resultado["metricas"],
+        "periodo": resultado["periodo"],
+        "avisos": resultado["avisos"],
+        "custo_carregado": resultado["custo_carregado"],
+        "segundos": time.perf_counter() - inicio,
+        "erro": None,
+    }
+
+
+def formatar_brl(valor):
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def imprimir_resumo(resumo):
+    if resumo["erro"]:
+        print(f"❌ {resumo['arquivo']}: {resumo['erro']}", file=sys.stderr)
+        return
+    m = resumo["metricas"]
+    print(
+        f"✅ {resumo['arquivo']} → {resumo['saida']} ({resumo['linhas']} linhas, {resumo['segundos']:.1f}s): "
+        f"{m['total_vendas']} vendas, {m['fora_margem']} fora da margem, "
+        f"lucro R$ {formatar_brl(m['lucro_total'])}, prejuízo R$ {formatar_brl(m['prejuizo_total'])}"
+    )
+    if not resumo["custo_carregado"]:
+        print("   ⚠️ sem custos de produto (lucro sem custo de mercadoria)")
+    for aviso in resumo["avisos"]:
+        print(f"   ⚠️ {aviso}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("relatorios", nargs="+", help="arquivos .xlsx do ML ou pastas com eles")
+    parser.add_argument("--custos", default=str(ARQUIVO_CUSTOS),
+                        help=f"planilha de custos (.xlsx/.csv); padrão: {ARQUIVO_CUSTOS}")
+    parser.add_argument("--sem-custos", action="store_true", help="audita sem custo de produto")
+    parser.add_argument("--saida", default="relatorios", help="pasta dos relatórios gerados")
+    parser.add_argument("--processos", type=int, default=None, help="processos em paralelo (padrão: núcleos da CPU)")
+    parser.add_argument("--motor", choices=["auto", *MOTORES_LEITURA], default="auto")
+    parser.add_argument("--consolidar", action="store_true",
+                        help="junta todos os relatórios num só (vendas repetidas descartadas)")
+    parser.add_argument("--completo", action="store_true",
+                        help="inclui as abas Auditoria_Completa, Tipos_Anuncio e Fora_da_Margem")
+    parser.add_argument("--margem-limite", type=float, default=PARAMETROS_PADRAO["margem_limite"])
+    parser.add_argument("--custo-embalagem", type=float, default=PARAMETROS_PADRAO["custo_embalagem"])
+    parser.add_argument("--custo-fiscal", type=float, default=PARAMETROS_PADRAO["custo_fiscal"])
+    parser.add_argument("--tolerancia", type=float, default=PARAMETROS_PADRAO["tolerancia"])
+    parser.add_argument("--regras", help="JSON com a tabela de regras do Status (formato em utils/regras.py)")
+    args = parser.parse_args(argv)
+
+    arquivos = listar_relatorios(args.relatorios)
+    if not arquivos:
+        parser.error("nenhum relatório .xlsx encontrado")
+
+    custo_df = None
+    if not args.sem_custos:
+        if not Path(args.custos).exists():
+            parser.error(f"planilha de custos não encontrada: {args.custos} (use --sem-custos para auditar sem ela)")
+        custo_df = ler_custos_arquivo(args.custos)
+
+    parametros = {
+        "margem_limite": args.margem_limite,
+        "custo_embalagem": args.custo_embalagem,
+        "custo_fiscal": args.custo_fiscal,
+        "tolerancia": args.tolerancia,
+    }
+    if args.regras:
+        if not Path(args.regras).exists():
+            parser.error(f"arquivo de regras não encontrado: {args.regras}")
+        try:
+            parametros["regras"] = carregar_regras(args.regras, REGRAS_STATUS)
+        except ValueError as e:
+            parser.error(f"regras inválidas em {args.regras}: {e}")
+
+    if args.consolidar:
+        resumo = auditar_consolidado(arquivos, custo_df, args.saida, parametros, args.processos, args.motor, args.completo)
+        imprimir_resumo(resumo)
+        return 0
+
+    inicio = time.perf_counter()
+    falhas = 0
+    for resumo in auditar_lote(arquivos, custo_df, args.saida, parametros, args.processos, args.motor, args.completo):
+        imprimir_resumo(resumo)
+        falhas += bool(resumo["erro"])
+
+    print(f"{len(arquivos) - falhas}/{len(arquivos)} relatório(s) em {time.perf_counter() - inicio:.1f}s")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
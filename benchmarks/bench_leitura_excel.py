@@ -0,0 +1,65 @@
+# benchmarks/bench_leitura_excel.py
+"""
+Compara tempo de leitura e pico de memória (RSS) dos motores de leitura da
+aba "Vendas BR" em exportações sintéticas do ML.
+
+Uso:
+    python benchmarks/bench_leitura_excel.py                 # 10k, 100k e 500k linhas
+    python benchmarks/bench_leitura_excel.py --linhas 10000 --motores openpyxl pandas
+"""
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gerador_relatorio_ml import gerar_export_ml
+from utils.leitura import MOTORES_LEITURA, calamine_disponivel
+from utils.pipeline import ler_planilha_vendas
+
+
+def _medir_no_processo(motor, caminho):
+    import resource
+
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    df = ler_planilha_vendas(caminho, motor=motor)
+    tempo = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    return tempo, pico / 1024, df.shape
+
+
+def medir(motor, caminho):
+    """Mede em um processo novo, para o pico de memória (RSS) não vir de medições anteriores."""
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(1) as pool:
+        return pool.apply(_medir_no_processo, (motor, str(caminho)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--motores", nargs="+", default=list(MOTORES_LEITURA))
+    args = parser.parse_args()
+
+    motores = [m for m in args.motores if m != "calamine" or calamine_disponivel()]
+    if len(motores) < len(args.motores):
+        print("ℹ️ python-calamine não instalado — motor calamine ignorado.")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for linhas in args.linhas:
+            caminho = Path(pasta) / f"vendas_{linhas}.xlsx"
+            gerar_export_ml(caminho, linhas)
+            tamanho = caminho.stat().st_size / 1024 ** 2
+            print(f"\n📄 {linhas:,} linhas ({tamanho:.1f} MB)")
+            print(f"{'motor':<10} {'tempo (s)':>10} {'pico (MB)':>10}  formato")
+            for motor in motores:
+                tempo, pico, formato = medir(motor, caminho)
+                print(f"{motor:<10} {tempo:>10.2f} {pico:>10.1f}  {formato}")
+
+
+if __name__ == "__main__":
+    main()
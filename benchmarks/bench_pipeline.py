@@ -0,0 +1,165 @@
+# benchmarks/bench_pipeline.py
+"""
+Tempo e memória de cada etapa da auditoria em relatórios sintéticos de
+vários tamanhos (gerados por gerador_relatorio_ml.py).
+
+Cada tamanho roda num processo novo; por etapa são medidos o tempo (melhor
+de N repetições) e o quanto o pico de memória (RSS) subiu. Os resultados
+podem ser gravados em JSON e comparados com uma execução anterior, para
+ver se uma mudança deixou alguma etapa mais rápida ou mais lenta.
+
+As etapas com Excel (leitura e exportação) só rodam até --max-excel linhas:
+gerar e ler um .xlsx de 1M de linhas leva minutos. Acima disso o relatório
+é montado direto em memória.
+
+Uso:
+    python benchmarks/bench_pipeline.py                          # 1k, 10k, 100k e 1M linhas
+    python benchmarks/bench_pipeline.py --linhas 10000 --repeticoes 3 --saida base.json
+    python benchmarks/bench_pipeline.py --linhas 10000 --comparar base.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gerador_relatorio_ml import gerar_export_ml, gerar_vendas_df
+from sku_utils import SkuCostIndex, aplicar_custos
+from utils.auditoria import corrigir_margens_pacotes, preparar_custos
+from utils.exportacao import gerar_relatorio_auditoria
+from utils.pipeline import (
+    calcular_metricas,
+    calcular_resultados,
+    ler_planilha_vendas,
+    normalizar_vendas,
+    processar_vendas,
+)
+
+ETAPAS = [
+    "leitura", "normalizacao", "processamento", "indice_custos", "custos",
+    "resultados", "metricas", "relatorio", "exportacao",
+]
+CONFIG = {"margem_limite": 30, "custo_embalagem": 3.0, "custo_fiscal": 10.0}
+
+
+def _rss_pico_mb():
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _executar_etapas(linhas, pasta, com_excel):
+    """Roda o pipeline uma vez e devolve {etapa: (segundos, aumento do pico de RSS em MB)}."""
+    medidas = {}
+
+    def medir(etapa, funcao, *args):
+        pico = _rss_pico_mb()
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        medidas[etapa] = (time.perf_counter() - inicio, _rss_pico_mb() - pico)
+        return resultado
+
+    if com_excel:
+        caminho = Path(pasta) / f"vendas_{linhas}.xlsx"
+        if not caminho.exists():
+            gerar_export_ml(caminho, linhas).to_pickle(caminho.with_suffix(".custos.pkl"))
+        import pandas as pd
+
+        df_custos = pd.read_pickle(caminho.with_suffix(".custos.pkl"))
+        df = medir("leitura", ler_planilha_vendas, caminho)
+    else:
+        df, df_custos = gerar_vendas_df(linhas)
+
+    df, coluna_unidades = medir("normalizacao", normalizar_vendas, df)
+    df, _ = medir("processamento", processar_vendas, df, coluna_unidades, CONFIG["custo_embalagem"])
+    indice = medir("indice_custos", SkuCostIndex, preparar_custos(df_custos))
+    df = medir("custos", aplicar_custos, df, None, coluna_unidades, indice)
+    df = medir("resultados", calcular_resultados, df, CONFIG["margem_limite"], CONFIG["custo_fiscal"], True)
+    medir("metricas", calcular_metricas, df, True)
+    df_relatorio = medir("relatorio", corrigir_margens_pacotes, df)
+    if com_excel:
+        medir("exportacao", lambda d: gerar_relatorio_auditoria(d, destino=str(Path(pasta) / "auditoria.xlsx")), df_relatorio)
+    return medidas
+
+
+def _medir_tamanho(linhas, repeticoes, pasta, com_excel):
+    melhores = {}
+    for _ in range(repeticoes):
+        for etapa, (tempo, memoria) in _executar_etapas(linhas, pasta, com_excel).items():
+            anterior = melhores.get(etapa)
+            # Tempo: melhor repetição. Memória: o pico só sobe na primeira, então guarda o maior aumento
+            melhores[etapa] = (
+                tempo if anterior is None else min(anterior[0], tempo),
+                memoria if anterior is None else max(anterior[1], memoria),
+            )
+    return {"linhas": linhas, "pico_total_mb": _rss_pico_mb(), "etapas": melhores}
+
+
+def medir_tamanho(linhas, repeticoes, pasta, com_excel):
+    """Mede em um processo novo, para a memória de um tamanho não contaminar o próximo."""
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(1) as pool:
+        return pool.apply(_medir_tamanho, (linhas, repeticoes, str(pasta), com_excel))
+
+
+def imprimir(resultado, anterior=None):
+    print(f"\n📄 {resultado['linhas']:,} linhas (pico total {resultado['pico_total_mb']:.0f} MB)")
+    cabecalho = f"{'etapa':<15} {'tempo (s)':>10} {'+pico (MB)':>11}"
+    print(cabecalho + ("  vs anterior" if anterior else ""))
+    total = 0.0
+    for etapa in ETAPAS:
+        if etapa not in resultado["etapas"]:
+            continue
+        tempo, memoria = resultado["etapas"][etapa]
+        total += tempo
+        linha = f"{etapa:<15} {tempo:>10.3f} {memoria:>11.1f}"
+        if anterior and etapa in anterior["etapas"]:
+            tempo_antes = anterior["etapas"][etapa][0]
+            if tempo_antes > 0:
+                linha += f"  {tempo / tempo_antes:>6.2f}x ({tempo_antes:.3f}s)"
+        print(linha)
+    print(f"{'total':<15} {total:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--max-excel", type=int, default=100_000,
+                        help="maior tamanho em que leitura/exportação de .xlsx são medidas")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar os tempos")
+    args = parser.parse_args()
+
+    anteriores = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anteriores = {r["linhas"]: r for r in json.load(f)["resultados"]}
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for linhas in args.linhas:
+            resultado = medir_tamanho(linhas, args.repeticoes, pasta, linhas <= args.max_excel)
+            imprimir(resultado, anteriores.get(linhas))
+            resultados.append(resultado)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "maquina": platform.machine(),
+                "repeticoes": args.repeticoes,
+                "resultados": resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
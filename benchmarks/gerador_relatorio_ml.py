@@ -0,0 +1,185 @@
+# benchmarks/gerador_relatorio_ml.py
+"""
+Relatórios "Vendas BR" sintéticos (e a planilha de custos correspondente)
+para benchmarks e conferências, no layout exportado pelo Mercado Livre:
+cabeçalho na linha 6, pacotes "Pacote de N produtos" seguidos dos N itens,
+mistura de Clássico/Premium, SKUs compostos (CX) e com hífen, cancelamentos.
+
+Uso:
+    python benchmarks/gerador_relatorio_ml.py --linhas 10000 --saida vendas.xlsx --custos custos.xlsx
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+import xlsxwriter
+
+from utils.pipeline import COL_MAP
+from utils.tarifas import calcular_percentual, calcular_tarifa_fixa_unit
+
+# Colunas que existem no relatório do ML mas não entram na auditoria
+COLUNAS_EXTRAS = [
+    "Descrição do status", "Pacote de diversos produtos", "Pertence a um kit",
+    "Receita por acréscimo no preço (pago pelo comprador)", "Taxa de parcelamento equivalente ao acréscimo",
+    "Variação", "Faturamento ao comprador", "Comprador", "Negócio", "CPF", "Endereço", "Cidade",
+    "Estado.1", "CEP", "País", "Forma de entrega", "Data a caminho", "Data entrega", "Motorista",
+    "Número de rastreamento", "URL de acompanhamento", "Reclamação aberta", "Mediação",
+]
+
+CABECALHO = list(COL_MAP) + ["Unidades", "Receita por envio (BRL)"] + COLUNAS_EXTRAS
+
+MESES = ["janeiro", "fevereiro", "março", "abril", "maio", "junho",
+         "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"]
+
+# Proporções aproximadas de um relatório real
+PROPORCAO_PACOTES = 0.08
+PROPORCAO_CANCELAMENTOS = 0.05
+PROPORCAO_PREMIUM = 0.35
+PROPORCAO_TARIFA_DIVERGENTE = 0.02  # pacotes em que o ML cobra diferente da soma dos itens
+
+
+def gerar_catalogo(produtos=800, semente=42):
+    """
+    Catálogo de SKUs vendidos e a planilha de custos correspondente.
+
+    - SKUs simples ("3990") com custo na planilha;
+    - compostos CX ("3990C2"), resolvidos pelo custo do SKU base × 2;
+    - kits com hífen ("3888-3937"), resolvidos pela soma dos componentes;
+    - alguns SKUs sem custo cadastrado (custo 0 na auditoria).
+    Retorna (lista de (sku, título, preço, tipo, anúncio), DataFrame de custos).
+    """
+    rnd = random.Random(semente)
+    bases = rnd.sample(range(1000, 9999), produtos)
+    custos = {str(b): round(rnd.uniform(3, 250), 2) for b in bases}
+
+    catalogo = []
+    for i, base in enumerate(bases):
+        sku = str(base)
+        sorteio = rnd.random()
+        if sorteio < 0.10:
+            sku = f"{base}C{rnd.randint(2, 12)}"
+        elif sorteio < 0.18:
+            sku = f"{base}-{rnd.choice(bases)}"
+        elif sorteio < 0.21:
+            sku = str(rnd.randint(10000, 99999))  # sem custo cadastrado
+        custo_ref = custos.get(str(base), 20.0)
+        preco = round(max(custo_ref * rnd.uniform(1.3, 3.0), 6.0), 2)
+        tipo = "Premium" if rnd.random() < PROPORCAO_PREMIUM else "Clássico"
+        titulo = f"Produto {i + 1} - {rnd.choice(['Kit', 'Peça', 'Acessório', 'Conjunto'])}"
+        catalogo.append((sku, titulo, preco, tipo, f"MLB{rnd.randint(10**9, 10**10)}"))
+
+    df_custos = pd.DataFrame({
+        "SKU": list(custos),
+        "Produto": [f"Produto base {sku}" for sku in custos],
+        "Custo_Produto": list(custos.values()),
+    })
+    return catalogo, df_custos
+
+
+def _item(rnd, catalogo):
+    sku, titulo, preco, tipo, anuncio = rnd.choice(catalogo)
+    unidades = rnd.choice([1, 1, 1, 1, 2, 2, 3])
+    valor = round(preco * unidades, 2)
+    tarifa = round(valor * calcular_percentual(tipo) + calcular_tarifa_fixa_unit(preco) * unidades, 2)
+    return sku, titulo, preco, tipo, anuncio, unidades, valor, tarifa
+
+
+def linhas_relatorio(linhas, catalogo, semente=42, ano=2025):
+    """Gera as linhas (listas na ordem de CABECALHO) de um relatório com `linhas` linhas."""
+    rnd = random.Random(semente)
+    venda = 2000009741628937
+    geradas = 0
+    while geradas < linhas:
+        venda += rnd.randint(1, 50)
+        data = (
+            f"{rnd.randint(1, 28)} de {rnd.choice(MESES)} de {ano} "
+            f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d} hs."
+        )
+        extras = [f"x{rnd.randint(0, 99)}" for _ in COLUNAS_EXTRAS]
+        frete = round(rnd.uniform(0, 30), 2) if rnd.random() < 0.7 else 0.0
+        receita_envio = round(rnd.uniform(0, 20), 2) if rnd.random() < 0.2 else 0.0
+
+        qtd_pacote = rnd.choice([2, 2, 3, 4]) if rnd.random() < PROPORCAO_PACOTES else 0
+        if qtd_pacote and geradas + qtd_pacote + 1 <= linhas:
+            itens = [_item(rnd, catalogo) for _ in range(qtd_pacote)]
+            valor = round(sum(i[6] for i in itens), 2)
+            tarifa = round(sum(i[7] for i in itens), 2)
+            if rnd.random() < PROPORCAO_TARIFA_DIVERGENTE:
+                tarifa = round(tarifa * rnd.uniform(1.05, 1.3), 2)
+            yield [
+                f"#{venda}", data, f"Pacote de {qtd_pacote} produtos", valor,
+                round(valor - tarifa - frete + receita_envio, 2), -tarifa, -frete, 0,
+                "", "", "", "", "", "-", receita_envio,
+            ] + extras
+            for k, (sku, titulo, preco, tipo, anuncio, unidades, valor_item, _) in enumerate(itens, start=1):
+                yield [
+                    f"#{venda + k}", data, "Entregue", valor_item, "", "", "", "",
+                    preco, sku, anuncio, titulo, tipo, unidades, "",
+                ] + extras
+            venda += qtd_pacote
+            geradas += qtd_pacote + 1
+            continue
+
+        sku, titulo, preco, tipo, anuncio, unidades, valor, tarifa = _item(rnd, catalogo)
+        if rnd.random() < PROPORCAO_CANCELAMENTOS:
+            # Cancelamento correto: o reembolso zera o total recebido
+            estado = "Cancelada pelo comprador"
+            total, cancelamento = 0, -round(valor - tarifa - frete, 2)
+        else:
+            estado = rnd.choice(["Entregue", "Entregue", "Entregue", "A caminho"])
+            total, cancelamento = round(valor - tarifa - frete + receita_envio, 2), 0
+        yield [
+            f"#{venda}", data, estado, valor, total, -tarifa, -frete, cancelamento,
+            preco, sku, anuncio, titulo, tipo, unidades, receita_envio,
+        ] + extras
+        geradas += 1
+
+
+def gerar_vendas_df(linhas, semente=42, produtos=800):
+    """Relatório em memória, como sai de ler_planilha_vendas(colunas=None), + custos."""
+    catalogo, df_custos = gerar_catalogo(produtos, semente)
+    df = pd.DataFrame(list(linhas_relatorio(linhas, catalogo, semente)), columns=CABECALHO)
+    # Células vazias do Excel chegam como NaN
+    for col in df.columns[df.dtypes == object]:
+        vazias = df[col].eq("")
+        if vazias.any():
+            df[col] = df[col].mask(vazias).infer_objects()
+    return df, df_custos
+
+
+def gerar_export_ml(caminho, linhas, semente=42, produtos=800):
+    """Grava o .xlsx no layout do relatório "Vendas BR" (cabeçalho na linha 6). Retorna os custos."""
+    catalogo, df_custos = gerar_catalogo(produtos, semente)
+
+    wb = xlsxwriter.Workbook(str(caminho), {"constant_memory": True})
+    ws = wb.add_worksheet("Vendas BR")
+    ws.write(0, 0, "Relatório de vendas")
+    ws.write(2, 0, "Período: últimos 30 dias")
+    ws.write_row(5, 0, CABECALHO)
+    # Textos vazios viram células em branco (como no relatório do ML)
+    for linha, valores in enumerate(linhas_relatorio(linhas, catalogo, semente), start=6):
+        ws.write_row(linha, 0, valores)
+    wb.close()
+    return df_custos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=10_000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--produtos", type=int, default=800)
+    parser.add_argument("--saida", default="vendas_sinteticas.xlsx")
+    parser.add_argument("--custos", default="custos_sinteticos.xlsx")
+    args = parser.parse_args()
+
+    df_custos = gerar_export_ml(args.saida, args.linhas, args.semente, args.produtos)
+    df_custos.to_excel(args.custos, index=False)
+    print(f"📄 {args.saida}: {args.linhas:,} linhas | 💰 {args.custos}: {len(df_custos)} SKUs")
+
+
+if __name__ == "__main__":
+    main()
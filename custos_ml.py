@@ -1,18 +1,15 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime
+from utils.custos_google import aplicar_escrita, planejar_escrita
+from utils.google_sheets import obter_cliente_sheets
 
 st.set_page_config(page_title="📦 Custos ML", layout="wide")
 st.title("💰 Gerenciador de Custos Mercado Livre")
 
 # === AUTENTICAÇÃO GOOGLE SHEETS ===
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-
-# ✅ Usa as credenciais armazenadas em SECRETS do Streamlit Cloud
-creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scope)
-client = gspread.authorize(creds)
+# ✅ Usa as credenciais armazenadas em SECRETS do Streamlit Cloud (cliente compartilhado com a auditoria)
+client = obter_cliente_sheets()
 
 # === ABRIR PLANILHA ===
 SHEET_NAME = "CUSTOS_ML"  # nome exato da planilha no Google Sheets
@@ -28,6 +25,9 @@ edit_df = st.data_editor(df, use_container_width=True, num_rows="dynamic")
 
 # === BOTÃO SALVAR ===
 if st.button("💾 Salvar alterações"):
-    sheet.clear()
-    sheet.update([edit_df.columns.values.tolist()] + edit_df.values.tolist())
-    st.success(f"Alterações salvas com sucesso em {datetime.now().strftime('%d/%m/%Y %H:%M')}!")
+    # Só as linhas alteradas/incluídas/removidas (sem limpar a planilha antes)
+    resumo = aplicar_escrita(sheet, planejar_escrita(df, edit_df))
+    st.success(
+        f"Alterações salvas com sucesso em {datetime.now().strftime('%d/%m/%Y %H:%M')}! "
+        f"({resumo['atualizadas']} alteradas, {resumo['adicionadas']} novas, {resumo['removidas']} removidas)"
+    )
@@ -1,7 +1,222 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 import re
 
-def aplicar_custos(df, df_custos, coluna_unidades):
+from utils.numeros import arredondar
+
+# Ex: 3990C2 → (base=3990, multiplicador=2). Só válido se final for C2..C12
+PADRAO_COMPOSTO_CX = re.compile(r"^(\d+)[Cc]([2-9]|1[0-2])$")
+
+# Classes de resolução de SKU (uma por SKU único)
+SKU_DESCONHECIDO = 0
+SKU_DIRETO = 1
+SKU_COMPOSTO_CX = 2
+SKU_PACOTE = 3
+
+COLUNAS_CUSTO = ["Custo_Produto_Unitario", "Custo_Produto_Total"]
+
+
+def detectar_composto_cX(sku):
+    """
+    Ex: 3990C2 → (base=3990, multiplicador=2)
+    Só válido se final for C2..C12
+    """
+    sku = sku.upper().strip()
+    match = PADRAO_COMPOSTO_CX.match(sku)
+    if match:
+        base = match.group(1)
+        mult = int(match.group(2))
+        return base, mult
+    return None
+
+
+def classificar_sku(sku, custos_map):
+    """
+    Resolve um SKU uma única vez e devolve (classe, valor):
+    - SKU_DIRETO      → valor = custo unitário da planilha
+    - SKU_COMPOSTO_CX → valor = custo base × multiplicador (arredondado)
+    - SKU_PACOTE      → valor = soma dos componentes (sem arredondar)
+    - SKU_DESCONHECIDO → valor = 0.0
+    """
+    # === CASO 2 — SKU está na planilha → usa esse SKU direto ===
+    if sku in custos_map:
+        return SKU_DIRETO, float(custos_map[sku])
+
+    # === CASO 3 — SKU COMPOSTO REAL (C2..C12) ===
+    composto = detectar_composto_cX(sku)
+    if composto:
+        base, mult = composto
+        if base in custos_map:
+            return SKU_COMPOSTO_CX, round(float(custos_map[base]) * mult, 2)
+
+    # === CASO 4 — SKU com hífen → pacote filho OU composição do ML ===
+    if "-" in sku:
+        partes = [p.strip() for p in sku.split("-") if p.strip()]
+
+        custo_total = 0
+        for p in partes:
+            # composto dentro de hífen (caso raro)
+            comp = detectar_composto_cX(p)
+            if comp:
+                base, mult = comp
+                if base in custos_map:
+                    custo_total += float(custos_map[base]) * mult
+                    continue
+
+            if p in custos_map:
+                custo_total += float(custos_map[p])
+
+        return SKU_PACOTE, custo_total
+
+    # === CASO 5 — SKU totalmente desconhecido ===
+    return SKU_DESCONHECIDO, 0.0
+
+
+def componentes_sku(sku):
+    """
+    SKUs da planilha que a classificação de `sku` pode consultar: ele mesmo,
+    a base CX e, com hífen, cada parte (e a base CX da parte).
+    """
+    chaves = {sku}
+    composto = detectar_composto_cX(sku)
+    if composto:
+        chaves.add(composto[0])
+    if "-" in sku:
+        for p in sku.split("-"):
+            p = p.strip()
+            if p:
+                chaves.add(p)
+                comp = detectar_composto_cX(p)
+                if comp:
+                    chaves.add(comp[0])
+    return chaves
+
+
+def normalizar_tabela_custos(df_custos):
+    """Mantém só SKU/Custo_Produto com o SKU em texto (hífen preservado)."""
+    df_custos = df_custos[["SKU", "Custo_Produto"]].copy()
+    df_custos["SKU"] = df_custos["SKU"].astype(str).str.strip()
+    return df_custos
+
+
+def versao_custos(df_custos):
+    """Hash estável da planilha de custos (muda só quando SKU/custo mudam)."""
+    tabela = normalizar_tabela_custos(df_custos)
+    hashes = pd.util.hash_pandas_object(tabela, index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+def skus_alterados(custos_antes, custos_depois):
+    """SKUs cujo custo mudou entre duas versões da planilha (incluídos e removidos também)."""
+    antes = normalizar_tabela_custos(custos_antes).drop_duplicates("SKU", keep="last").set_index("SKU")["Custo_Produto"]
+    depois = normalizar_tabela_custos(custos_depois).drop_duplicates("SKU", keep="last").set_index("SKU")["Custo_Produto"]
+    # SKU incluído ou removido muda a classificação mesmo com custo vazio
+    alterados = set(antes.index.symmetric_difference(depois.index))
+    comuns = antes.index.intersection(depois.index)
+    antes, depois = antes[comuns], depois[comuns]
+    diferentes = (antes != depois) & ~(antes.isna() & depois.isna())
+    return alterados | set(comuns[diferentes.to_numpy()])
+
+
+class SkuCostIndex:
+    """
+    Índice de custos construído uma vez por versão da planilha de custos.
+
+    - SKUs base da planilha ficam pré-resolvidos numa tabela (custo float).
+    - SKUs compostos (CX e pacotes com hífen) são resolvidos sob demanda e
+      guardados num LRU limitado, para não expandir "3888-3937" a cada venda.
+    - acertos/falhas contam quantas resoluções vieram do índice ou precisaram
+      ser calculadas.
+    """
+
+    def __init__(self, df_custos, tamanho_cache=4096):
+        tabela = normalizar_tabela_custos(df_custos)
+        self.versao = versao_custos(df_custos)
+        self.custos_map = dict(zip(tabela["SKU"], tabela["Custo_Produto"]))
+        self.tamanho_cache = tamanho_cache
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        self._compostos = OrderedDict()
+
+        # Pré-resolve os SKUs base. Custos inválidos ficam de fora e são
+        # resolvidos sob demanda (mantendo o mesmo erro da regra original).
+        self._diretos = {}
+        for sku, custo in self.custos_map.items():
+            try:
+                self._diretos[sku] = (SKU_DIRETO, float(custo))
+            except (TypeError, ValueError):
+                pass
+
+    def resolver(self, sku):
+        """Retorna (classe, valor) do SKU, usando a tabela ou o LRU."""
+        direto = self._diretos.get(sku)
+        if direto is not None:
+            with self._lock:
+                self.acertos += 1
+            return direto
+
+        with self._lock:
+            resolvido = self._compostos.get(sku)
+            if resolvido is not None:
+                self._compostos.move_to_end(sku)
+                self.acertos += 1
+                return resolvido
+
+        resolvido = classificar_sku(sku, self.custos_map)
+
+        with self._lock:
+            self.falhas += 1
+            self._compostos[sku] = resolvido
+            if len(self._compostos) > self.tamanho_cache:
+                self._compostos.popitem(last=False)
+        return resolvido
+
+    def estatisticas(self):
+        """Resumo de uso do índice (para exibição/diagnóstico)."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "versao": self.versao[:8],
+                "skus_base": len(self._diretos),
+                "compostos_em_cache": len(self._compostos),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto_%": round(self.acertos / total * 100, 2) if total else 0.0,
+            }
+
+
+def skus_por_linha(df):
+    """
+    SKU de cada linha (texto sem espaços nas bordas) como (códigos, SKUs distintos).
+    Coluna categórica usa as categorias direto; vazio vira "nan", como no astype(str).
+    """
+    if "SKU" not in df.columns:
+        return np.zeros(len(df), dtype=np.intp), np.array([""], dtype=object)
+    serie = df["SKU"]
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Só as categorias presentes; código -1 (vazio) cai no "nan" do fim
+        categorias = np.append(serie.cat.categories.astype(str).str.strip().to_numpy(dtype=object), "nan")
+        codigos, presentes = pd.factorize(serie.cat.codes.to_numpy(), sort=False)
+        return codigos, categorias[presentes]
+    codigos, unicos = pd.factorize(serie.astype(str).str.strip(), sort=False)
+    return codigos, np.asarray(unicos, dtype=object)
+
+
+def linhas_afetadas(df, alterados):
+    """Posições das linhas cujo SKU (ou componente de pacote/CX) está em `alterados`."""
+    if not alterados:
+        return np.empty(0, dtype=np.intp)
+    codigos, unicos = skus_por_linha(df)
+    afetados = np.fromiter((not alterados.isdisjoint(componentes_sku(sku)) for sku in unicos), dtype=bool, count=len(unicos))
+    return np.flatnonzero(afetados[codigos])
+
+
+def aplicar_custos(df, df_custos, coluna_unidades, indice=None, linhas=None):
     """
     Regras implementadas:
     ✔ Se SKU existir exatamente no df_custos → usa esse SKU direto.
@@ -9,97 +224,70 @@ def aplicar_custos(df, df_custos, coluna_unidades):
     ✔ Se SKU tiver hífen e NÃO existir no df_custos → explode (é pacote do ML).
     ✔ Pacote 'mãe' (Agrupado - Pacotes) nunca recebe custo.
     ✔ Itens filhos usam custo normal por SKU simples.
+
+    Cada SKU distinto é classificado uma única vez; o custo por linha é
+    calculado de forma vetorizada a partir dessa classificação.
+    Se um SkuCostIndex for informado, ele é reaproveitado (e df_custos ignorado).
+    Com `linhas` (posições), só essas linhas são recalculadas e as colunas de
+    custo já existentes no df são atualizadas no lugar.
     """
 
-    # === NORMALIZA DF_CUSTOS (mantém hífen sempre) ===
-    df_custos = df_custos.copy()
-    df_custos["SKU"] = df_custos["SKU"].astype(str).str.strip()
+    if indice is None:
+        indice = SkuCostIndex(df_custos)
 
-    # Dicionário rápido de lookup
-    custos_map = dict(zip(df_custos["SKU"], df_custos["Custo_Produto"]))
-
-    def detectar_composto_cX(sku):
-        """
-        Ex: 3990C2 → (base=3990, multiplicador=2)
-        Só válido se final for C2..C12
-        """
-        sku = sku.upper().strip()
-        match = re.match(r"^(\d+)[Cc]([2-9]|1[0-2])$", sku)
-        if match:
-            base = match.group(1)
-            mult = int(match.group(2))
-            return base, mult
-        return None
-
-    custos_totais = []
-    custos_unitarios = []
-
-    for idx, row in df.iterrows():
-        sku = str(row.get("SKU", "")).strip()
-        tipo = str(row.get("Tipo_Anuncio", "")).lower()
-        unidades = row.get(coluna_unidades, 1)
-
-        # === CASO 1 — Pacote mãe: custo sempre ZERO ===
-        if "agrupado (pacotes" in tipo:
-            custos_unitarios.append(0.0)
-            custos_totais.append(0.0)
-            continue
-
-        # === CASO 2 — SKU está na planilha → usa esse SKU direto ===
-        if sku in custos_map:
-            custo_unit = float(custos_map[sku])
-            custos_unitarios.append(custo_unit)
-            custos_totais.append(round(custo_unit * unidades, 2))
-            continue
-
-        # === CASO 3 — SKU COMPOSTO REAL (C2..C12) ===
-        composto = detectar_composto_cX(sku)
-        if composto:
-            base, mult = composto
-            if base in custos_map:
-                custo_base = float(custos_map[base])
-                custo_unit = round(custo_base * mult, 2)
-                custos_unitarios.append(custo_unit)
-                custos_totais.append(round(custo_unit * unidades, 2))
-                continue
-
-        # === CASO 4 — SKU com hífen → pacote filho OU composição do ML ===
-        if "-" in sku:
-            partes = [p.strip() for p in sku.split("-") if p.strip()]
-
-            # explode cada parte
-            custo_total = 0
-            custo_unit_sku = 0
-
-            for p in partes:
-                # composto dentro de hífen (caso raro)
-                comp = detectar_composto_cX(p)
-                if comp:
-                    base, mult = comp
-                    if base in custos_map:
-                        custo_total += float(custos_map[base]) * mult
-                        continue
-
-                if p in custos_map:
-                    custo_total += float(custos_map[p])
-
-            custo_total = round(custo_total * unidades, 2)
-            custo_unit_sku = round(custo_total / unidades, 2) if unidades else custo_total
-
-            custos_unitarios.append(custo_unit_sku)
-            custos_totais.append(custo_total)
-            continue
-
-        # === CASO 5 — SKU simples normal ===
-        if sku in custos_map:
-            custo_unit = float(custos_map[sku])
-            custos_unitarios.append(custo_unit)
-            custos_totais.append(round(custo_unit * unidades, 2))
-        else:
-            # SKU totalmente desconhecido
-            custos_unitarios.append(0.0)
-            custos_totais.append(0.0)
-
-    df["Custo_Produto_Unitario"] = custos_unitarios
-    df["Custo_Produto_Total"] = custos_totais
+    origem = df
+    if linhas is not None:
+        colunas = [c for c in dict.fromkeys(["SKU", "Tipo_Anuncio", coluna_unidades]) if c in df.columns]
+        origem = df[colunas].iloc[linhas]
+
+    if "Tipo_Anuncio" in origem.columns:
+        tipos = origem["Tipo_Anuncio"].astype(str).str.lower()
+    else:
+        tipos = pd.Series("", index=origem.index)
+
+    if coluna_unidades in origem.columns:
+        unidades = np.asarray(origem[coluna_unidades], dtype=float)
+    else:
+        unidades = np.ones(len(origem))
+
+    # === CLASSIFICA CADA SKU DISTINTO UMA ÚNICA VEZ ===
+    codigos, unicos = skus_por_linha(origem)
+    classes_unicas = np.empty(len(unicos), dtype=np.int8)
+    valores_unicos = np.empty(len(unicos), dtype=float)
+    for k, sku in enumerate(unicos):
+        classes_unicas[k], valores_unicos[k] = indice.resolver(sku)
+
+    classes = classes_unicas[codigos]
+    valores = valores_unicos[codigos]
+
+    # === CASO 1 — Pacote mãe: custo sempre ZERO ===
+    mae = tipos.str.contains("agrupado (pacotes", regex=False).to_numpy()
+    classes = np.where(mae, SKU_DESCONHECIDO, classes)
+
+    custos_unitarios = np.zeros(len(origem))
+    custos_totais = np.zeros(len(origem))
+
+    # Direto e composto CX: custo unitário fixo × unidades
+    simples = (classes == SKU_DIRETO) | (classes == SKU_COMPOSTO_CX)
+    custos_unitarios[simples] = valores[simples]
+    custos_totais[simples] = arredondar(valores[simples] * unidades[simples])
+
+    # Pacote por hífen: total arredondado, unitário derivado do total
+    pacote = classes == SKU_PACOTE
+    total_pacote = arredondar(valores[pacote] * unidades[pacote])
+    unid_pacote = unidades[pacote]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unit_pacote = np.where(
+            unid_pacote != 0, arredondar(total_pacote / unid_pacote), total_pacote
+        )
+    custos_totais[pacote] = total_pacote
+    custos_unitarios[pacote] = unit_pacote
+
+    if linhas is None:
+        df["Custo_Produto_Unitario"] = custos_unitarios
+        df["Custo_Produto_Total"] = custos_totais
+        return df
+
+    for coluna, valores_linhas in zip(COLUNAS_CUSTO, (custos_unitarios, custos_totais)):
+        df.iloc[linhas, df.columns.get_loc(coluna)] = valores_linhas
     return df
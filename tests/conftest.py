@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# Os módulos do projeto (sku_utils, utils/...) ficam na raiz do repositório
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
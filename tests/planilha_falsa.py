@@ -0,0 +1,135 @@
+# tests/planilha_falsa.py
+import re
+import threading
+
+# === GOOGLE SHEETS FALSO EM MEMÓRIA ===
+# Só o que utils/custos_google.py usa do gspread. A aba guarda uma grade de
+# textos (como o get_all_values devolve) e registra cada chamada de escrita,
+# para os testes contarem chamadas à API.
+
+PADRAO_CELULA = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def indice_coluna(letras):
+    """"A" → 0, "Z" → 25, "AA" → 26"""
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + (ord(letra) - ord("A") + 1)
+    return indice - 1
+
+
+def ler_intervalo(intervalo):
+    """"B2:C4" → (linha 0-based, coluna, última linha, última coluna); "A1" → célula única."""
+    inicio, _, fim = intervalo.partition(":")
+    letras, linha = PADRAO_CELULA.match(inicio).groups()
+    letras_fim, linha_fim = PADRAO_CELULA.match(fim or inicio).groups()
+    return int(linha) - 1, indice_coluna(letras), int(linha_fim) - 1, indice_coluna(letras_fim)
+
+
+def texto_celula(v):
+    """Valor enviado → texto exibido (a planilha devolve tudo como texto)."""
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+class AbaFalsa:
+    def __init__(self, valores=None):
+        self.grade = [[texto_celula(v) for v in linha] for linha in (valores or [])]
+        self.chamadas = []
+        self.leituras = 0
+        self.bloqueio = None  # threading.Event: get_all_values espera por ele (download lento)
+
+    # --- leitura ---
+    def get_all_values(self):
+        if self.bloqueio is not None:
+            self.bloqueio.wait(10)
+        self.leituras += 1
+        linhas = [list(l) for l in self.grade[:self._linhas_ocupadas()]]
+        largura = max((self._largura(l) for l in linhas), default=0)
+        return [(l + [""] * largura)[:largura] for l in linhas]
+
+    def _linhas_ocupadas(self):
+        total = len(self.grade)
+        while total and not any(self.grade[total - 1]):
+            total -= 1
+        return total
+
+    @staticmethod
+    def _largura(linha):
+        ocupadas = [i for i, v in enumerate(linha) if v != ""]
+        return ocupadas[-1] + 1 if ocupadas else 0
+
+    # --- escrita ---
+    def _escrever(self, linha, coluna, valores):
+        for i, valores_linha in enumerate(valores):
+            while len(self.grade) <= linha + i:
+                self.grade.append([])
+            destino = self.grade[linha + i]
+            for j, v in enumerate(valores_linha):
+                while len(destino) <= coluna + j:
+                    destino.append("")
+                destino[coluna + j] = texto_celula(v)
+
+    def update(self, valores, intervalo="A1"):
+        self.chamadas.append(("update", intervalo))
+        linha, coluna, _, _ = ler_intervalo(intervalo)
+        self._escrever(linha, coluna, valores)
+
+    def batch_update(self, dados):
+        self.chamadas.append(("batch_update", [d["range"] for d in dados]))
+        for d in dados:
+            linha, coluna, _, _ = ler_intervalo(d["range"])
+            self._escrever(linha, coluna, d["values"])
+
+    def batch_clear(self, intervalos):
+        self.chamadas.append(("batch_clear", list(intervalos)))
+        for intervalo in intervalos:
+            linha, coluna, linha_fim, coluna_fim = ler_intervalo(intervalo)
+            for i in range(linha, min(linha_fim + 1, len(self.grade))):
+                for j in range(coluna, min(coluna_fim + 1, len(self.grade[i]))):
+                    self.grade[i][j] = ""
+
+    def delete_rows(self, inicio, fim=None):
+        self.chamadas.append(("delete_rows", inicio, fim))
+        fim = inicio if fim is None else fim
+        del self.grade[inicio - 1:fim]
+
+    def append_rows(self, valores):
+        self.chamadas.append(("append_rows", len(valores)))
+        # Como o Sheets: logo depois da última linha com dados
+        ultima = self._linhas_ocupadas()
+        self.grade = self.grade[:ultima]
+        self._escrever(ultima, 0, valores)
+
+
+class PlanilhaFalsa:
+    def __init__(self, valores=None, versao="v1"):
+        self.sheet1 = AbaFalsa(valores)
+        self.versao = versao
+
+    def get_lastUpdateTime(self):
+        # Como no Drive, cada escrita na aba muda a data de modificação
+        escritas = len(self.sheet1.chamadas)
+        return f"{self.versao}+{escritas}" if escritas else self.versao
+
+
+class ClienteFalso:
+    """`open(nome)` como o gspread.Client; `offline=True` simula falta de rede."""
+
+    def __init__(self, planilha=None, offline=False):
+        self.planilha = planilha or PlanilhaFalsa()
+        self.offline = offline
+        self.aberturas = 0
+        self._lock = threading.Lock()
+
+    def open(self, nome):
+        with self._lock:
+            self.aberturas += 1
+        if self.offline:
+            raise ConnectionError("sem conexão com o Google")
+        return self.planilha
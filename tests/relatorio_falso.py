@@ -0,0 +1,62 @@
+# tests/relatorio_falso.py
+import numpy as np
+import pandas as pd
+
+from utils.pipeline import COL_MAP
+
+# === RELATÓRIO "VENDAS BR" PEQUENO COM PACOTES VARIADOS ===
+# Como sai de ler_planilha_vendas (nomes de coluna do ML, unidades em texto),
+# com os casos de borda que os laços originais tratavam um a um.
+
+SKUS = ["3990", "3990C2", "3888-3937", "0", None, "1001", "1001", "77"]
+TITULOS = ["Capa", "Película", "Cabo", "Capa", None, ""]
+TIPOS = ["Clássico", "Premium", "classico", " Premium ", None]
+
+
+def linha(venda, estado, preco=None, sku=None, titulo=None, tipo=None, unidades="1",
+          valor=0.0, recebido=0.0, tarifa=0.0, frete=0.0):
+    return {
+        "N.º de venda": f"#{venda}", "Data da venda": "5 de março de 2025 10:30 hs.", "Estado": estado,
+        "Receita por produtos (BRL)": valor, "Total (BRL)": recebido, "Tarifa de venda e impostos (BRL)": -tarifa,
+        "Tarifas de envio (BRL)": -frete, "Cancelamentos e reembolsos (BRL)": 0, "Preço unitário de venda do anúncio (BRL)": preco,
+        "SKU": sku, "# de anúncio": "MLB1" if sku else None, "Título do anúncio": titulo, "Tipo de anúncio": tipo,
+        "Unidades": unidades, "Receita por envio (BRL)": 0,
+    }
+
+
+def gerar_relatorio(semente, blocos=25):
+    """
+    Vendas simples e pacotes misturados: pacote sem filhos (N = 0), filhos
+    com 0 unidades, 8+ itens, quantidade ilegível, SKUs/títulos repetidos,
+    zerados e vazios, e às vezes uma mãe incompleta no fim.
+    """
+    rng = np.random.default_rng(semente)
+    linhas, venda = [], 1000
+    for _ in range(blocos):
+        venda += 1
+        sorteio = rng.random()
+        if sorteio < 0.45:
+            preco = float(rng.choice([5.0, 12.49, 12.5, 29.99, 30.0, 78.9, 79.0, 150.0]))
+            unidades = str(rng.integers(1, 4))
+            valor = round(preco * int(unidades), 2)
+            linhas.append(linha(venda, "Entregue", preco, rng.choice(SKUS), rng.choice(TITULOS), rng.choice(TIPOS),
+                                unidades, valor, round(valor * 0.8, 2), round(valor * 0.15, 2), float(rng.integers(0, 20))))
+            continue
+        if sorteio < 0.5:
+            linhas.append(linha(venda, "Pacote de vários produtos", valor=10.0, recebido=8.0, tarifa=2.0))
+            continue
+        qtd = int(rng.choice([0, 1, 2, 2, 3, 8, 9]))
+        linhas.append(linha(venda, f"Pacote de {qtd} produtos", valor=float(rng.integers(0, 300)),
+                            recebido=float(rng.integers(0, 250)), tarifa=round(float(rng.uniform(0, 60)), 2),
+                            frete=float(rng.choice([0.0, 12.35, 20.0]))))
+        for _ in range(qtd):
+            venda += 1
+            # 2.00 / 2.02: tarifa fixa de 1.00 / 1.01, no limite da validação do pacote
+            preco = float(rng.choice([0.0, 2.0, 2.02, 9.9, 25.0, 45.5, 99.0, 150.0]))
+            unidades = str(rng.choice([0, 1, 1, 2, 3]))
+            linhas.append(linha(venda, "Entregue", preco, rng.choice(SKUS), rng.choice(TITULOS), rng.choice(TIPOS),
+                                unidades, round(preco * int(unidades), 2)))
+    if rng.random() < 0.5:
+        linhas.append(linha(venda + 1, "Pacote de 3 produtos", valor=50.0, recebido=40.0, tarifa=8.0))
+        linhas.append(linha(venda + 2, "Entregue", 25.0, "1001", "Capa", "Premium"))
+    return pd.DataFrame(linhas, columns=list(COL_MAP) + ["Unidades", "Receita por envio (BRL)"])
@@ -0,0 +1,54 @@
+# tests/test_auditoria.py
+import pandas as pd
+
+from relatorio_falso import gerar_relatorio
+from utils.auditoria import auditar_vendas, resumo_tipos_anuncio
+from utils.pipeline import normalizar_vendas
+
+
+def resumo_tipos_original(df):
+    """Cópia congelada do resumo original (preenchia a coluna no próprio df)."""
+    df["Tipo_Anuncio"] = (
+        df["Tipo_Anuncio"].astype(str).str.strip().replace(["nan", "None", ""], "Unitário/Simples")
+    )
+    mask_nao_mae = ~df["Estado"].astype(str).str.contains("Pacote de", case=False, na=False, regex=False)
+    tipo_counts = df[mask_nao_mae].copy()["Tipo_Anuncio"].value_counts(dropna=False).reset_index()
+    tipo_counts.columns = ["Tipo de Anúncio", "Quantidade"]
+    tipo_counts["% Participação"] = (tipo_counts["Quantidade"] / tipo_counts["Quantidade"].sum() * 100).round(2)
+    return tipo_counts
+
+
+def auditar(semente):
+    return auditar_vendas(*normalizar_vendas(gerar_relatorio(semente, blocos=60)))
+
+
+# === TIPOS DE ANÚNCIO ===
+def test_tipo_anuncio_continua_category_depois_da_auditoria():
+    resultado = auditar(1)
+    df = resultado["df"]
+    assert isinstance(df["Tipo_Anuncio"].dtype, pd.CategoricalDtype)
+
+    # A app chama o resumo de novo a cada execução, sobre o df guardado na sessão
+    resumo_tipos_anuncio(df)
+    resumo_tipos_anuncio(df)
+    assert isinstance(df["Tipo_Anuncio"].dtype, pd.CategoricalDtype)
+    assert isinstance(resultado["df_relatorio"]["Tipo_Anuncio"].dtype, pd.CategoricalDtype)
+
+
+def test_tipo_anuncio_vazio_preenchido_no_relatorio():
+    df = auditar(2)["df"]
+    tipos = set(df["Tipo_Anuncio"].astype(str))
+    assert "Unitário/Simples" in tipos
+    assert tipos.isdisjoint({"nan", "None", "", " Premium "})
+
+
+def test_resumo_tipos_igual_ao_original():
+    for semente in range(10):
+        resultado = auditar(semente)
+        esperado = resumo_tipos_original(resultado["df"].astype({"Tipo_Anuncio": object}))
+        pd.testing.assert_frame_equal(resultado["tipo_counts"], esperado)
+        pd.testing.assert_frame_equal(resumo_tipos_anuncio(resultado["df"]), esperado)
+
+
+def test_resumo_sem_coluna_de_tipo():
+    assert resumo_tipos_anuncio(pd.DataFrame({"Estado": ["Entregue"]})) is None
@@ -0,0 +1,36 @@
+# tests/test_auditoria_cli.py
+from pathlib import Path
+
+from auditoria_cli import nomes_saida
+
+
+def test_nomes_unicos_ficam_como_o_arquivo():
+    assert nomes_saida(["exports/vendas_jan.xlsx", "exports/vendas_fev.xlsx"]) == ["vendas_jan", "vendas_fev"]
+
+
+def test_mesmo_nome_em_pastas_diferentes_usa_a_pasta():
+    assert nomes_saida(["jan/vendas.xlsx", "fev/vendas.xlsx", "outro.xlsx"]) == ["jan_vendas", "fev_vendas", "outro"]
+
+
+def test_mesmo_nome_e_mesma_pasta_numera():
+    nomes = nomes_saida(["a/mes/vendas.xlsx", "b/mes/vendas.xlsx", "mes_vendas.xlsx"])
+    assert len(set(nomes)) == 3
+    assert nomes[:2] == ["mes_vendas_1", "mes_vendas_2"]
+
+
+def test_lote_grava_um_arquivo_por_entrada(tmp_path, monkeypatch):
+    import auditoria_cli
+
+    gravados = []
+    resultado = {"df": [], "metricas": {}, "periodo": None, "avisos": [], "custo_carregado": False}
+    monkeypatch.setattr(auditoria_cli, "auditar_arquivo", lambda caminho, **_: resultado)
+    monkeypatch.setattr(
+        auditoria_cli, "gravar_relatorio",
+        lambda resultado, pasta, nome, completo: gravados.append(nome) or Path(pasta) / f"Auditoria_ML_{nome}.xlsx",
+    )
+    entradas = [tmp_path / "jan" / "vendas.xlsx", tmp_path / "fev" / "vendas.xlsx"]
+    resumos = list(auditoria_cli.auditar_lote(entradas, None, tmp_path / "saida", {}, processos=1))
+
+    assert sorted(gravados) == ["fev_vendas", "jan_vendas"]
+    assert [r["erro"] for r in resumos] == [None, None]
+    assert len({r["saida"] for r in resumos}) == 2
@@ -0,0 +1,334 @@
+# tests/test_custos_google.py
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from planilha_falsa import AbaFalsa, ClienteFalso, PlanilhaFalsa
+from utils.custos_google import (
+    COLUNAS_CUSTOS,
+    FonteCustosGoogle,
+    PlanilhaAlterada,
+    aplicar_escrita,
+    linhas_celulas,
+    planejar_escrita,
+)
+
+
+def custos_aleatorios(rng, linhas):
+    return pd.DataFrame({
+        "SKU": [str(s) for s in rng.integers(1000, 9999, linhas)],
+        "Produto": [f"Produto {i}" for i in range(linhas)],
+        "Custo_Produto": np.round(rng.uniform(1, 500, linhas), 2),
+    })
+
+
+def aba_com(df):
+    return AbaFalsa([list(df.columns)] + linhas_celulas(df))
+
+
+def editar(rng, original):
+    """Como o st.data_editor: altera, remove e inclui linhas, mantendo o índice das que ficaram."""
+    editado = original.copy()
+    alterar = rng.choice(editado.index, size=min(len(editado), rng.integers(0, 6)), replace=False)
+    editado.loc[alterar, "Custo_Produto"] = np.round(rng.uniform(1, 500, len(alterar)), 2)
+    if len(alterar):
+        editado.loc[alterar[0], "Produto"] = "Renomeado"
+    remover = rng.choice(editado.index, size=min(len(editado), rng.integers(0, 5)), replace=False)
+    editado = editado.drop(index=remover)
+    novas = custos_aleatorios(rng, rng.integers(0, 4))
+    novas.index = range(original.index.max() + 1, original.index.max() + 1 + len(novas))
+    return pd.concat([editado, novas])
+
+
+def reescrita_completa(df):
+    return {"atualizar": [], "remover": [], "adicionar": [], "reescrever": [list(df.columns)] + linhas_celulas(df)}
+
+
+# === ESCRITA POR DIFERENÇA ===
+@pytest.mark.parametrize("semente", range(30))
+def test_diferenca_termina_igual_a_reescrita_completa(semente):
+    rng = np.random.default_rng(semente)
+    original = custos_aleatorios(rng, rng.integers(1, 25))
+    editado = editar(rng, original)
+
+    por_diferenca = aba_com(original)
+    plano = planejar_escrita(original, editado)
+    assert plano["reescrever"] is None
+    resumo = aplicar_escrita(por_diferenca, plano)
+
+    completa = aba_com(original)
+    aplicar_escrita(completa, reescrita_completa(editado))
+
+    assert por_diferenca.get_all_values() == completa.get_all_values()
+    assert resumo["removidas"] == len(original.index.difference(editado.index))
+    assert resumo["adicionadas"] == len(editado.index.difference(original.index))
+
+
+def test_remove_de_baixo_para_cima_e_inclui_no_fim():
+    original = pd.DataFrame({"SKU": list("ABCDEF"), "Produto": list("abcdef"), "Custo_Produto": [1.0, 2, 3, 4, 5, 6]})
+    editado = original.drop(index=[1, 2, 4])
+    editado.loc[3, "Custo_Produto"] = 40.5
+    editado.loc[6] = ["G", "g", 7.0]
+
+    aba = aba_com(original)
+    aplicar_escrita(aba, planejar_escrita(original, editado))
+
+    assert aba.chamadas == [
+        ("batch_update", ["A5:C5"]),
+        ("delete_rows", 6, 6),
+        ("delete_rows", 3, 4),
+        ("append_rows", 1),
+    ]
+    assert aba.get_all_values() == [
+        ["SKU", "Produto", "Custo_Produto"],
+        ["A", "a", "1"], ["D", "d", "40.5"], ["F", "f", "6"], ["G", "g", "7"],
+    ]
+
+
+def test_sem_alteracao_nao_chama_a_api():
+    original = custos_aleatorios(np.random.default_rng(1), 10)
+    aba = aba_com(original)
+    resumo = aplicar_escrita(aba, planejar_escrita(original, original.copy()))
+    assert aba.chamadas == []
+    assert resumo == {"atualizadas": 0, "removidas": 0, "adicionadas": 0, "reescrita": False}
+
+
+def test_colunas_diferentes_reescrevem_tudo():
+    original = pd.DataFrame({
+        "SKU": ["1", "2", "3"], "Produto": ["a", "b", "c"], "Custo_Produto": [1.0, 2.0, 3.0], "Obs": ["x", "y", "z"],
+    })
+    editado = pd.DataFrame({"SKU": ["1", "9"], "Custo_Produto": [1.5, 9.0]})
+
+    plano = planejar_escrita(original, editado)
+    assert plano["reescrever"] is not None
+    aba = aba_com(original)
+    resumo = aplicar_escrita(aba, plano)
+
+    # Linhas e colunas que sobraram da versão antiga são limpas
+    assert aba.get_all_values() == [["SKU", "Custo_Produto"], ["1", "1.5"], ["9", "9"]]
+    assert [c[0] for c in aba.chamadas] == ["update", "batch_clear"]
+    assert resumo["reescrita"] and resumo["removidas"] == 1
+
+
+def test_planilha_alterada_no_google_recusa_salvar(tmp_path):
+    original = custos_aleatorios(np.random.default_rng(2), 5)
+    planilha = PlanilhaFalsa([COLUNAS_CUSTOS] + linhas_celulas(original), versao="v1")
+    fonte = FonteCustosGoogle(ClienteFalso(planilha), arquivo_snapshot=tmp_path / "custos.xlsx")
+    carregado, _ = fonte.obter(esperar=True)
+
+    editado = carregado.copy()
+    editado.loc[0, "Custo_Produto"] = 999.0
+    planilha.versao = "v2"  # outra pessoa salvou depois da leitura
+
+    with pytest.raises(PlanilhaAlterada):
+        fonte.salvar(carregado, editado)
+    assert planilha.sheet1.chamadas == []
+
+    # Depois de recarregar, a mesma edição é aceita
+    fonte.invalidar()
+    carregado, _ = fonte.obter(esperar=True)
+    editado = carregado.copy()
+    editado.loc[0, "Custo_Produto"] = 999.0
+    assert fonte.salvar(carregado, editado)["atualizadas"] == 1
+    assert planilha.sheet1.get_all_values()[1][2] == "999"
+
+
+# === FONTE DE CUSTOS (CACHE, VERIFICAÇÃO E CÓPIA LOCAL) ===
+class RelogioFalso:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def planilha_custos(linhas, versao="v1"):
+    return PlanilhaFalsa([COLUNAS_CUSTOS] + [[sku, f"Produto {sku}", custo] for sku, custo in linhas], versao=versao)
+
+
+def fonte_falsa(tmp_path, cliente, ttl=60):
+    relogio = RelogioFalso()
+    fonte = FonteCustosGoogle(cliente, ttl=ttl, arquivo_snapshot=tmp_path / "custos.xlsx", relogio=relogio)
+    return fonte, relogio
+
+
+def test_planilha_inalterada_nao_baixa_de_novo(tmp_path):
+    planilha = planilha_custos([("1001", "10,50"), ("1002", "3")])
+    fonte, relogio = fonte_falsa(tmp_path, ClienteFalso(planilha))
+
+    df, origem = fonte.obter(esperar=True)
+    assert origem == "google"
+    assert df["Custo_Produto"].tolist() == [10.5, 3.0]
+    assert planilha.sheet1.leituras == 1
+
+    fonte.obter(esperar=True)  # dentro do TTL: nem consulta a versão
+    relogio.agora += 61       # TTL vencido, mesma versão no Drive
+    df, origem = fonte.obter(esperar=True)
+    assert planilha.sheet1.leituras == 1
+    assert origem == "google" and df["Custo_Produto"].tolist() == [10.5, 3.0]
+
+
+def test_planilha_alterada_baixa_a_nova_versao(tmp_path):
+    planilha = planilha_custos([("1001", "10,50")])
+    fonte, relogio = fonte_falsa(tmp_path, ClienteFalso(planilha))
+    fonte.obter(esperar=True)
+
+    planilha.sheet1.update([["1001", "Produto 1001", "12"], ["1003", "Novo", "1.234,56"]], "A2")
+    planilha.versao = "v2"
+    relogio.agora += 61
+    df, origem = fonte.obter(esperar=True)
+
+    assert planilha.sheet1.leituras == 2
+    assert df["SKU"].tolist() == ["1001", "1003"]
+    assert df["Custo_Produto"].tolist() == [12.0, 12.35]
+    # A cópia local acompanha a última leitura
+    assert (tmp_path / "custos.xlsx").exists()
+
+
+def test_offline_usa_a_copia_local(tmp_path):
+    online, _ = fonte_falsa(tmp_path, ClienteFalso(planilha_custos([("1001", "7")])))
+    online.obter(esperar=True)  # grava a cópia local
+
+    cliente = ClienteFalso(offline=True)
+    fonte, _ = fonte_falsa(tmp_path, cliente)
+    df, origem = fonte.obter(esperar=True)
+
+    assert origem == "snapshot"
+    assert df["SKU"].astype(str).tolist() == ["1001"] and df["Custo_Produto"].tolist() == [7.0]
+    assert "sem conexão" in fonte.erro
+    assert cliente.aberturas == 1
+
+
+def test_offline_sem_copia_local_devolve_vazio(tmp_path):
+    fonte, _ = fonte_falsa(tmp_path, ClienteFalso(offline=True))
+    df, origem = fonte.obter()
+    assert origem == "vazio" and df.empty
+    assert fonte.erro
+
+
+def test_sem_credenciais(tmp_path):
+    fonte, _ = fonte_falsa(tmp_path, None)
+    df, origem = fonte.obter()
+    assert origem == "vazio" and df.empty
+    assert "não autenticado" in fonte.erro
+    with pytest.raises(RuntimeError):
+        fonte.salvar(df, df)
+
+
+def test_download_lento_nao_bloqueia_quem_chama(tmp_path):
+    online, _ = fonte_falsa(tmp_path, ClienteFalso(planilha_custos([("1001", "7")])))
+    online.obter(esperar=True)
+
+    planilha = planilha_custos([("1001", "8")], versao="v9")
+    planilha.sheet1.bloqueio = threading.Event()
+    fonte, _ = fonte_falsa(tmp_path, ClienteFalso(planilha))
+    try:
+        inicio = time.perf_counter()
+        df, origem = fonte.obter()
+        assert time.perf_counter() - inicio < 1
+        assert origem == "snapshot" and df["Custo_Produto"].tolist() == [7.0]
+        assert fonte.atualizando()
+    finally:
+        planilha.sheet1.bloqueio.set()
+
+    df, origem = fonte.obter(esperar=True)
+    assert origem == "google" and df["Custo_Produto"].tolist() == [8.0]
+    assert not fonte.atualizando()
+
+
+# === GRAVAÇÕES SEGUIDAS ===
+def fonte_carregada(tmp_path, linhas):
+    planilha = planilha_custos(linhas)
+    fonte, relogio = fonte_falsa(tmp_path, ClienteFalso(planilha))
+    fonte.obter(esperar=True)
+    return planilha, fonte, relogio
+
+
+def test_duas_gravacoes_seguidas_com_a_leitura_nova(tmp_path):
+    planilha, fonte, _ = fonte_carregada(tmp_path, [("1", "1"), ("2", "2"), ("3", "3"), ("4", "4")])
+
+    exibido, _ = fonte.obter()
+    editado = exibido.drop(index=[0, 1])
+    editado.loc[10] = ["5", "Produto 5", 5.0]
+    fonte.salvar(exibido, editado)
+
+    # Próxima execução da tela: já recebe o que ficou na planilha
+    exibido, origem = fonte.obter()
+    assert origem == "google" and exibido["SKU"].tolist() == ["3", "4", "5"]
+    editado = exibido.drop(index=[0])
+    editado.loc[10] = ["6", "Produto 6", 6.0]
+    fonte.salvar(exibido, editado)
+
+    assert planilha.sheet1.get_all_values() == [
+        COLUNAS_CUSTOS, ["4", "Produto 4", "4"], ["5", "Produto 5", "5"], ["6", "Produto 6", "6"],
+    ]
+    assert fonte.obter()[0]["SKU"].tolist() == ["4", "5", "6"]
+
+
+def test_segunda_gravacao_com_a_leitura_antiga_e_recusada(tmp_path):
+    planilha, fonte, _ = fonte_carregada(tmp_path, [("1", "1"), ("2", "2"), ("3", "3")])
+
+    exibido, _ = fonte.obter()
+    editado = exibido.drop(index=[0])
+    editado.loc[10] = ["4", "Produto 4", 4.0]
+    fonte.salvar(exibido, editado)
+    depois_da_primeira = planilha.sheet1.get_all_values()
+
+    # Mesmo `original` de antes: as posições das linhas já mudaram
+    with pytest.raises(PlanilhaAlterada):
+        fonte.salvar(exibido, editado)
+    assert planilha.sheet1.get_all_values() == depois_da_primeira
+    assert [linha[0] for linha in depois_da_primeira] == ["SKU", "2", "3", "4"]
+
+
+def test_nao_salva_custos_da_copia_local(tmp_path):
+    fonte_carregada(tmp_path, [("1", "1"), ("2", "2")])  # grava a cópia local
+
+    cliente = ClienteFalso(planilha_custos([("1", "1"), ("2", "2")]))
+    fonte, _ = fonte_falsa(tmp_path, cliente)
+    cliente.offline = True
+    exibido, origem = fonte.obter(esperar=True)
+    assert origem == "snapshot"
+
+    cliente.offline = False  # a rede volta, mas o exibido não veio do Google
+    with pytest.raises(PlanilhaAlterada):
+        fonte.salvar(exibido, exibido.drop(index=[0]))
+    assert cliente.planilha.sheet1.chamadas == []
+
+
+def test_gravacao_espera_a_atualizacao_em_andamento(tmp_path):
+    planilha, fonte, relogio = fonte_carregada(tmp_path, [("1", "1"), ("2", "2")])
+
+    # Outra pessoa inclui uma linha; a verificação vencida começa e demora
+    planilha.sheet1.update([["3", "Produto 3", "3"]], "A4")
+    planilha.versao = "v2"
+    planilha.sheet1.chamadas.clear()
+    planilha.sheet1.bloqueio = threading.Event()
+    relogio.agora += 61
+    exibido, _ = fonte.obter()
+    assert fonte.atualizando()
+
+    threading.Timer(0.05, planilha.sheet1.bloqueio.set).start()
+    with pytest.raises(PlanilhaAlterada):
+        fonte.salvar(exibido, exibido.drop(index=[0]))
+    assert planilha.sheet1.chamadas == []
+    assert [linha[0] for linha in planilha.sheet1.get_all_values()] == ["SKU", "1", "2", "3"]
+
+
+def test_falha_ao_reler_depois_de_salvar_exige_recarregar(tmp_path):
+    planilha, fonte, _ = fonte_carregada(tmp_path, [("1", "1"), ("2", "2")])
+    exibido, _ = fonte.obter()
+
+    ler = planilha.sheet1.get_all_values
+    planilha.sheet1.get_all_values = lambda: (_ for _ in ()).throw(ConnectionError("caiu"))
+    fonte.salvar(exibido, exibido.drop(index=[0]))
+    assert fonte.erro == "caiu"
+
+    depois, origem = fonte.obter(esperar=True)
+    assert origem == "snapshot"
+    with pytest.raises(PlanilhaAlterada):
+        fonte.salvar(depois, depois.drop(index=[0]))
+    assert [linha[0] for linha in ler()] == ["SKU", "2"]
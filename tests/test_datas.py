@@ -0,0 +1,110 @@
+# tests/test_datas.py
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.datas import MESES_PT, converter_datas_portugues
+
+
+# === CÓPIA CONGELADA DA VERSÃO ORIGINAL (APPLY LINHA A LINHA) ===
+# Referência para a paridade: não alterar junto com utils/datas.py.
+meses_pt = {
+    "janeiro": "01", "fevereiro": "02", "março": "03", "abril": "04",
+    "maio": "05", "junho": "06", "julho": "07", "agosto": "08",
+    "setembro": "09", "outubro": "10", "novembro": "11", "dezembro": "12"
+}
+
+
+def parse_data_portugues(texto):
+    if not isinstance(texto, str) or not any(m in texto.lower() for m in meses_pt):
+        return None
+    try:
+        partes = texto.lower().split(" de ")
+        dia = partes[0].zfill(2)
+        mes = meses_pt.get(partes[1], "01")
+        ano_e_hora = partes[2].split(" ")
+        ano = ano_e_hora[0]
+        hora = ano_e_hora[1] if len(ano_e_hora) > 1 else "00:00"
+        return datetime.strptime(f"{dia}/{mes}/{ano} {hora}", "%d/%m/%Y %H:%M")
+    except Exception:
+        return None
+
+
+def converter_original(serie):
+    return pd.to_datetime(serie.apply(parse_data_portugues), errors="coerce")
+
+
+def limpar_texto_data(serie):
+    """Mesmo pré-processamento de processar_vendas (tira "hs." e "às")."""
+    return serie.astype(str).str.replace(r"(hs\.?|às)", "", regex=True).str.strip()
+
+
+def assert_datas_iguais(serie):
+    esperado = converter_original(serie)
+    resultado = converter_datas_portugues(serie)
+    pd.testing.assert_series_equal(resultado, esperado.astype("datetime64[ns]"), check_names=False)
+
+
+# === CASOS DE BORDA ===
+TEXTOS_BORDA = [
+    # Todos os meses, com e sem zero à esquerda, e maiúsculas
+    *[f"{d} de {m} de 2025 {h}" for d, m, h in zip([1, 9, 15, 28] * 3, MESES_PT, ["0:00", "9:05", "14:32", "23:59"] * 3)],
+    "5 de Março de 2025 10:30", "05 DE DEZEMBRO DE 2024 08:00",
+    # Sem horário
+    "12 de março de 2025", "1 de janeiro de 2024",
+    # Datas e horas inválidas
+    "31 de fevereiro de 2025 10:00", "29 de fevereiro de 2024 10:00", "29 de fevereiro de 2025 10:00",
+    "10 de maio de 2025 24:00", "10 de maio de 2025 12:60", "0 de maio de 2025 10:00", "32 de maio de 2025",
+    # Mês desconhecido (com outro mês no texto o original usa "01") e sem mês nenhum
+    "10 de marco de 2025 10:00", "10 de mayo de 2025 maio", "10/05/2025 10:00", "2025-05-10 10:00:00",
+    "10 de marçoo de 2025 10:00", "3 de Maios de 2024",
+    # "às" removido deixa espaço duplo; sobras depois do horário
+    "10 de setembro de 2025 às 14:00", "10 de setembro de 2025 14:00 hs.", "1 de janeiro de 2025 10:30 extra",
+    # Vazios e não texto
+    "", "-", "nan", "None", None, np.nan, 45000, 45000.5,
+]
+
+
+def test_casos_de_borda_como_no_relatorio():
+    assert_datas_iguais(limpar_texto_data(pd.Series(TEXTOS_BORDA, dtype=object)))
+
+
+def test_casos_de_borda_sem_pre_processamento():
+    # Valores que não são texto (NaN, número) chegam direto à função
+    assert_datas_iguais(pd.Series(TEXTOS_BORDA, dtype=object))
+
+
+def test_valores_conhecidos():
+    datas = converter_datas_portugues(limpar_texto_data(pd.Series([
+        "12 de março de 2025 14:32 hs.", "5 de Maio de 2024", "31 de fevereiro de 2025 10:00", None,
+    ])))
+    assert datas.iloc[0] == pd.Timestamp(2025, 3, 12, 14, 32)
+    assert datas.iloc[1] == pd.Timestamp(2024, 5, 5)
+    assert datas.iloc[2:].isna().all()
+
+
+def test_indice_e_vazio_preservados():
+    serie = pd.Series(["1 de abril de 2025 10:00", None, "1 de abril de 2025 10:00"], index=[7, 3, 9])
+    datas = converter_datas_portugues(serie)
+    assert datas.index.tolist() == [7, 3, 9]
+    assert datas.dtype == "datetime64[ns]" and pd.isna(datas.loc[3])
+    assert converter_datas_portugues(pd.Series([], dtype=object)).empty
+
+
+@pytest.mark.parametrize("semente", range(15))
+def test_paridade_textos_aleatorios(semente):
+    rng = np.random.default_rng(semente)
+    meses = list(MESES_PT) + ["Março", "JUNHO", "marco", "marçoo", "mes"]
+    textos = []
+    for _ in range(400):
+        dia = str(rng.integers(0, 33)).zfill(int(rng.integers(1, 3)))
+        hora = f"{rng.integers(0, 26)}:{str(rng.integers(0, 62)).zfill(2)}"
+        sufixo = rng.choice(["", " hs.", " hs", " às", " x"])
+        texto = f"{dia} de {rng.choice(meses)} de {rng.integers(1999, 2031)}"
+        if rng.random() < 0.8:
+            texto += rng.choice([" ", "  ", " às "]) + hora
+        textos.append(texto + sufixo)
+    textos += list(rng.choice(np.array(TEXTOS_BORDA, dtype=object), 40))
+    assert_datas_iguais(limpar_texto_data(pd.Series(textos, dtype=object)))
@@ -0,0 +1,205 @@
+# tests/test_fora_margem.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from relatorio_falso import gerar_relatorio
+from utils.auditoria import auditar_vendas
+from utils.fora_margem import COLUNAS_RANKING, RankingForaMargem
+from utils.pipeline import STATUS_FORA_MARGEM, STATUS_NORMAL, normalizar_vendas
+
+CHAVES = ["SKU", "Anuncio", "Produto"]
+
+
+# === CÓPIA CONGELADA DA VERSÃO ORIGINAL (GROUPBY SOBRE AS VENDAS FORA DA MARGEM) ===
+# Referência para a paridade: não alterar junto com utils/fora_margem.py.
+def produto_critico_original(df):
+    df_alerta = df[df["Status"] == "⚠️ Acima da Margem"].copy()
+    if df_alerta.empty:
+        return None, None
+    produto_critico = (
+        df_alerta.groupby(["SKU", "Anuncio", "Produto"])
+        .size().reset_index(name="Ocorrências")
+        .sort_values("Ocorrências", ascending=False).head(1)
+    )
+    sku_critico = produto_critico.iloc[0]["SKU"]
+    return produto_critico.iloc[0], df_alerta[df_alerta["SKU"] == sku_critico]
+
+
+def ranking_esperado(df, margem_limite):
+    """Tabela inteira por groupby (ordem estável por ocorrências)."""
+    fora = df[df["Status"] == STATUS_FORA_MARGEM].astype({c: object for c in CHAVES})
+    vendas = df.astype({c: object for c in CHAVES}).groupby(CHAVES).size().rename("Vendas")
+    excesso = (fora["Diferença_R$"] - fora["Valor_Venda"] * (margem_limite / 100)).clip(lower=0)
+    tabela = (
+        fora.assign(excesso=excesso).groupby(CHAVES)
+        .agg(**{"Ocorrências": ("Status", "size"), "Perda_R$": ("excesso", "sum"),
+                "%Diferença_Media": ("%Diferença", "mean")})
+        .join(vendas).reset_index()
+        .sort_values("Ocorrências", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+    tabela["%_Vendas_Fora"] = (tabela["Ocorrências"] / tabela["Vendas"] * 100).round(2)
+    return tabela.round({"Perda_R$": 2, "%Diferença_Media": 2})
+
+
+def vendas(linhas):
+    """(SKU, Anuncio, Produto, fora da margem?, %Diferença) → frame com as colunas do ranking."""
+    df = pd.DataFrame(linhas, columns=CHAVES + ["fora", "%Diferença"])
+    df["Status"] = np.where(df.pop("fora"), STATUS_FORA_MARGEM, STATUS_NORMAL)
+    df["Valor_Venda"] = 100.0
+    df["Diferença_R$"] = df["%Diferença"]
+    df["Venda"] = [f"V{i}" for i in range(len(df))]
+    return df
+
+
+# === ORDEM E EMPATES ===
+def test_mais_ocorrencias_primeiro_e_empates_pela_chave():
+    df = vendas([
+        ("B", "MLB1", "Bola", True, 40.0),
+        ("A", "MLB2", "Aro", True, 35.0),
+        ("C", "MLB1", "Cone", True, 50.0),
+        ("C", "MLB1", "Cone", True, 45.0),
+        ("A", "MLB1", "Aro", True, 31.0),
+        ("B", "MLB1", "Bola", True, 60.0),
+        ("A", "MLB1", "Aro", False, 10.0),
+    ])
+    ranking = RankingForaMargem(df, 30)
+    tabela = ranking.tabela
+    assert list(tabela.columns) == COLUNAS_RANKING
+    # B e C empatam com 2: B vem antes pela chave; depois A/MLB1 e A/MLB2 (1 cada)
+    assert tabela[CHAVES].values.tolist() == [
+        ["B", "MLB1", "Bola"], ["C", "MLB1", "Cone"], ["A", "MLB1", "Aro"], ["A", "MLB2", "Aro"],
+    ]
+    assert tabela["Ocorrências"].tolist() == [2, 2, 1, 1]
+    assert tabela["Vendas"].tolist() == [2, 2, 2, 1]
+    assert tabela["%_Vendas_Fora"].tolist() == [100.0, 100.0, 50.0, 100.0]
+    assert ranking.critico() == {"sku": "B", "produto": "Bola", "anuncio": "MLB1", "ocorrencias": 2}
+
+
+def test_empates_com_muitos_produtos_nao_dependem_da_ordem_do_relatorio():
+    # Acima de 16 produtos o quicksort padrão embaralhava os empates
+    linhas = [(f"{s:03d}", "MLB1", f"P{s}", True, 40.0) for s in range(300) for _ in range(2)]
+    linhas += [(f"{s:03d}", "MLB1", f"P{s}", True, 40.0) for s in (7, 250, 130)]
+    df = vendas(linhas)
+    for semente in range(3):
+        embaralhado = df.sample(frac=1, random_state=semente).reset_index(drop=True)
+        ranking = RankingForaMargem(embaralhado, 30)
+        assert ranking.tabela["SKU"].tolist()[:4] == ["007", "130", "250", "000"]
+        assert ranking.tabela["SKU"].tolist()[3:] == [f"{s:03d}" for s in range(300) if s not in (7, 130, 250)]
+        assert ranking.critico()["sku"] == "007"
+
+
+def test_critico_igual_ao_original_sem_empate_no_topo():
+    df = vendas(
+        [("3990", "MLB1", "Capa", True, 40.0)] * 3
+        + [("1050", "MLB2", "Cabo", True, 35.0)] * 2
+        + [("3990", "MLB9", "Capa", True, 50.0), ("3990", "MLB9", "Capa", False, 5.0)]
+    )
+    linha, afetadas = produto_critico_original(df)
+    ranking = RankingForaMargem(df, 30)
+    assert ranking.critico() == {
+        "sku": linha["SKU"], "produto": linha["Produto"], "anuncio": linha["Anuncio"],
+        "ocorrencias": linha["Ocorrências"],
+    }
+    # Vendas afetadas: todas as do SKU crítico fora da margem, em qualquer anúncio
+    pd.testing.assert_frame_equal(ranking.vendas_afetadas(df), afetadas)
+    assert ranking.vendas_afetadas(df)["Anuncio"].tolist() == ["MLB1"] * 3 + ["MLB9"]
+
+
+def test_chave_vazia_fica_fora_do_ranking_mas_conta_nas_vendas_afetadas():
+    df = vendas([
+        ("3990", "MLB1", "Capa", True, 40.0),
+        ("3990", None, "Capa", True, 40.0),
+        ("3990", "MLB1", np.nan, True, 40.0),
+        (None, "MLB1", "Capa", True, 40.0),
+    ])
+    ranking = RankingForaMargem(df, 30)
+    assert len(ranking) == 1 and ranking.tabela.at[0, "Ocorrências"] == 1
+    assert ranking.vendas_afetadas(df)["Venda"].tolist() == ["V0", "V1", "V2"]
+    _, afetadas = produto_critico_original(df)
+    pd.testing.assert_frame_equal(ranking.vendas_afetadas(df), afetadas)
+
+
+def test_detalhe_e_pior_venda_de_cada_produto():
+    df = vendas([
+        ("A", "MLB1", "Aro", True, 40.0),
+        ("B", "MLB1", "Bola", True, 90.0),
+        ("A", "MLB1", "Aro", True, 70.0),
+        ("A", "MLB1", "Aro", True, 70.0),
+        ("B", "MLB1", "Bola", False, 99.0),
+        ("A", "MLB1", "Aro", True, np.nan),
+    ])
+    ranking = RankingForaMargem(df, 30)
+    assert ranking.tabela["SKU"].tolist() == ["A", "B"]
+    assert ranking.posicoes(0).tolist() == [0, 2, 3, 5]
+    assert ranking.posicoes(1).tolist() == [1]
+    # Empate na maior %Diferença → a primeira no relatório; NaN nunca é a pior
+    assert ranking.posicao_pior(0) == 2 and ranking.tabela.at[0, "Pior_Venda"] == "V2"
+    assert ranking.tabela.at[0, "Pior_%Diferença"] == 70.0
+    assert ranking.posicao_pior(1) == 1
+    # Perda: quanto passou de 30% da venda (R$ 100), NaN conta zero
+    assert ranking.tabela["Perda_R$"].tolist() == [10.0 + 40.0 + 40.0, 60.0]
+
+
+def test_sem_vendas_fora_da_margem():
+    df = vendas([("A", "MLB1", "Aro", False, 10.0)])
+    ranking = RankingForaMargem(df, 30)
+    assert len(ranking) == 0 and list(ranking.tabela.columns) == COLUNAS_RANKING
+    assert ranking.critico() is None and ranking.vendas_afetadas(df) is None
+    assert produto_critico_original(df) == (None, None)
+
+
+# === PARIDADE COM O GROUPBY ===
+@pytest.mark.parametrize("semente", range(6))
+@pytest.mark.parametrize("tipo_chaves", [object, "category"])
+def test_tabela_igual_ao_groupby(semente, tipo_chaves):
+    rng = np.random.default_rng(semente)
+    n = 2000
+    df = pd.DataFrame({
+        "SKU": rng.choice(np.array([f"{v}" for v in range(40)] + [None], dtype=object), n),
+        "Anuncio": rng.choice(np.array(["MLB1", "MLB2", "MLB3", None], dtype=object), n, p=[0.4, 0.3, 0.25, 0.05]),
+        "Produto": rng.choice(np.array(["Capa", "Cabo"], dtype=object), n),
+        "Status": rng.choice([STATUS_FORA_MARGEM, STATUS_NORMAL], n, p=[0.3, 0.7]),
+        "%Diferença": np.round(rng.uniform(0, 80, n), 2),
+        "Valor_Venda": np.round(rng.uniform(5, 200, n), 2),
+        "Venda": [f"V{i}" for i in range(n)],
+    })
+    df["Diferença_R$"] = np.round(df["Valor_Venda"] * df["%Diferença"] / 100, 2)
+    df = df.astype({c: tipo_chaves for c in CHAVES})
+
+    ranking = RankingForaMargem(df, 30)
+    esperado = ranking_esperado(df, 30)
+    colunas = CHAVES + ["Ocorrências", "Vendas", "%_Vendas_Fora"]
+    pd.testing.assert_frame_equal(ranking.tabela[colunas], esperado[colunas], check_dtype=False)
+    # Somas em ordem diferente da do groupby: o centavo arredondado pode variar
+    for coluna in ("Perda_R$", "%Diferença_Media"):
+        np.testing.assert_allclose(ranking.tabela[coluna], esperado[coluna], rtol=0, atol=0.0100001)
+
+    # Cada produto: suas vendas fora da margem, na ordem do relatório
+    fora = df["Status"].eq(STATUS_FORA_MARGEM).to_numpy()
+    for i in range(len(ranking)):
+        mesmo = np.ones(n, dtype=bool)
+        for c in CHAVES:
+            mesmo &= df[c].astype(object).eq(ranking.tabela.at[i, c]).to_numpy()
+        assert ranking.posicoes(i).tolist() == np.flatnonzero(mesmo & fora).tolist()
+
+
+@pytest.mark.parametrize("semente", range(4))
+def test_critico_na_auditoria_completa(semente):
+    resultado = auditar_vendas(*normalizar_vendas(gerar_relatorio(semente, blocos=60)), margem_limite=10)
+    df = resultado["df"]
+    linha, afetadas = produto_critico_original(df.astype({c: object for c in CHAVES}))
+    if linha is None:
+        assert resultado["critico"] is None
+        return
+    ranking = RankingForaMargem(df, 10)
+    # Com empate no topo o original dependia do quicksort; sem empate tem de ser o mesmo
+    if (ranking.tabela["Ocorrências"] == linha["Ocorrências"]).sum() == 1:
+        assert resultado["critico"]["sku"] == linha["SKU"]
+        assert resultado["critico"]["anuncio"] == linha["Anuncio"]
+    assert resultado["critico"]["ocorrencias"] == linha["Ocorrências"]
+    assert resultado["vendas_afetadas"]["Venda"].tolist() == (
+        df[df["Status"] == STATUS_FORA_MARGEM]
+        .loc[lambda d: d["SKU"].astype(object) == resultado["critico"]["sku"], "Venda"].tolist()
+    )
@@ -0,0 +1,164 @@
+# tests/test_grade_itens.py
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from relatorio_falso import gerar_relatorio
+from utils.grade_itens import contar_paginas, filtrar_itens, ordenar_por_data, pagina_itens
+from utils.pipeline import normalizar_vendas, processar_vendas
+
+DATAS = pd.to_datetime(pd.Series([
+    "2025-03-05 10:30", "2025-03-12 09:00", None, "2025-02-28 23:59", "2025-03-12 09:00",
+    "2025-03-05 10:30", None, "2025-03-31 00:00",
+])).to_numpy()
+
+
+# === ORDEM POR DATA ===
+def test_mais_recente_primeiro_empates_estaveis_e_sem_data_no_fim():
+    assert ordenar_por_data(DATAS).tolist() == [7, 1, 4, 0, 5, 3, 2, 6]
+
+
+def test_ordem_nao_depende_do_dia_do_mes():
+    # Como texto "dd/mm/aaaa", 31/01 viria antes de 05/03
+    datas = pd.to_datetime(pd.Series(["2025-01-31", "2025-03-05", "2024-12-31"])).to_numpy()
+    assert ordenar_por_data(datas).tolist() == [1, 0, 2]
+
+
+def test_ordem_sem_linhas_e_sem_datas():
+    assert ordenar_por_data(np.array([], dtype="datetime64[ns]")).tolist() == []
+    assert ordenar_por_data(np.full(3, np.datetime64("NaT", "ns"))).tolist() == [0, 1, 2]
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_datas_do_processamento_alinhadas_com_a_coluna_data(semente):
+    rng = np.random.default_rng(semente)
+    bruto = gerar_relatorio(semente, blocos=40)
+    textos = [
+        f"{rng.integers(1, 29)} de {rng.choice(['janeiro', 'março', 'dezembro'])} de {rng.integers(2024, 2026)} "
+        f"{rng.integers(0, 24)}:{str(rng.integers(0, 60)).zfill(2)} hs."
+        for _ in range(len(bruto))
+    ]
+    textos[::7] = ["5 de março de 2025 10:30 hs."] * len(textos[::7])
+    textos[3::11] = ["31 de fevereiro de 2025 10:00"] * len(textos[3::11])
+    bruto["Data da venda"] = textos
+    df, info = processar_vendas(*normalizar_vendas(bruto), 3.0)
+
+    datas = info["datas"]
+    assert datas.dtype == "datetime64[ns]" and len(datas) == len(df)
+    # A coluna Data continua texto e é a mesma data formatada
+    formatadas = pd.Series(datas).dt.strftime("%d/%m/%Y %H:%M")
+    assert formatadas.isna().tolist() == df["Data"].isna().tolist()
+    assert formatadas.dropna().tolist() == df["Data"].dropna().tolist()
+    assert np.isnat(datas).any()
+
+    # Mesma ordem que um sort estável pela data, sem datas no fim
+    esperado = (
+        pd.DataFrame({"data": datas}).reset_index()
+        .sort_values(["data", "index"], ascending=[False, True], na_position="last")["index"]
+    )
+    assert ordenar_por_data(datas).tolist() == esperado.tolist()
+
+
+# === FILTROS ===
+@pytest.fixture
+def itens():
+    df = pd.DataFrame({
+        "Status": pd.Categorical(["✅ Normal", "⚠️ Acima da Margem", "✅ Normal", "🟦 Cancelamento Correto",
+                                  "⚠️ Acima da Margem", "✅ Normal", "✅ Normal", "⚠️ Acima da Margem"]),
+        "Tipo_Anuncio": pd.Categorical(["Premium", "Clássico", "Premium", "Clássico", "Agrupado (Item)",
+                                        "Premium", "Clássico", "Premium"]),
+        "SKU": pd.Categorical(["3990", "3990C2", "1050", None, "3888-3990", "1050", "3990", "x"]),
+    })
+    return df, DATAS, ordenar_por_data(DATAS)
+
+
+def test_sem_filtros_devolve_a_ordem_inteira(itens):
+    df, datas, ordem = itens
+    assert filtrar_itens(df, ordem, datas).tolist() == ordem.tolist()
+    assert filtrar_itens(df, ordem, datas, status=[], tipos=[], sku="   ").tolist() == ordem.tolist()
+
+
+def test_filtros_combinados_mantem_a_ordem_por_data(itens):
+    df, datas, ordem = itens
+    assert filtrar_itens(df, ordem, datas, status=["⚠️ Acima da Margem"]).tolist() == [7, 1, 4]
+    assert filtrar_itens(df, ordem, datas, tipos=["Premium"]).tolist() == [7, 0, 5, 2]
+    # SKU: trecho do texto, sem diferenciar maiúsculas; vazio (None) nunca casa
+    assert filtrar_itens(df, ordem, datas, sku=" 3990 ").tolist() == [1, 4, 0, 6]
+    assert filtrar_itens(df, ordem, datas, sku="c2").tolist() == [1]
+    assert filtrar_itens(df, ordem, datas, status=["✅ Normal"], tipos=["Premium"], sku="1050").tolist() == [5, 2]
+    assert filtrar_itens(df, ordem, datas, status=["Inexistente"]).tolist() == []
+
+
+def test_periodo_inclui_os_dois_extremos_e_exclui_sem_data(itens):
+    df, datas, ordem = itens
+    # Fim inclusivo: o dia 12/03 inteiro (09:00) entra; 28/02 23:59 fica fora
+    assert filtrar_itens(df, ordem, datas, periodo=(date(2025, 3, 1), date(2025, 3, 12))).tolist() == [1, 4, 0, 5]
+    assert filtrar_itens(df, ordem, datas, periodo=(date(2025, 2, 28), date(2025, 2, 28))).tolist() == [3]
+    assert filtrar_itens(df, ordem, datas, periodo=(date(2025, 3, 31), date(2025, 3, 31))).tolist() == [7]
+    assert filtrar_itens(df, ordem, datas, periodo=(date(2025, 4, 1), date(2025, 4, 30))).tolist() == []
+
+
+def test_filtro_de_tipos_sem_a_coluna(itens):
+    df, datas, ordem = itens
+    df = df.drop(columns="Tipo_Anuncio")
+    assert filtrar_itens(df, ordem, datas, tipos=["Premium"]).tolist() == ordem.tolist()
+
+
+# === PAGINAÇÃO ===
+@pytest.mark.parametrize("total, tamanho, paginas", [
+    (0, 50, 1), (1, 50, 1), (50, 50, 1), (51, 50, 2), (100, 50, 2), (101, 50, 3), (499, 500, 1),
+])
+def test_contar_paginas(total, tamanho, paginas):
+    assert contar_paginas(total, tamanho) == paginas
+
+
+@pytest.fixture
+def grade():
+    df = pd.DataFrame({"Venda": [f"V{i}" for i in range(23)], "Valor": np.arange(23.0), "Extra": 0})
+    posicoes = np.arange(23)[::-1]
+    return df, posicoes
+
+
+@pytest.mark.parametrize("pagina, inicio, vendas", [
+    (1, 0, [f"V{i}" for i in range(22, 12, -1)]),
+    (2, 10, [f"V{i}" for i in range(12, 2, -1)]),
+    # Última página incompleta
+    (3, 20, ["V2", "V1", "V0"]),
+    # Fora do intervalo vai para a página mais próxima
+    (4, 20, ["V2", "V1", "V0"]),
+    (99, 20, ["V2", "V1", "V0"]),
+    (0, 0, [f"V{i}" for i in range(22, 12, -1)]),
+    (-5, 0, [f"V{i}" for i in range(22, 12, -1)]),
+    ("2", 10, [f"V{i}" for i in range(12, 2, -1)]),
+])
+def test_pagina_itens_limites(grade, pagina, inicio, vendas):
+    df, posicoes = grade
+    df_pagina, inicio_pagina = pagina_itens(df, posicoes, pagina, 10, ["Venda", "Valor"])
+    assert inicio_pagina == inicio
+    assert df_pagina["Venda"].tolist() == vendas
+    assert list(df_pagina.columns) == ["Venda", "Valor"]
+
+
+def test_pagina_exata_e_tamanho_maior_que_o_total(grade):
+    df, posicoes = grade
+    ultima, inicio = pagina_itens(df, posicoes[:20], 2, 10, ["Venda"])
+    assert inicio == 10 and len(ultima) == 10
+    tudo, inicio = pagina_itens(df, posicoes, 1, 500, ["Venda"])
+    assert inicio == 0 and len(tudo) == 23
+
+
+def test_pagina_de_filtro_vazio(grade):
+    df, _ = grade
+    vazia, inicio = pagina_itens(df, np.array([], dtype=np.int64), 3, 50, ["Venda", "Valor"])
+    assert inicio == 0 and vazia.empty and list(vazia.columns) == ["Venda", "Valor"]
+
+
+def test_pagina_segue_posicoes_filtradas(grade):
+    df, posicoes = grade
+    filtradas = posicoes[df["Valor"].to_numpy()[posicoes] % 2 == 0]
+    pagina, inicio = pagina_itens(df, filtradas, 2, 5, ["Venda"])
+    assert inicio == 5 and pagina["Venda"].tolist() == ["V12", "V10", "V8", "V6", "V4"]
+    # O índice da página é o do df (posição original das linhas)
+    assert pagina.index.tolist() == [12, 10, 8, 6, 4]
@@ -0,0 +1,200 @@
+# tests/test_indice_skus.py
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.indice_skus import LIMITE_SKUS_PREFIXO, IndiceSkusVendas, normalizar_chave, resumo_por_sku
+
+
+# === VARREDURA LINHA A LINHA (REFERÊNCIA) ===
+# O que o índice precisa devolver, calculado da forma mais direta possível.
+def componentes_linha(sku):
+    partes = [p for p in sku.split("-") if p] if "-" in sku else []
+    componentes = set(partes)
+    for parte in partes + [sku]:
+        cx = re.match(r"^(\d+)[Cc]([2-9]|1[0-2])$", parte)
+        if cx:
+            componentes.add(cx.group(1))
+    return componentes
+
+
+def buscar_varrendo(df, texto, prefixo=True, limite_skus=LIMITE_SKUS_PREFIXO):
+    chave = normalizar_chave(texto)
+    skus = [normalizar_chave(v) for v in df["SKU"]] if "SKU" in df.columns else [""] * len(df)
+    anuncios = [normalizar_chave(v) for v in df["Anuncio"]] if "Anuncio" in df.columns else [""] * len(df)
+    if not chave:
+        return {"chave": chave, "skus": [], "vendas": [], "em_kits": [], "anuncio": [], "todas": []}
+
+    encontrados = [chave] if chave in skus else []
+    if not encontrados and prefixo:
+        encontrados = sorted({s for s in skus if s.startswith(chave)})[:limite_skus]
+    vendas = [i for i, s in enumerate(skus) if s in encontrados]
+    em_kits = [i for i, s in enumerate(skus) if chave in componentes_linha(s) and i not in vendas]
+    anuncio = [i for i, a in enumerate(anuncios) if a == chave]
+    return {
+        "chave": chave, "skus": encontrados, "vendas": vendas, "em_kits": em_kits, "anuncio": anuncio,
+        "todas": sorted(set(vendas) | set(em_kits) | set(anuncio)),
+    }
+
+
+def assert_busca_igual(indice, df, texto, **opcoes):
+    achado = indice.buscar(texto, **opcoes)
+    esperado = buscar_varrendo(df, texto, **opcoes)
+    assert achado["chave"] == esperado["chave"]
+    assert achado["skus"] == esperado["skus"], texto
+    for campo in ("vendas", "em_kits", "anuncio", "todas"):
+        assert achado[campo].tolist() == esperado[campo], (texto, campo)
+
+
+@pytest.fixture
+def relatorio():
+    df = pd.DataFrame({
+        "Estado": ["Entregue", "Entregue", "Pacote de 2 produtos", "Entregue", "Entregue", "Entregue",
+                   "Entregue", "Entregue", "Entregue", "Entregue", "Entregue", "Entregue"],
+        "SKU": ["3990", "3990C2", "3888-3937", "3888", "3937", " 3906 ", "3888–3990C2", "3909",
+                None, "4000c12", "--", "39"],
+        "Anuncio": ["MLB100", "MLB100", "MLB200", "mlb300", "MLB300", "MLB3990", "MLB400", "MLB400",
+                    "MLB100", np.nan, "MLB500", "MLB39"],
+    })
+    return df, IndiceSkusVendas(df)
+
+
+# === CASOS CONHECIDOS ===
+def test_sku_exato_nao_busca_por_prefixo(relatorio):
+    _, indice = relatorio
+    achado = indice.buscar("3990")
+    assert achado["skus"] == ["3990"]
+    assert achado["vendas"].tolist() == [0]
+    # 3990C2 (composto) e o kit com 3990C2 apontam para a base 3990
+    assert achado["em_kits"].tolist() == [1, 6]
+
+
+def test_prefixo_quando_nao_ha_sku_exato(relatorio):
+    _, indice = relatorio
+    achado = indice.buscar("390")
+    assert achado["skus"] == ["3906", "3909"]
+    assert achado["vendas"].tolist() == [5, 7]
+    # "39" existe como SKU: fica só ele, sem os que começam com 39
+    assert indice.buscar("39")["skus"] == ["39"]
+    assert indice.buscar("390", prefixo=False)["vendas"].tolist() == []
+
+
+def test_componentes_de_kits_pacotes_e_compostos(relatorio):
+    _, indice = relatorio
+    # 3888 vende sozinho (linha 3) e aparece no pacote (2) e no kit com hífen Unicode (6)
+    achado = indice.buscar("3888")
+    assert achado["vendas"].tolist() == [3]
+    assert achado["em_kits"].tolist() == [2, 6]
+    # Componente que não vende sozinho: só em_kits
+    achado = indice.buscar("3990C2")
+    assert achado["vendas"].tolist() == [1] and achado["em_kits"].tolist() == [6]
+    # Sem prefixo o composto aparece como kit; com prefixo já vem em vendas (sem repetir)
+    assert indice.buscar("4000", prefixo=False)["em_kits"].tolist() == [9]
+    achado = indice.buscar("4000")
+    assert achado["skus"] == ["4000C12"]
+    assert achado["vendas"].tolist() == [9] and achado["em_kits"].tolist() == []
+
+
+def test_chave_normalizada_como_na_planilha_de_custos(relatorio):
+    _, indice = relatorio
+    assert indice.buscar(" 3990c2 ")["vendas"].tolist() == [1]
+    assert indice.buscar("3888—3937")["vendas"].tolist() == [2]
+    assert indice.buscar(3906)["vendas"].tolist() == [5]
+
+
+def test_anuncio_e_todas(relatorio):
+    _, indice = relatorio
+    achado = indice.buscar("mlb300")
+    assert achado["anuncio"].tolist() == [3, 4] and achado["vendas"].tolist() == []
+    # Anúncio exato não puxa o SKU "39" do fim do número
+    achado = indice.buscar("MLB39")
+    assert achado["anuncio"].tolist() == [11] and achado["todas"].tolist() == [11]
+
+
+@pytest.mark.parametrize("texto", ["", "   ", "--", None, "#"])
+def test_busca_vazia(relatorio, texto):
+    _, indice = relatorio
+    achado = indice.buscar(texto)
+    assert achado["chave"] == "" and achado["skus"] == [] and len(achado["todas"]) == 0
+
+
+def test_prefixo_depois_da_ultima_chave(relatorio):
+    _, indice = relatorio
+    assert indice.buscar("Z")["skus"] == [] and len(indice.buscar("Z")["todas"]) == 0
+    assert indice.buscar("4")["skus"] == ["4000C12"]
+    # O fim da faixa do prefixo fica depois de qualquer caractere (inclusive "Z")
+    assert IndiceSkusVendas(pd.DataFrame({"SKU": ["ZZ9", "ZA1", "Y"]})).buscar("z")["skus"] == ["ZA1", "ZZ9"]
+
+
+def test_limite_de_skus_no_prefixo():
+    df = pd.DataFrame({"SKU": [f"77{i:03d}" for i in range(120)][::-1]})
+    indice = IndiceSkusVendas(df)
+    achado = indice.buscar("77")
+    assert achado["skus"] == [f"77{i:03d}" for i in range(LIMITE_SKUS_PREFIXO)]
+    assert achado["vendas"].tolist() == sorted(119 - i for i in range(LIMITE_SKUS_PREFIXO))
+    assert len(indice.buscar("77", limite_skus=3)["vendas"]) == 3
+    assert indice.buscar("771")["skus"] == [f"77{i}" for i in range(100, 120)]
+
+
+def test_sem_colunas_de_sku_e_anuncio():
+    indice = IndiceSkusVendas(pd.DataFrame({"Estado": ["Entregue"] * 3}))
+    assert indice.total_linhas == 3
+    assert len(indice.buscar("3990")["todas"]) == 0
+
+
+# === PARIDADE COM A VARREDURA ===
+def test_casos_conhecidos_iguais_a_varredura(relatorio):
+    df, indice = relatorio
+    for texto in ["3990", "3990C2", "3888", "3937", "390", "39", "3", "4000", "MLB100", "mlb300", "x", "Z",
+                  " 3906 ", "3888-3990C2", "3888-3937", "--"]:
+        assert_busca_igual(indice, df, texto)
+        assert_busca_igual(indice, df, texto, prefixo=False)
+
+
+@pytest.mark.parametrize("semente", range(8))
+def test_paridade_com_a_varredura_em_relatorio_aleatorio(semente):
+    rng = np.random.default_rng(semente)
+    base = [str(v) for v in rng.integers(100, 4000, 40)]
+    skus = []
+    for _ in range(400):
+        sorteio = rng.random()
+        if sorteio < 0.5:
+            skus.append(rng.choice(base))
+        elif sorteio < 0.7:
+            skus.append(f"{rng.choice(base)}C{rng.integers(1, 14)}")
+        elif sorteio < 0.9:
+            partes = rng.choice(base + [f"{b}c2" for b in base[:5]], rng.integers(2, 4))
+            skus.append(rng.choice(["-", "–", "--"]).join(partes))
+        else:
+            skus.append(rng.choice(["", None, "0", "-", "ABC", " 12 "]))
+    df = pd.DataFrame({
+        "SKU": pd.Series(skus, dtype=object).astype("category" if semente % 2 else object),
+        "Anuncio": [f"MLB{rng.integers(1, 30)}" for _ in range(400)],
+    })
+    indice = IndiceSkusVendas(df)
+
+    textos = base[:10] + [b[:2] for b in base[:10]] + [b[:1] for b in base[:5]] + ["MLB7", "3", "C2", "ABC"]
+    for texto in textos:
+        assert_busca_igual(indice, df, texto)
+    assert_busca_igual(indice, df, "1", limite_skus=4)
+
+
+# === RESUMO POR SKU ===
+def test_resumo_por_sku_sem_linhas_mae():
+    df = pd.DataFrame({
+        "Estado": ["Entregue", "Pacote de 2 produtos", "Entregue", "Entregue"],
+        "SKU": ["3990", "3990-3888", "3990", "3888"],
+        "Unidades": [1, 2, 3, 1],
+        "Valor_Venda": [10.0, 99.0, 30.0, 5.0],
+        "Lucro_Real": [2.0, 50.0, 6.0, 1.0],
+        "Margem_Liquida_%": [20.0, 0.0, np.inf, 20.0],
+    })
+    resumo = resumo_por_sku(df, [0, 1, 2, 3], "Unidades")
+    assert resumo["SKU"].tolist() == ["3990", "3888"]
+    assert resumo["Vendas"].tolist() == [2, 1]
+    assert resumo["Unidades"].tolist() == [4, 1]
+    assert resumo["Receita"].tolist() == [40.0, 5.0]
+    assert resumo["Margem_Media_%"].tolist() == [20.0, 20.0]
+    assert resumo_por_sku(df, [1], "Unidades").empty
@@ -0,0 +1,96 @@
+# tests/test_normalizacao.py
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.normalizacao import formatar_vendas, normalizar_skus_custos
+
+
+# === CÓPIA CONGELADA DA VERSÃO ORIGINAL (APPLY LINHA A LINHA) ===
+# Referência para a paridade: não alterar junto com utils/normalizacao.py.
+def normalizar_sku_custos_original(v):
+    if pd.isna(v):
+        return ""
+    s = str(v).strip()
+    s = re.sub(r"[\u2010\u2011\u2012\u2013\u2014\u2015]", "-", s)
+    s = re.sub(r"[^0-9A-Za-z\-]", "", s)
+    s = re.sub(r"-{2,}", "-", s)
+    s = s.strip("-")
+    return s
+
+
+def formatar_venda_original(valor):
+    if pd.isna(valor):
+        return ""
+    return re.sub(r"[^\d]", "", str(valor))
+
+
+def assert_igual_ao_apply(vetorizada, original, serie):
+    esperado = serie.apply(original)
+    resultado = vetorizada(serie)
+    assert resultado.index.equals(serie.index)
+    assert resultado.tolist() == esperado.tolist()
+
+
+# === CASOS DE BORDA ===
+SKUS_BORDA = [
+    "3990", " 3990 ", "\t3990\n", "03990", "3990C2", "3990c12", "3990 C2",
+    # SKU numérico lido como float / int (e o mesmo número como texto)
+    123.0, 1050, 1050.0, "1050.0", "123.0", 3.5, -7, 1e20,
+    # Hífens: comum, Unicode, duplicados, nas bordas, com espaços
+    "3888-3937", "3888–3937", "3888—3937‐4297", "3888--3937", "-3888-3937-", "3888 - 3937",
+    "‑‑", "--", "-",
+    # Sobras que a regra remove
+    "SKU#12/34", "ação-12", "12_34", "1.234,56",
+    # Vazios
+    "", "   ", None, np.nan, pd.NA, "nan", "None",
+]
+
+VENDAS_BORDA = [
+    "#2000009741628937", "2000009741628937", 2000009741628937, 2000009741628937.0, "2.000009741628937e+15",
+    " #2000-0097 ", "Venda 12", "abc", "", None, np.nan, pd.NA, "nan", 0, 12.5,
+]
+
+
+@pytest.mark.parametrize("dtype", [object, "string"])
+def test_skus_custos_casos_de_borda(dtype):
+    serie = pd.Series(SKUS_BORDA, dtype=object)
+    if dtype == "string":
+        serie = serie[serie.map(lambda v: isinstance(v, str) or pd.isna(v))].astype("string")
+    assert_igual_ao_apply(normalizar_skus_custos, normalizar_sku_custos_original, serie)
+
+
+def test_skus_custos_valores_conhecidos():
+    resultado = normalizar_skus_custos(pd.Series([" 3888–3937 ", 123.0, "3990C2", "--", None]))
+    assert resultado.tolist() == ["3888-3937", "1230", "3990C2", "", ""]
+
+
+def test_skus_custos_coluna_float():
+    # Coluna inteira numérica (planilha com SKUs só de dígitos lidos como número)
+    serie = pd.Series([3990.0, 1050.0, np.nan, 3990.0], index=[5, 1, 9, 2])
+    assert_igual_ao_apply(normalizar_skus_custos, normalizar_sku_custos_original, serie)
+
+
+def test_vendas_casos_de_borda():
+    assert_igual_ao_apply(formatar_vendas, formatar_venda_original, pd.Series(VENDAS_BORDA, dtype=object))
+    assert formatar_vendas(pd.Series(["#2000009741628937", None])).tolist() == ["2000009741628937", ""]
+
+
+def test_vendas_coluna_inteira_e_float():
+    for serie in (pd.Series([2000009741628937, 17]), pd.Series([1.0, np.nan, 2.5])):
+        assert_igual_ao_apply(formatar_vendas, formatar_venda_original, serie)
+
+
+@pytest.mark.parametrize("semente", range(15))
+def test_paridade_valores_aleatorios(semente):
+    rng = np.random.default_rng(semente)
+    pecas = ["3990", "0", "12", "C2", "c", "-", "–", "—", " ", "--", "#", ".", ",", "/", "x", "ç", "\t"]
+    textos = ["".join(rng.choice(pecas, rng.integers(0, 7))) for _ in range(300)]
+    valores = textos + list(rng.choice(np.array(SKUS_BORDA + VENDAS_BORDA, dtype=object), 60))
+    valores += [float(v) for v in rng.integers(0, 10**6, 20)] + [int(v) for v in rng.integers(0, 10**6, 20)]
+    serie = pd.Series(valores, dtype=object).sample(frac=1, random_state=semente)
+
+    assert_igual_ao_apply(normalizar_skus_custos, normalizar_sku_custos_original, serie)
+    assert_igual_ao_apply(formatar_vendas, formatar_venda_original, serie)
@@ -0,0 +1,370 @@
+# tests/test_pacotes.py
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from relatorio_falso import gerar_relatorio
+from utils.pacotes import combinar_sku_produto_pacotes, ratear_embalagem, validar_pacotes
+from utils.pipeline import normalizar_vendas, processar_vendas
+
+
+# === CÓPIA CONGELADA DA VERSÃO ORIGINAL (LAÇOS POR PACOTE) ===
+# Referência para a paridade: não alterar junto com utils/pacotes.py.
+# Do bloco de pacotes até a combinação de SKUs/títulos; st.warning vira aviso.
+def calcular_tarifa_fixa_unit(preco_unit):
+    if preco_unit < 12.5:
+        return round(preco_unit * 0.5, 2)
+    elif preco_unit < 30:
+        return 6.25
+    elif preco_unit < 50:
+        return 6.50
+    elif preco_unit < 79:
+        return 6.75
+    else:
+        return 0.0
+
+
+def calcular_percentual(tipo_anuncio):
+    tipo = str(tipo_anuncio).strip().lower()
+    if "premium" in tipo:
+        return 0.17
+    elif "clássico" in tipo or "classico" in tipo:
+        return 0.12
+    return 0.12
+
+
+def combinar_original(df, mask_mae):
+    for i, row in df.loc[mask_mae].iterrows():
+        estado = str(row.get("Estado", ""))
+        match = re.search(r"Pacote de (\d+) produtos", estado, flags=re.IGNORECASE)
+        if not match:
+            continue
+        qtd = int(match.group(1))
+        idx_inicio = i + 1
+        idx_fim = i + 1 + qtd
+        if idx_fim > len(df):
+            continue
+        subset = df.iloc[idx_inicio : idx_fim].copy()
+        if subset.empty:
+            continue
+        skus = subset["SKU"].astype(str).replace("nan", "").unique().tolist()
+        produtos = subset["Produto"].astype(str).replace("nan", "").unique().tolist()
+        skus_formatados = [s for s in skus if s and s != "0"]
+        sku_concat = "-".join(skus_formatados)
+        if len(produtos) > 2:
+            produto_concat = f"{produtos[0]} + {len(produtos)-1} outros"
+        else:
+            produto_concat = " + ".join([p for p in produtos if p])
+        if sku_concat:
+            df.loc[i, "SKU"] = sku_concat
+        if produto_concat:
+            df.loc[i, "Produto"] = produto_concat
+    return df
+
+
+def ratear_embalagem_original(df, custo_embalagem):
+    mask_mae = df["Estado"].astype(str).str.contains("Pacote de", case=False, na=False)
+    mask_filho = df["Origem_Pacote"].astype(str).str.endswith("-PACOTE", na=False)
+    for idx in df.loc[mask_mae].index:
+        venda_pai = df.loc[idx, "Venda"]
+        filhos = df[df["Origem_Pacote"] == f"{venda_pai}-PACOTE"]
+        if not filhos.empty:
+            qtd = len(filhos)
+            custo_unit = round(float(custo_embalagem) / qtd, 2)
+            df.loc[filhos.index, "Custo_Embalagem"] = custo_unit
+            df.loc[idx, "Custo_Embalagem"] = round(custo_unit * qtd, 2)
+        else:
+            df.loc[idx, "Custo_Embalagem"] = round(float(custo_embalagem), 2)
+    df.loc[~mask_mae & ~mask_filho, "Custo_Embalagem"] = round(float(custo_embalagem), 2)
+    return df
+
+
+def validar_pacotes_original(df):
+    mask_filho = df["Origem_Pacote"].astype(str).str.endswith("-PACOTE", na=False)
+    df["Tarifa_Validada_ML"] = ""
+    for pacote in df.loc[mask_filho, "Origem_Pacote"].unique():
+        if not isinstance(pacote, str):
+            continue
+        venda_pai_id = pacote.split("-")[0]
+        pai = df[df["Venda"].astype(str).eq(venda_pai_id)]
+        filhos = df[df["Origem_Pacote"] == pacote]
+        if not pai.empty:
+            soma_filhas_tarifas = filhos["Tarifa_Total_R$"].sum() + filhos["Tarifa_Envio"].sum()
+            tarifa_pai_ml_reportada = pai["Tarifa_Venda"].iloc[0] + abs(pai["Tarifa_Envio"].iloc[0])
+            df.loc[df["Origem_Pacote"] == pacote, "Tarifa_Validada_ML"] = "✔️" if abs(soma_filhas_tarifas - tarifa_pai_ml_reportada) < 1.01 else "❌"
+    return df
+
+
+def processar_pacotes_original(df, coluna_unidades, custo_embalagem):
+    avisos = []
+    for col in ["Tarifa_Percentual_%", "Tarifa_Fixa_R$", "Tarifa_Total_R$",
+                "Origem_Pacote", "Valor_Item_Total", "Custo_Embalagem", "Tarifa_Venda_Calculada"]:
+        if col not in df.columns:
+            df[col] = None
+
+    df_pacotes = df[df["Estado"].astype(str).str.contains("Pacote de", case=False, na=False)].copy()
+    indices_pacotes_filhos = []
+
+    for i, row in df_pacotes.iterrows():
+        estado = str(row.get("Estado", ""))
+        match = re.search(r"Pacote de (\d+) produtos", estado, flags=re.IGNORECASE)
+        if not match:
+            df.loc[i, "Origem_Pacote"] = None
+            continue
+        qtd = int(match.group(1))
+        idx_inicio = i + 1
+        idx_fim = i + 1 + qtd
+        if idx_fim > len(df):
+            avisos.append(f"⚠️ Pacote da venda {row.get('Venda', 'N/A')} na linha {i+6} está incompleto e foi ignorado.")
+            continue
+        subset = df.iloc[idx_inicio : idx_fim].copy()
+        if subset.empty:
+            continue
+
+        total_recebido_pacote = float(row.get("Valor_Recebido", 0) or 0)
+        frete_total_pacote = abs(float(row.get("Tarifa_Envio", 0) or 0))
+        subset["Preco_Unitario_Item"] = pd.to_numeric(subset["Preco_Unitario"], errors="coerce").fillna(0)
+        soma_precos = subset["Preco_Unitario_Item"].sum()
+        total_unidades_pacote = subset[coluna_unidades].sum() or 1
+        total_tarifa_percentual_acumulada = 0
+        total_tarifa_fixa_acumulada = 0
+        custo_embalagem_unit = round(float(custo_embalagem) / qtd, 2)
+
+        for j in subset.index:
+            preco_unit = float(subset.loc[j, "Preco_Unitario_Item"] or 0)
+            tipo_anuncio = str(subset.loc[j, "Tipo_Anuncio"]).lower()
+            unidades_item = subset.loc[j, coluna_unidades]
+            valor_item_total = preco_unit * unidades_item
+            perc = calcular_percentual(tipo_anuncio)
+            tarifa_fixa = calcular_tarifa_fixa_unit(preco_unit)
+            tarifa_percentual = round(valor_item_total * perc, 2)
+            tarifa_fixa_total_item = round(tarifa_fixa * unidades_item, 2)
+            tarifa_total_calculada = round(tarifa_percentual + tarifa_fixa_total_item, 2)
+            proporcao_venda = (preco_unit / soma_precos) if soma_precos else 0
+            valor_recebido_item = round(total_recebido_pacote * proporcao_venda, 2)
+            proporcao_unidades = unidades_item / total_unidades_pacote
+            frete_item = round(frete_total_pacote * proporcao_unidades, 2)
+
+            df.loc[j, "Valor_Venda"] = valor_item_total
+            df.loc[j, "Valor_Recebido"] = valor_recebido_item
+            df.loc[j, "Tarifa_Percentual_%"] = perc * 100
+            df.loc[j, "Tarifa_Fixa_R$"] = tarifa_fixa
+            df.loc[j, "Tarifa_Venda"] = tarifa_percentual
+            df.loc[j, "Tarifa_Venda_Calculada"] = tarifa_percentual
+            df.loc[j, "Tarifa_Total_R$"] = tarifa_total_calculada
+            df.loc[j, "Tarifa_Envio"] = frete_item
+            df.loc[j, "Custo_Embalagem"] = custo_embalagem_unit
+            df.loc[j, "Origem_Pacote"] = f"{row['Venda']}-PACOTE"
+            df.loc[j, "Tipo_Anuncio"] = "Agrupado (Item)"
+            indices_pacotes_filhos.append(j)
+            total_tarifa_percentual_acumulada += tarifa_percentual
+            total_tarifa_fixa_acumulada += tarifa_fixa_total_item
+
+        df.loc[i, "Tipo_Anuncio"] = "Agrupado (Pacotes)"
+        df.loc[i, "Tarifa_Venda"] = round(total_tarifa_percentual_acumulada, 2)
+        df.loc[i, "Tarifa_Total_R$"] = round(total_tarifa_percentual_acumulada + total_tarifa_fixa_acumulada, 2)
+        df.loc[i, "Custo_Embalagem"] = round(float(custo_embalagem), 2)
+        df.loc[i, "Tarifa_Percentual_%"] = None
+        df.loc[i, "Tarifa_Fixa_R$"] = None
+        df.loc[i, "Origem_Pacote"] = "PACOTE"
+
+    mask_unitario = df.index.difference(df_pacotes.index).difference(indices_pacotes_filhos)
+    for i in mask_unitario:
+        row = df.loc[i]
+        preco_unit = float(row.get("Preco_Unitario", 0) or 0)
+        tipo_anuncio = str(row.get("Tipo_Anuncio", "")).lower()
+        unidades_item = row.get(coluna_unidades, 1)
+        valor_item_total = row["Valor_Venda"]
+        perc = calcular_percentual(tipo_anuncio)
+        tarifa_fixa = calcular_tarifa_fixa_unit(preco_unit)
+        tarifa_percentual = round(valor_item_total * perc, 2)
+        tarifa_fixa_total_item = round(tarifa_fixa * unidades_item, 2)
+        tarifa_total_calculada = round(tarifa_percentual + tarifa_fixa_total_item, 2)
+        df.loc[i, "Tarifa_Percentual_%"] = perc * 100
+        df.loc[i, "Tarifa_Fixa_R$"] = tarifa_fixa
+        df.loc[i, "Tarifa_Venda_Calculada"] = tarifa_percentual
+        df.loc[i, "Tarifa_Total_R$"] = tarifa_total_calculada
+        df.loc[i, "Custo_Embalagem"] = round(float(custo_embalagem), 2)
+
+    for col_fix in ["Tarifa_Venda", "Tarifa_Fixa_R$", "Tarifa_Total_R$", "Tarifa_Envio", "Custo_Embalagem", "Tarifa_Venda_Calculada"]:
+        if col_fix in df.columns:
+            df[col_fix] = pd.to_numeric(df[col_fix], errors="coerce").fillna(0).abs().round(2)
+
+    df = ratear_embalagem_original(df, custo_embalagem)
+    df = validar_pacotes_original(df)
+    mask_mae = df["Estado"].astype(str).str.contains("Pacote de", case=False, na=False)
+
+    df = combinar_original(df, mask_mae)
+    # Preenchimento que o resumo por tipo de anúncio fazia depois, no mesmo df
+    df["Tipo_Anuncio"] = (
+        df["Tipo_Anuncio"].astype(str).str.strip().replace(["nan", "None", ""], "Unitário/Simples")
+    )
+    return df, avisos
+
+
+COLUNAS_PACOTES = [
+    "Valor_Venda", "Valor_Recebido", "Tarifa_Venda", "Tarifa_Envio", "Tarifa_Percentual_%", "Tarifa_Fixa_R$",
+    "Tarifa_Total_R$", "Tarifa_Venda_Calculada", "Custo_Embalagem", "Origem_Pacote", "Tipo_Anuncio",
+    "Tarifa_Validada_ML", "SKU", "Produto",
+]
+
+
+def assert_colunas_iguais(novo, original, colunas):
+    for col in colunas:
+        a, b = novo[col].astype(object), original[col].astype(object)
+        numericos = pd.to_numeric(a, errors="coerce"), pd.to_numeric(b, errors="coerce")
+        if a.map(lambda v: isinstance(v, str)).any() or b.map(lambda v: isinstance(v, str)).any():
+            # Texto: None e NaN contam como vazio (a versão original guardava None)
+            pd.testing.assert_series_equal(a.where(a.notna(), None), b.where(b.notna(), None), obj=col)
+        else:
+            pd.testing.assert_series_equal(*numericos, check_dtype=False, obj=col)
+
+
+@pytest.mark.parametrize("semente", range(20))
+@pytest.mark.parametrize("custo_embalagem", [3.0, 10.0])
+def test_paridade_com_os_lacos_originais(semente, custo_embalagem):
+    bruto = gerar_relatorio(semente)
+    df, coluna_unidades = normalizar_vendas(bruto.copy())
+    original, avisos_original = processar_pacotes_original(df.copy(), coluna_unidades, custo_embalagem)
+    novo, info = processar_vendas(df.copy(), coluna_unidades, custo_embalagem)
+
+    assert_colunas_iguais(novo, original, COLUNAS_PACOTES)
+    assert info["avisos"] == avisos_original
+
+
+def test_relatorio_cobre_os_casos_de_borda():
+    estados = pd.concat([gerar_relatorio(s)["Estado"] for s in range(20)])
+    assert estados.eq("Pacote de 0 produtos").any()
+    assert estados.eq("Pacote de 9 produtos").any()
+    assert estados.eq("Pacote de vários produtos").any()
+    unidades = pd.concat([gerar_relatorio(s)["Unidades"] for s in range(20)])
+    assert unidades.eq("0").any()
+    validacao = pd.concat([
+        processar_vendas(*normalizar_vendas(gerar_relatorio(s)), 3.0)[0]["Tarifa_Validada_ML"].astype(str)
+        for s in range(20)
+    ])
+    assert validacao.eq("✔️").any() and validacao.eq("❌").any()
+
+
+# === SKU E TÍTULO DAS LINHAS MÃE ===
+def test_combinar_sku_produto_casos_conhecidos():
+    df = pd.DataFrame({
+        "Estado": ["Pacote de 3 produtos", "Entregue", "Entregue", "Entregue",
+                   "Pacote de 2 produtos", "Entregue", "Entregue",
+                   "Pacote de 0 produtos", "Pacote de 4 produtos", "Entregue"],
+        "SKU": ["", "10", "0", "10", "", np.nan, "0", "", "", "55"],
+        "Produto": ["", "Capa", "Cabo", "Película", "", "Capa", np.nan, "", "", "Cabo"],
+    })
+    esperado = combinar_original(df.copy(), df["Estado"].str.contains("Pacote de"))
+    resultado = combinar_sku_produto_pacotes(df.copy())
+
+    pd.testing.assert_frame_equal(resultado, esperado)
+    assert resultado.loc[0, "SKU"] == "10"
+    assert resultado.loc[0, "Produto"] == "Capa + 2 outros"
+    assert resultado.loc[4, "SKU"] == "" and resultado.loc[4, "Produto"] == "Capa"
+
+
+@pytest.mark.parametrize("semente", range(10))
+def test_combinar_sku_produto_paridade(semente):
+    df, _ = normalizar_vendas(gerar_relatorio(semente, blocos=40))
+    mask_mae = df["Estado"].astype(str).str.contains("Pacote de", case=False, na=False)
+    esperado = combinar_original(df.copy(), mask_mae)
+    resultado = combinar_sku_produto_pacotes(df.copy())
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+@pytest.mark.filterwarnings("ignore:Setting an item of incompatible dtype:FutureWarning")
+def test_combinar_sku_numerico_vira_texto_na_mae():
+    df = pd.DataFrame({"Estado": ["Pacote de 2 produtos", "Entregue", "Entregue"],
+                       "SKU": [np.nan, 3990.0, 1001.0], "Produto": ["", "A", "B"]})
+    esperado = combinar_original(df.copy(), df["Estado"].str.contains("Pacote de"))
+    resultado = combinar_sku_produto_pacotes(df.copy())
+    assert resultado.loc[0, "SKU"] == esperado.loc[0, "SKU"] == "3990.0-1001.0"
+    assert resultado["SKU"].tolist()[1:] == [3990.0, 1001.0]
+
+
+# === RATEIO DA EMBALAGEM E VALIDAÇÃO DOS PACOTES ===
+def pacotes_montados():
+    """
+    Linhas já alocadas, com os casos que as agregações precisam cobrir:
+    pacote com 3 e com 1 filho, mãe sem filhos, filhos órfãos (venda mãe
+    inexistente), venda mãe repetida (vale a 1ª linha) e venda simples.
+    """
+    linhas = [
+        # Estado, Venda, Origem_Pacote, Tarifa_Venda, Tarifa_Envio, Tarifa_Total_R$
+        ("Pacote de 3 produtos", "100", "PACOTE", 20.0, -10.0, 20.0),
+        ("Entregue", "", "100-PACOTE", 5.0, 3.33, 8.0),
+        ("Entregue", "", "100-PACOTE", 5.0, 3.33, 7.0),
+        ("Entregue", "", "100-PACOTE", 5.0, 3.34, 5.0),
+        ("Pacote de 1 produtos", "200", "PACOTE", 10.0, 0.0, 10.0),
+        ("Entregue", "", "200-PACOTE", 12.5, 0.0, 12.5),
+        ("Pacote de 2 produtos", "300", "PACOTE", 8.0, 0.0, 8.0),
+        ("Entregue", "999", "999-PACOTE", 1.0, 1.0, 1.0),
+        ("Entregue", "", "888-PACOTE", 1.0, 1.0, 1.0),
+        ("Pacote de 2 produtos", "400", "PACOTE", 4.0, -1.0, 4.0),
+        ("Entregue", "", "400-PACOTE", 2.0, 0.5, 2.0),
+        ("Entregue", "", "400-PACOTE", 2.0, 0.5, 2.0),
+        ("Entregue", "400", None, 50.0, -50.0, 0.0),
+        ("Entregue", "500", "", 7.0, -2.0, 7.0),
+    ]
+    df = pd.DataFrame(linhas, columns=["Estado", "Venda", "Origem_Pacote", "Tarifa_Venda", "Tarifa_Envio",
+                                       "Tarifa_Total_R$"])
+    df["Custo_Embalagem"] = 0.0
+    return df
+
+
+@pytest.mark.parametrize("custo_embalagem", [0, 3.0, 10.0, 1.0, 0.05])
+def test_ratear_embalagem_igual_ao_laco_original(custo_embalagem):
+    esperado = ratear_embalagem_original(pacotes_montados(), custo_embalagem)
+    resultado = ratear_embalagem(pacotes_montados(), custo_embalagem)
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+def test_ratear_embalagem_valores_conhecidos():
+    custos = ratear_embalagem(pacotes_montados(), 10.0)["Custo_Embalagem"].tolist()
+    # Pacote 100: 3 filhos de 3,33 e a mãe com a soma rateada (9,99)
+    assert custos[:4] == [9.99, 3.33, 3.33, 3.33]
+    # Pacote 200 com um filho; mãe 300 sem filhos fica com o custo cheio
+    assert custos[4:7] == [10.0, 10.0, 10.0]
+    # Órfãos não são tocados; venda simples recebe o custo cheio
+    assert custos[7:9] == [0.0, 0.0]
+    assert custos[9:] == [10.0, 5.0, 5.0, 10.0, 10.0]
+
+
+def test_validar_pacotes_igual_ao_laco_original():
+    esperado = validar_pacotes_original(pacotes_montados())
+    resultado = validar_pacotes(pacotes_montados())
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+
+def test_validar_pacotes_valores_conhecidos():
+    status = validar_pacotes(pacotes_montados())["Tarifa_Validada_ML"].tolist()
+    # 100: filhos 20 + 10 de frete contra 20 + |-10| da mãe → ✔️
+    assert status[1:4] == ["✔️"] * 3
+    # 200: 12,5 contra 10 → ❌
+    assert status[5] == "❌"
+    # 999 é a própria linha (venda existe); 888 não existe → sem status
+    assert status[7:9] == ["✔️", ""]
+    # 400: a 1ª linha da venda (a mãe, 4 + 1) vale, não a repetida (50 + 50)
+    assert status[10:12] == ["✔️"] * 2
+    # Mães e vendas simples ficam vazias
+    assert [status[i] for i in (0, 4, 6, 9, 12, 13)] == [""] * 6
+
+
+def test_validar_pacotes_tolerancia():
+    # Pacote 100 com 1,00 a mais que a mãe: passa no padrão (< 1,01), não com 0,5
+    df = pacotes_montados()
+    df.loc[1, "Tarifa_Total_R$"] += 1.0
+    assert validar_pacotes(df.copy())["Tarifa_Validada_ML"].iloc[1] == "✔️"
+    assert validar_pacotes(df.copy(), tolerancia=0.5)["Tarifa_Validada_ML"].iloc[1] == "❌"
+    # Diferença igual à tolerância não passa (comparação estrita, como no original)
+    assert validar_pacotes(df.copy(), tolerancia=1.0)["Tarifa_Validada_ML"].iloc[1] == "❌"
+    assert validar_pacotes(df.copy(), tolerancia=3)["Tarifa_Validada_ML"].iloc[5] == "✔️"
+
+
+def test_validar_pacotes_sem_filhos():
+    df = pacotes_montados()
+    df["Origem_Pacote"] = "PACOTE"
+    assert validar_pacotes(df)["Tarifa_Validada_ML"].eq("").all()
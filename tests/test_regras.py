@@ -0,0 +1,144 @@
+# tests/test_regras.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from relatorio_falso import gerar_relatorio
+from utils.auditoria import auditar_vendas
+from utils.pipeline import (
+    REGRAS_STATUS,
+    STATUS_CANCELAMENTO,
+    STATUS_FORA_MARGEM,
+    STATUS_NORMAL,
+    STATUS_PACOTE,
+    calcular_resultados,
+    normalizar_vendas,
+)
+from utils.regras import avaliar_regras, carregar_regras, validar_regras
+
+
+# === CÓPIA CONGELADA DA VERSÃO ORIGINAL (IF/ELIF POR LINHA) ===
+# Referência para a paridade: não alterar junto com utils/regras.py.
+def status_original(df, margem_limite):
+    status = df.apply(
+        lambda x: "🟦 Cancelamento Correto" if x["Cancelamento_Correto"]
+        else "⚠️ Acima da Margem" if x["%Diferença"] > margem_limite
+        else "✅ Normal", axis=1
+    )
+    # O ajuste final dos pacotes sobrescrevia o Status das linhas mãe
+    mask_pacotes = df["Estado"].str.contains("Pacote de", case=False, na=False)
+    status[mask_pacotes] = "🔹 Pacote Agrupado (Somente Controle)"
+    return status
+
+
+def linhas_status(estados, cancelados, diferencas):
+    """Frame mínimo para calcular_resultados (sem custos de produto)."""
+    n = len(estados)
+    return pd.DataFrame({
+        "Estado": estados,
+        "Cancelamento_Correto": cancelados,
+        "%Diferença": diferencas,
+        "Valor_Venda": np.full(n, 100.0),
+        "Lucro_Bruto": np.full(n, 80.0),
+        "Custo_Embalagem": np.full(n, 3.0),
+    })
+
+
+def status_calculado(df, margem_limite, regras=REGRAS_STATUS):
+    resultado = calcular_resultados(df.copy(), margem_limite, 10.0, False, regras)
+    return resultado["Status"].astype(str)
+
+
+# === ORDEM DAS REGRAS ===
+def test_prioridade_quando_varias_regras_casam():
+    df = linhas_status(
+        ["Pacote de 2 produtos", "Pacote de 2 produtos", "Pacote de 2 produtos", "Entregue", "Entregue",
+         "Entregue", "Entregue"],
+        [True, False, True, True, False, False, True],
+        [50.0, 50.0, 0.0, 50.0, 50.0, 0.0, 0.0],
+    )
+    assert status_calculado(df, 20).tolist() == [
+        # Pacote vence cancelamento e margem; cancelamento vence margem
+        STATUS_PACOTE, STATUS_PACOTE, STATUS_PACOTE, STATUS_CANCELAMENTO,
+        STATUS_FORA_MARGEM, STATUS_NORMAL, STATUS_CANCELAMENTO,
+    ]
+    pd.testing.assert_series_equal(status_calculado(df, 20), status_original(df, 20), check_names=False)
+
+
+@pytest.mark.parametrize("margem_limite", [0, 15.5, 20, 100])
+def test_limite_da_margem_e_estrita(margem_limite):
+    diferencas = [margem_limite - 0.01, margem_limite, margem_limite + 0.01, np.nan, -5.0]
+    df = linhas_status(["Entregue"] * 5, [False] * 5, diferencas)
+    pd.testing.assert_series_equal(
+        status_calculado(df, margem_limite), status_original(df, margem_limite), check_names=False
+    )
+    assert status_calculado(df, margem_limite).iloc[1] == STATUS_NORMAL
+
+
+@pytest.mark.parametrize("semente", range(10))
+def test_paridade_com_o_if_elif_em_linhas_aleatorias(semente):
+    rng = np.random.default_rng(semente)
+    n = 600
+    estados = rng.choice(np.array(
+        ["Entregue", "Pacote de 3 produtos", "pacote de 1 produtos", "Cancelada", "Pacote de vários produtos",
+         None, ""], dtype=object), n)
+    cancelados = pd.Series(rng.random(n) < 0.3, dtype=object)
+    cancelados[rng.random(n) < 0.05] = None
+    margem_limite = [20, 15.5, 0][semente % 3]
+    diferencas = np.round(rng.uniform(-50, 120, n), 2)
+    diferencas[rng.random(n) < 0.1] = margem_limite
+    diferencas[rng.random(n) < 0.05] = np.nan
+
+    for tipo_estado in (object, "category"):
+        df = linhas_status(pd.Series(estados, dtype=tipo_estado), cancelados, diferencas)
+        pd.testing.assert_series_equal(
+            status_calculado(df, margem_limite), status_original(df, margem_limite), check_names=False
+        )
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_paridade_na_auditoria_completa(semente):
+    df = auditar_vendas(*normalizar_vendas(gerar_relatorio(semente, blocos=40)), margem_limite=15)["df"]
+    pd.testing.assert_series_equal(df["Status"].astype(str), status_original(df, 15), check_names=False)
+
+
+def test_ordem_da_tabela_define_a_prioridade():
+    df = linhas_status(["Pacote de 2 produtos", "Entregue"], [True, True], [50.0, 50.0])
+    invertidas = list(reversed(REGRAS_STATUS))
+    assert status_calculado(df, 20, invertidas).tolist() == [STATUS_FORA_MARGEM, STATUS_FORA_MARGEM]
+    assert status_calculado(df, 20, invertidas[1:]).tolist() == [STATUS_CANCELAMENTO, STATUS_CANCELAMENTO]
+
+
+def test_sem_regras_tudo_fica_no_padrao():
+    df = linhas_status(["Pacote de 2 produtos", "Entregue"], [True, False], [50.0, 0.0])
+    status = avaliar_regras(df, [], padrao=STATUS_NORMAL)
+    assert list(status) == [STATUS_NORMAL, STATUS_NORMAL]
+
+
+# === TABELA EM JSON ===
+def test_regra_de_percentual_e_coluna_ausente(tmp_path):
+    regras = [
+        {"status": "🚚 Frete Alto", "condicoes": [
+            {"coluna": "Tarifa_Envio", "percentual_de": "Valor_Venda", "operador": ">", "valor": 20}]},
+        {"status": "Sem coluna", "condicoes": [{"coluna": "Inexistente", "operador": ">", "valor": 0}]},
+    ] + REGRAS_STATUS
+    caminho = tmp_path / "regras.json"
+    caminho.write_text(json.dumps(regras, ensure_ascii=False), encoding="utf-8")
+    regras = carregar_regras(caminho, REGRAS_STATUS)
+
+    df = linhas_status(["Entregue"] * 4, [False, False, True, False], [0.0, 50.0, 0.0, 0.0])
+    df["Tarifa_Envio"] = [20.0, 21.0, 30.0, np.nan]
+    df.loc[3, "Valor_Venda"] = 0.0
+    assert status_calculado(df, 20, regras).tolist() == [
+        STATUS_NORMAL, "🚚 Frete Alto", "🚚 Frete Alto", STATUS_NORMAL,
+    ]
+    assert carregar_regras(tmp_path / "nao_existe.json", REGRAS_STATUS) is REGRAS_STATUS
+
+
+def test_regra_invalida():
+    with pytest.raises(ValueError, match="operador desconhecido"):
+        validar_regras([{"status": "X", "condicoes": [{"coluna": "A", "operador": "=~", "valor": 1}]}])
+    with pytest.raises(ValueError, match="Regra 2"):
+        validar_regras(REGRAS_STATUS[:1] + [{"status": "X", "condicoes": [{"coluna": "A", "operador": ">"}]}])
@@ -0,0 +1,184 @@
+# tests/test_sku_utils.py
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sku_utils import SkuCostIndex, aplicar_custos
+
+
+# === CÓPIA CONGELADA DA VERSÃO ORIGINAL (LAÇO LINHA A LINHA) ===
+# Referência para a paridade: não alterar junto com sku_utils.aplicar_custos.
+def aplicar_custos_original(df, df_custos, coluna_unidades):
+    df_custos = df_custos.copy()
+    df_custos["SKU"] = df_custos["SKU"].astype(str).str.strip()
+    custos_map = dict(zip(df_custos["SKU"], df_custos["Custo_Produto"]))
+
+    def detectar_composto_cX(sku):
+        sku = sku.upper().strip()
+        match = re.match(r"^(\d+)[Cc]([2-9]|1[0-2])$", sku)
+        if match:
+            return match.group(1), int(match.group(2))
+        return None
+
+    custos_totais = []
+    custos_unitarios = []
+
+    for idx, row in df.iterrows():
+        sku = str(row.get("SKU", "")).strip()
+        tipo = str(row.get("Tipo_Anuncio", "")).lower()
+        unidades = row.get(coluna_unidades, 1)
+
+        if "agrupado (pacotes" in tipo:
+            custos_unitarios.append(0.0)
+            custos_totais.append(0.0)
+            continue
+
+        if sku in custos_map:
+            custo_unit = float(custos_map[sku])
+            custos_unitarios.append(custo_unit)
+            custos_totais.append(round(custo_unit * unidades, 2))
+            continue
+
+        composto = detectar_composto_cX(sku)
+        if composto:
+            base, mult = composto
+            if base in custos_map:
+                custo_unit = round(float(custos_map[base]) * mult, 2)
+                custos_unitarios.append(custo_unit)
+                custos_totais.append(round(custo_unit * unidades, 2))
+                continue
+
+        if "-" in sku:
+            partes = [p.strip() for p in sku.split("-") if p.strip()]
+            custo_total = 0
+            for p in partes:
+                comp = detectar_composto_cX(p)
+                if comp:
+                    base, mult = comp
+                    if base in custos_map:
+                        custo_total += float(custos_map[base]) * mult
+                        continue
+                if p in custos_map:
+                    custo_total += float(custos_map[p])
+
+            custo_total = round(custo_total * unidades, 2)
+            custo_unit_sku = round(custo_total / unidades, 2) if unidades else custo_total
+            custos_unitarios.append(custo_unit_sku)
+            custos_totais.append(custo_total)
+            continue
+
+        custos_unitarios.append(0.0)
+        custos_totais.append(0.0)
+
+    df["Custo_Produto_Unitario"] = custos_unitarios
+    df["Custo_Produto_Total"] = custos_totais
+    return df
+
+
+# === ENTRADAS ALEATÓRIAS ===
+TIPOS = ["Clássico", "Premium", "Agrupado (Pacotes)", "Agrupado (pacotes de 2)"]
+
+
+def gerar_custos(rng, quantidade=40):
+    skus = [str(s) for s in rng.choice(np.arange(1000, 9999), quantidade, replace=False)]
+    # Custos com 0 a 3 casas (3 casas força o arredondamento nos totais)
+    custos = [round(float(v), int(c)) for v, c in zip(rng.uniform(0.5, 300, quantidade), rng.integers(0, 4, quantidade))]
+    df = pd.DataFrame({"SKU": skus, "Custo_Produto": custos})
+    # SKU de kit cadastrado direto na planilha (tem prioridade sobre a explosão)
+    df.loc[len(df)] = [f"{skus[0]}-{skus[1]}", 12.34]
+    # SKU com espaços nas bordas (a planilha é normalizada com strip)
+    df.loc[len(df)] = [f" {skus[2]}C3 ", 99.99]
+    return df
+
+
+def gerar_sku(rng, base):
+    caso = rng.integers(0, 7)
+    sku = str(rng.choice(base))
+    if caso == 0:
+        return sku                                                 # direto
+    if caso == 1:
+        return f"{sku}{rng.choice(['C', 'c'])}{rng.integers(2, 13)}"  # composto C2..C12
+    if caso == 2:
+        return f"{sku}C{rng.choice([0, 1, 13, 20])}"              # fora de C2..C12
+    if caso == 3:
+        partes = [str(rng.choice(base)) for _ in range(rng.integers(2, 4))]
+        if rng.random() < 0.3:
+            partes[0] += f"C{rng.integers(2, 13)}"
+        return "-".join(partes)                                    # kit com hífen
+    if caso == 4:
+        return f"{rng.choice(base)}- {rng.choice(base)} -"         # hífen com sobras
+    if caso == 5:
+        return str(rng.integers(100000, 999999))                   # desconhecido
+    return f"  {sku} "                                             # espaços nas bordas
+
+
+def gerar_vendas(rng, custos, linhas=400):
+    base = list(custos["SKU"].str.strip()[:30]) + ["0000", "ABC"]
+    return pd.DataFrame({
+        "SKU": [gerar_sku(rng, base) for _ in range(linhas)],
+        "Tipo_Anuncio": rng.choice(TIPOS, linhas, p=[0.4, 0.4, 0.1, 0.1]),
+        "Unidades": rng.choice([0, 1, 1, 1, 2, 3, 7], linhas),
+    })
+
+
+def assert_custos_iguais(novo, antigo):
+    for coluna in ["Custo_Produto_Unitario", "Custo_Produto_Total"]:
+        np.testing.assert_array_equal(novo[coluna].to_numpy(dtype=float), antigo[coluna].to_numpy(dtype=float))
+
+
+@pytest.mark.parametrize("semente", range(20))
+def test_paridade_com_laco_original(semente):
+    rng = np.random.default_rng(semente)
+    custos = gerar_custos(rng)
+    vendas = gerar_vendas(rng, custos)
+
+    antigo = aplicar_custos_original(vendas.copy(), custos, "Unidades")
+    novo = aplicar_custos(vendas.copy(), custos, "Unidades")
+    assert_custos_iguais(novo, antigo)
+
+    # Índice reaproveitado e SKU categórico (como sai de processar_vendas) dão o mesmo resultado
+    indice = SkuCostIndex(custos)
+    assert_custos_iguais(aplicar_custos(vendas.copy(), None, "Unidades", indice=indice), antigo)
+    categorico = vendas.assign(SKU=vendas["SKU"].astype("category"))
+    assert_custos_iguais(aplicar_custos(categorico, None, "Unidades", indice=indice), antigo)
+
+
+def test_casos_conhecidos():
+    custos = pd.DataFrame({"SKU": ["3990", "3888", "3937", "3888-3937"], "Custo_Produto": [10.0, 4.5, 2.25, 5.0]})
+    vendas = pd.DataFrame({
+        "SKU": ["3990", "3990C2", "3937-3990C3", "3888-3937", "9999", "3990", "3937-3888"],
+        "Tipo_Anuncio": ["Clássico", "Premium", "Clássico", "Clássico", "Clássico", "Agrupado (Pacotes)", "Clássico"],
+        "Unidades": [2, 1, 2, 1, 1, 3, 0],
+    })
+    df = aplicar_custos(vendas.copy(), custos, "Unidades")
+    assert df["Custo_Produto_Unitario"].tolist() == [10.0, 20.0, 32.25, 5.0, 0.0, 0.0, 0.0]
+    assert df["Custo_Produto_Total"].tolist() == [20.0, 20.0, 64.5, 5.0, 0.0, 0.0, 0.0]
+    assert_custos_iguais(df, aplicar_custos_original(vendas.copy(), custos, "Unidades"))
+
+
+def test_sem_coluna_de_unidades_ou_tipo():
+    custos = pd.DataFrame({"SKU": ["1", "2"], "Custo_Produto": [1.5, 2.0]})
+    vendas = pd.DataFrame({"SKU": ["1", "2C2", "1-2", "x"]})
+    df = aplicar_custos(vendas.copy(), custos, "Unidades")
+    assert df["Custo_Produto_Total"].tolist() == [1.5, 4.0, 3.5, 0.0]
+    assert_custos_iguais(df, aplicar_custos_original(vendas.copy(), custos, "Unidades"))
+
+
+def test_linhas_recalcula_so_as_indicadas():
+    rng = np.random.default_rng(99)
+    custos = gerar_custos(rng)
+    vendas = gerar_vendas(rng, custos)
+    df = aplicar_custos(vendas.copy(), custos, "Unidades")
+
+    alterados = custos.copy()
+    alterados["Custo_Produto"] = alterados["Custo_Produto"] + 1
+    linhas = np.arange(0, len(df), 3)
+    aplicar_custos(df, None, "Unidades", indice=SkuCostIndex(alterados), linhas=linhas)
+
+    esperado_novo = aplicar_custos_original(vendas.copy(), alterados, "Unidades")
+    esperado_antigo = aplicar_custos_original(vendas.copy(), custos, "Unidades")
+    outras = np.setdiff1d(np.arange(len(df)), linhas)
+    assert_custos_iguais(df.iloc[linhas], esperado_novo.iloc[linhas])
+    assert_custos_iguais(df.iloc[outras], esperado_antigo.iloc[outras])
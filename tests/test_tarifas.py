@@ -0,0 +1,126 @@
+# tests/test_tarifas.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.tarifas import (
+    calcular_percentual_vetor,
+    calcular_tarifa_fixa_vetor,
+    calcular_tarifas,
+    carregar_tabela_tarifas,
+)
+
+
+# === CÓPIA CONGELADA DA VERSÃO ORIGINAL (IF/ELIF POR LINHA) ===
+# Referência para a paridade: não alterar junto com utils/tarifas.py.
+def calcular_tarifa_fixa_unit_original(preco_unit):
+    if preco_unit < 12.5:
+        return round(preco_unit * 0.5, 2)
+    elif preco_unit < 30:
+        return 6.25
+    elif preco_unit < 50:
+        return 6.50
+    elif preco_unit < 79:
+        return 6.75
+    else:
+        return 0.0
+
+
+def calcular_percentual_original(tipo_anuncio):
+    tipo = str(tipo_anuncio).strip().lower()
+    if "premium" in tipo:
+        return 0.17
+    elif "clássico" in tipo or "classico" in tipo:
+        return 0.12
+    return 0.12
+
+
+# === FAIXAS DA TARIFA FIXA ===
+LIMITES = [12.5, 30, 50, 79]
+
+
+@pytest.mark.parametrize("preco, esperado", [
+    (12.49, 6.25), (12.5, 6.25), (29.99, 6.25), (30, 6.50),
+    (49.99, 6.50), (50, 6.75), (78.99, 6.75), (79, 0.0), (0, 0.0),
+])
+def test_tarifa_fixa_no_limite_das_faixas(preco, esperado):
+    # O limite pertence à faixa de cima (preço < limite), como no if/elif
+    assert calcular_tarifa_fixa_vetor([preco])[0] == esperado
+
+
+def test_tarifa_fixa_vizinhos_dos_limites():
+    precos = []
+    for limite in LIMITES:
+        precos += [np.nextafter(limite, -np.inf), limite, np.nextafter(limite, np.inf), limite - 0.01, limite + 0.01]
+    precos = np.array(precos + [-1.0, np.nan, np.inf, 1e9])
+    esperado = [calcular_tarifa_fixa_unit_original(float(p)) for p in precos]
+    np.testing.assert_array_equal(calcular_tarifa_fixa_vetor(precos), esperado)
+
+
+def test_tarifa_fixa_percentual_arredonda_como_round():
+    # Todos os centavos da primeira faixa: metade dos preços terminados em 5 cai em ...,xx5
+    precos = np.round(np.arange(0, 1300) / 100, 2)
+    esperado = [calcular_tarifa_fixa_unit_original(float(p)) for p in precos]
+    np.testing.assert_array_equal(calcular_tarifa_fixa_vetor(precos), esperado)
+
+
+# === PERCENTUAL POR TIPO DE ANÚNCIO ===
+TIPOS = [
+    "Premium", "premium", " PREMIUM ", "Clássico", "clássico", "Classico", "CLÁSSICO", "Clássico Premium",
+    "Agrupado (Item)", "Agrupado (Pacotes)", "Unitário/Simples", "", None, np.nan, 17,
+]
+
+
+def test_percentual_por_tipo():
+    esperado = [calcular_percentual_original(t) for t in TIPOS]
+    np.testing.assert_array_equal(calcular_percentual_vetor(pd.Series(TIPOS, dtype=object)), esperado)
+    categorias = pd.Series(["Premium", "Clássico", "Premium", None], dtype="category")
+    np.testing.assert_array_equal(calcular_percentual_vetor(categorias), [0.17, 0.12, 0.17, 0.12])
+
+
+# === TODAS AS TARIFAS ===
+@pytest.mark.parametrize("semente", range(10))
+def test_calcular_tarifas_igual_ao_calculo_por_linha(semente):
+    rng = np.random.default_rng(semente)
+    n = 500
+    precos = np.concatenate([np.round(rng.uniform(0, 150, n - 20), 2), np.repeat(LIMITES, 5)])
+    unidades = rng.integers(0, 5, n)
+    tipos = pd.Series(rng.choice(np.array(TIPOS, dtype=object), n), dtype=object)
+    valores = precos * unidades
+
+    tarifas = calcular_tarifas(precos, tipos, unidades, valores)
+
+    for i in range(n):
+        perc = calcular_percentual_original(str(tipos.iat[i]).lower())
+        fixa = calcular_tarifa_fixa_unit_original(float(precos[i]))
+        # No laço original valor e unidades vinham do DataFrame como escalares numpy:
+        # estes round() eram os do numpy (só a tarifa fixa unitária usava float puro)
+        percentual = round(valores[i] * perc, 2)
+        fixa_total = round(fixa * unidades[i], 2)
+        assert tarifas["percentual"][i] == perc
+        assert tarifas["tarifa_fixa"][i] == fixa
+        assert tarifas["tarifa_percentual"][i] == percentual
+        assert tarifas["tarifa_fixa_total"][i] == fixa_total
+        assert tarifas["tarifa_total"][i] == round(percentual + fixa_total, 2)
+
+
+# === TABELA EM JSON ===
+def test_tabela_editada_fora_de_ordem(tmp_path):
+    tabela = {
+        "faixas_tarifa_fixa": [{"limite": 100, "valor": 5.0}, {"limite": 20, "percentual_preco": 0.25}],
+        "tarifa_fixa_acima": 1.5,
+        "percentuais_tipo_anuncio": [{"contem": "premium", "percentual": 0.2}],
+        "percentual_padrao": 0.1,
+    }
+    caminho = tmp_path / "tarifas.json"
+    caminho.write_text(json.dumps(tabela), encoding="utf-8")
+    tabela = carregar_tabela_tarifas(caminho)
+
+    assert [f["limite"] for f in tabela["faixas_tarifa_fixa"]] == [20, 100]
+    np.testing.assert_array_equal(
+        calcular_tarifa_fixa_vetor([10.0, 19.99, 20, 99.99, 100, 500], tabela),
+        [2.5, 5.0, 5.0, 5.0, 1.5, 1.5],
+    )
+    np.testing.assert_array_equal(calcular_percentual_vetor(["Premium", "Clássico"], tabela), [0.2, 0.1])
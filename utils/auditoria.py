@@ -0,0 +1,195 @@
+# utils/auditoria.py
+import numpy as np
+import pandas as pd
+
+from sku_utils import SkuCostIndex, aplicar_custos
+from utils.custos_google import MAPA_COLUNAS_CUSTOS, corrigir_valor
+from utils.fora_margem import RankingForaMargem
+from utils.normalizacao import normalizar_skus_custos
+from utils.pacotes import TOLERANCIA_VALIDACAO_PACOTE
+from utils.pipeline import (
+    REGRAS_STATUS,
+    calcular_metricas,
+    calcular_resultados,
+    ler_planilha_vendas,
+    normalizar_vendas,
+    preencher_tipos_anuncio,
+    processar_vendas,
+)
+
+# === AUDITORIA COMPLETA (SEM STREAMLIT) ===
+# As mesmas etapas da app, em funções que só recebem e devolvem DataFrames:
+# usadas pelo painel, pela linha de comando (auditoria_cli.py) e por benchmarks.
+
+PARAMETROS_PADRAO = {
+    "margem_limite": 30,
+    "custo_embalagem": 3.0,
+    "custo_fiscal": 10.0,
+    "tolerancia": TOLERANCIA_VALIDACAO_PACOTE,
+}
+
+
+# === CUSTOS ===
+def preparar_custos(custo_df):
+    """Normaliza os SKUs da planilha de custos como a app faz antes de montar o índice."""
+    custo_df = custo_df.copy()
+    if not custo_df.empty:
+        custo_df["SKU"] = normalizar_skus_custos(custo_df["SKU"])
+        custo_df["SKU"] = custo_df["SKU"].astype(str).str.strip()
+    return custo_df
+
+
+def _texto_celula(v):
+    """Célula lida do Excel → texto como o Google Sheets mostra (1050.0 → "1050", vazio → "")."""
+    if v is None or (isinstance(v, float) and np.isnan(v)):
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def ler_custos_arquivo(caminho):
+    """
+    Planilha de custos local (.xlsx/.csv, ex: download do CUSTOS_ML ou
+    dados/custos_salvos.xlsx) com os mesmos nomes de coluna aceitos no Google.
+    Custos já numéricos são usados como estão; textos passam pela correção pt-BR.
+    """
+    caminho = str(caminho)
+    if caminho.lower().endswith(".csv"):
+        bruto = pd.read_csv(caminho, dtype=str, keep_default_na=False)
+    else:
+        bruto = pd.read_excel(caminho, dtype=object)
+
+    bruto.columns = bruto.columns.astype(str).str.strip()
+    bruto = bruto.rename(columns={c: MAPA_COLUNAS_CUSTOS.get(c.lower(), c) for c in bruto.columns})
+
+    df_custos = pd.DataFrame(index=bruto.index)
+    for col in bruto.columns:
+        if col == "Custo_Produto":
+            df_custos[col] = bruto[col].map(
+                lambda v: float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) and v == v
+                else corrigir_valor(_texto_celula(v))
+            ).astype(float)
+        else:
+            df_custos[col] = bruto[col].map(_texto_celula)
+    return df_custos
+
+
+# === ETAPAS DO RELATÓRIO ===
+def resumo_tipos_anuncio(df):
+    """
+    Contagem por tipo de anúncio sem as linhas mãe de pacotes (None se não
+    houver a coluna). Não altera o df: os vazios já chegam como
+    "Unitário/Simples" de processar_vendas e a coluna continua category.
+    """
+    if "Tipo_Anuncio" not in df.columns:
+        return None
+
+    # Filtra as linhas 'mãe' de pacotes para o resumo estatístico
+    mask_nao_mae = ~df["Estado"].astype(str).str.contains("Pacote de", case=False, na=False, regex=False)
+    # Contagem sobre uma cópia em texto: na category, value_counts listaria
+    # também os tipos sem nenhuma venda e desempataria pela ordem das categorias
+    tipos = preencher_tipos_anuncio(df.loc[mask_nao_mae, "Tipo_Anuncio"].astype(object))
+
+    tipo_counts = tipos.value_counts(dropna=False).reset_index()
+    tipo_counts.columns = ["Tipo de Anúncio", "Quantidade"]
+    tipo_counts["% Participação"] = (
+        tipo_counts["Quantidade"] / tipo_counts["Quantidade"].sum() * 100
+    ).round(2)
+    return tipo_counts
+
+
+def corrigir_margens_pacotes(df):
+    """
+    Cópia para o relatório formatado com as margens de pacotes ajustadas:
+    linhas mãe zeradas e itens filhos recalculados sobre o próprio Valor_Venda.
+    O df original segue como está (exportação completa).
+    """
+    df_relatorio = df.copy()
+    # Identifica linhas-mãe de pacotes (ex: "Pacote de X produtos")
+    mask_pacote_mae = df_relatorio["Estado"].astype(str).str.contains("Pacote de", case=False, na=False)
+    # Nessas linhas, zera margens e markups, pois não fazem sentido financeiro direto
+    df_relatorio.loc[mask_pacote_mae, ["Margem_Liquida_%", "Margem_Final_%", "Markup_%"]] = 0.0
+
+    # Para itens filhos de pacotes, recalcula margem apenas se o Valor_Venda for válido
+    mask_pacote_filho = df_relatorio["Origem_Pacote"].astype(str).str.endswith("-PACOTE", na=False)
+    if "Lucro_Liquido" in df_relatorio.columns and "Valor_Venda" in df_relatorio.columns:
+        df_relatorio.loc[mask_pacote_filho, "Margem_Final_%"] = (
+            df_relatorio.loc[mask_pacote_filho, "Lucro_Liquido"] /
+            df_relatorio.loc[mask_pacote_filho, "Valor_Venda"].replace(0, np.nan)
+        ).clip(-500, 500).round(4)
+
+    if "Lucro_Real" in df_relatorio.columns and "Valor_Venda" in df_relatorio.columns:
+        df_relatorio.loc[mask_pacote_filho, "Margem_Liquida_%"] = (
+            df_relatorio.loc[mask_pacote_filho, "Lucro_Real"] /
+            df_relatorio.loc[mask_pacote_filho, "Valor_Venda"].replace(0, np.nan)
+        ).clip(-500, 500).round(4)
+
+    if "Lucro_Liquido" in df_relatorio.columns and "Custo_Produto_Total" in df_relatorio.columns:
+        df_relatorio.loc[mask_pacote_filho, "Markup_%"] = (
+            df_relatorio.loc[mask_pacote_filho, "Lucro_Liquido"] /
+            df_relatorio.loc[mask_pacote_filho, "Custo_Produto_Total"].replace(0, np.nan)
+        ).clip(-500, 500).round(4)
+
+    return df_relatorio
+
+
+# === PIPELINE INTEIRO ===
+def auditar_vendas(df, coluna_unidades, indice_custos=None, margem_limite=30, custo_embalagem=3.0,
+                   custo_fiscal=10.0, tolerancia=TOLERANCIA_VALIDACAO_PACOTE, regras=REGRAS_STATUS):
+    """
+    Auditoria de um relatório já lido e normalizado (saída de normalizar_vendas).
+    Sem índice de custos, calcula só o Lucro_Real (como a app sem planilha de custos).
+    `regras` é a tabela de Status (formato em utils/regras.py).
+
+    Retorna um dict com df, df_relatorio, metricas, tipo_counts, critico,
+    vendas_afetadas, avisos, periodo, coluna_unidades e custo_carregado.
+    """
+    df, info = processar_vendas(df, coluna_unidades, custo_embalagem, tolerancia)
+    avisos = list(info["avisos"])
+
+    custo_carregado = False
+    if indice_custos is not None:
+        try:
+            df = aplicar_custos(df, None, coluna_unidades, indice=indice_custos)
+            custo_carregado = True
+        except Exception as e:
+            avisos.append(f"Erro ao aplicar custos: {e}")
+
+    df = calcular_resultados(df, margem_limite, custo_fiscal, custo_carregado, regras)
+    metricas = calcular_metricas(df, custo_carregado)
+    tipo_counts = resumo_tipos_anuncio(df)
+    ranking = RankingForaMargem(df, margem_limite)
+    critico, vendas_afetadas = ranking.critico(), ranking.vendas_afetadas(df)
+
+    return {
+        "df": df,
+        "df_relatorio": corrigir_margens_pacotes(df),
+        "metricas": metricas,
+        "tipo_counts": tipo_counts,
+        "critico": critico,
+        "vendas_afetadas": vendas_afetadas,
+        "avisos": avisos,
+        "periodo": info["periodo"],
+        "coluna_unidades": coluna_unidades,
+        "custo_carregado": custo_carregado,
+    }
+
+
+def abas_extras_auditoria(df, tipo_counts=None, vendas_afetadas=None):
+    """Abas de dados do pacote de exportações (auditoria completa + resumos que existirem)."""
+    abas_extras = {"Auditoria_Completa": df}
+    if tipo_counts is not None:
+        abas_extras["Tipos_Anuncio"] = tipo_counts
+    if vendas_afetadas is not None:
+        abas_extras["Fora_da_Margem"] = vendas_afetadas
+    return abas_extras
+
+
+def auditar_arquivo(arquivo, custo_df=None, indice_custos=None, motor="auto", **parametros):
+    """Lê o relatório "Vendas BR" (caminho ou arquivo aberto) e roda auditar_vendas."""
+    if indice_custos is None and custo_df is not None and not custo_df.empty:
+        indice_custos = SkuCostIndex(preparar_custos(custo_df))
+
+    df, coluna_unidades = normalizar_vendas(ler_planilha_vendas(arquivo, motor=motor))
+    return auditar_vendas(df, coluna_unidades, indice_custos, **{**PARAMETROS_PADRAO, **parametros})
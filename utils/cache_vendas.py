@@ -0,0 +1,215 @@
+# utils/cache_vendas.py
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# === CACHE EM PARQUET DOS RELATÓRIOS NORMALIZADOS ===
+# Um arquivo por relatório (chave = hash do conteúdo enviado), guardando o
+# DataFrame já normalizado (unidades, nomes e valores numéricos). Reenviar o
+# mesmo relatório carrega o Parquet em vez de reler o Excel.
+# O acesso atualiza a data do arquivo; ao passar do limite de tamanho, os
+# menos usados recentemente são removidos primeiro.
+
+PASTA_CACHE = Path("dados") / "cache_vendas"
+LIMITE_CACHE_MB = 256
+
+# Sobe quando a normalização mudar, invalidando os arquivos antigos
+VERSAO_CACHE = 1
+CHAVE_METADADOS = b"auditoria_ml"
+
+# Códigos de tipo para colunas de texto com valores mistos (ex: SKU 1050 e "1001-1002")
+TIPO_TEXTO, TIPO_INT, TIPO_FLOAT, TIPO_NULO, TIPO_BOOL, TIPO_DATA = range(6)
+
+
+def parquet_disponivel():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def caminho_cache(chave, pasta=PASTA_CACHE):
+    return Path(pasta) / f"{chave}_v{VERSAO_CACHE}.parquet"
+
+
+def _codificar_valor(v):
+    if v is None:
+        return TIPO_NULO, None
+    if isinstance(v, (bool, np.bool_)):
+        return TIPO_BOOL, str(bool(v))
+    if isinstance(v, (int, np.integer)):
+        return TIPO_INT, str(int(v))
+    if isinstance(v, (float, np.floating)):
+        return TIPO_FLOAT, repr(float(v))
+    if isinstance(v, datetime):
+        return TIPO_DATA, pd.Timestamp(v).isoformat()
+    return TIPO_TEXTO, str(v)
+
+
+def _decodificar_valor(tipo, texto):
+    if tipo == TIPO_NULO:
+        return None
+    if tipo == TIPO_BOOL:
+        return texto == "True"
+    if tipo == TIPO_INT:
+        return int(texto)
+    if tipo == TIPO_FLOAT:
+        return float(texto)
+    if tipo == TIPO_DATA:
+        return pd.Timestamp(texto).to_pydatetime()
+    return texto
+
+
+def _preparar_para_parquet(df):
+    """
+    Colunas object só com texto (+ NaN) vão como string; colunas mistas vão
+    como texto + código de tipo por célula, para voltarem exatamente iguais.
+    """
+    df = df.copy()
+    texto, mistas = [], []
+    for col in df.columns[df.dtypes == object]:
+        serie = df[col]
+        nulos = serie.isna()
+        tipos = serie[~nulos].map(type)
+        if tipos.empty or (tipos == str).all():
+            if (serie[nulos].map(lambda v: v is None)).any():
+                mistas.append(col)
+            else:
+                texto.append(col)
+                continue
+        else:
+            mistas.append(col)
+
+        codigos, valores = zip(*(_codificar_valor(v) for v in serie)) if len(serie) else ((), ())
+        df[col] = pd.Series(valores, index=df.index, dtype=object)
+        df[f"__tipo__{col}"] = np.asarray(codigos, dtype=np.int8)
+    return df, {"texto": texto, "mistas": mistas}
+
+
+def _restaurar_de_parquet(df, meta):
+    for col in meta["texto"]:
+        df[col] = df[col].astype(object).where(df[col].notna(), np.nan)
+    for col in meta["mistas"]:
+        coluna_tipo = f"__tipo__{col}"
+        df[col] = pd.Series(
+            [_decodificar_valor(t, v) for t, v in zip(df[coluna_tipo].to_numpy(), df[col].to_numpy())],
+            index=df.index, dtype=object,
+        )
+        df = df.drop(columns=coluna_tipo)
+    return df
+
+
+def carregar_vendas_cache(chave, pasta=PASTA_CACHE):
+    """Retorna (df, coluna_unidades) do cache, ou None se não houver (ou sem pyarrow)."""
+    caminho = caminho_cache(chave, pasta)
+    if not caminho.exists() or not parquet_disponivel():
+        return None
+
+    import pyarrow.parquet as pq
+
+    try:
+        tabela = pq.read_table(caminho)
+        meta = json.loads(tabela.schema.metadata[CHAVE_METADADOS])
+        df = _restaurar_de_parquet(tabela.to_pandas(), meta)
+    except Exception:
+        # Arquivo corrompido ou de outra versão: descarta e relê o Excel
+        caminho.unlink(missing_ok=True)
+        return None
+
+    os.utime(caminho)  # marca como usado recentemente (ordem de remoção)
+    return df[meta["colunas"]], meta["coluna_unidades"]
+
+
+def salvar_vendas_cache(chave, df, coluna_unidades, pasta=PASTA_CACHE, limite_mb=LIMITE_CACHE_MB):
+    """Grava o DataFrame normalizado e aplica o limite de tamanho da pasta."""
+    if not parquet_disponivel():
+        return None
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+
+    preparado, tipos = _preparar_para_parquet(df)
+    tabela = pa.Table.from_pandas(preparado, preserve_index=False)
+    meta = {
+        "colunas": list(df.columns),
+        "coluna_unidades": coluna_unidades,
+        "linhas": len(df),
+        **tipos,
+    }
+    tabela = tabela.replace_schema_metadata({
+        **(tabela.schema.metadata or {}),
+        CHAVE_METADADOS: json.dumps(meta, ensure_ascii=False).encode("utf-8"),
+    })
+
+    caminho = caminho_cache(chave, pasta)
+    temporario = caminho.with_suffix(".tmp")
+    pq.write_table(tabela, temporario, compression="zstd")
+    temporario.replace(caminho)
+
+    aplicar_limite_cache(pasta, limite_mb, manter=caminho)
+    return caminho
+
+
+def aplicar_limite_cache(pasta=PASTA_CACHE, limite_mb=LIMITE_CACHE_MB, manter=None):
+    """Remove os arquivos menos usados até a pasta caber no limite. Retorna os removidos."""
+    arquivos = sorted(Path(pasta).glob("*.parquet"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in arquivos)
+    limite = limite_mb * 1024 ** 2
+    removidos = []
+    for arquivo in arquivos:
+        if total <= limite:
+            break
+        if manter is not None and arquivo == Path(manter):
+            continue
+        total -= arquivo.stat().st_size
+        arquivo.unlink(missing_ok=True)
+        removidos.append(arquivo.name)
+    return removidos
+
+
+def listar_cache(pasta=PASTA_CACHE):
+    """Tabela com os relatórios em cache (mais recentes primeiro)."""
+    registros = []
+    for arquivo in Path(pasta).glob("*.parquet"):
+        info = arquivo.stat()
+        linhas = None
+        if parquet_disponivel():
+            import pyarrow.parquet as pq
+            try:
+                linhas = pq.ParquetFile(arquivo).metadata.num_rows
+            except Exception:
+                pass
+        registros.append({
+            "Chave": arquivo.stem.rsplit("_v", 1)[0][:12],
+            "Arquivo": arquivo.name,
+            "Linhas": linhas,
+            "Tamanho_MB": round(info.st_size / 1024 ** 2, 2),
+            "Último_Uso": datetime.fromtimestamp(info.st_mtime).strftime("%d/%m/%Y %H:%M"),
+            "_mtime": info.st_mtime,
+        })
+    if not registros:
+        return pd.DataFrame(columns=["Chave", "Arquivo", "Linhas", "Tamanho_MB", "Último_Uso"])
+    return (
+        pd.DataFrame(registros)
+        .sort_values("_mtime", ascending=False)
+        .drop(columns="_mtime")
+        .reset_index(drop=True)
+    )
+
+
+def limpar_cache(pasta=PASTA_CACHE, chave=None):
+    """Remove um relatório do cache (pela chave ou início dela) ou todos. Retorna quantos foram removidos."""
+    padrao = f"{chave}*.parquet" if chave else "*.parquet"
+    removidos = 0
+    for arquivo in Path(pasta).glob(padrao):
+        arquivo.unlink(missing_ok=True)
+        removidos += 1
+    return removidos
@@ -0,0 +1,421 @@
+# utils/custos_google.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.custos import ARQUIVO_CUSTOS
+from utils.exportacao import letra_coluna
+
+# === CUSTOS NO GOOGLE SHEETS ===
+# A planilha só é baixada de novo quando o Drive informa uma data de
+# modificação diferente da última leitura (verificada no máximo a cada
+# TTL_CUSTOS segundos). A verificação roda numa thread em segundo plano:
+# enquanto isso a tela usa a última versão em memória ou, na primeira
+# execução, a cópia local salva em dados/custos_salvos.xlsx.
+
+NOME_PLANILHA = "CUSTOS_ML"  # nome da planilha no Google Sheets
+TTL_CUSTOS = 120  # segundos entre verificações de alteração na planilha
+COLUNAS_CUSTOS = ["SKU", "Produto", "Custo_Produto"]
+
+# 🔧 Normaliza nomes de colunas
+MAPA_COLUNAS_CUSTOS = {
+    "sku": "SKU",
+    "produto": "Produto",
+    "descrição": "Produto",
+    "descricao": "Produto",
+    "custo": "Custo_Produto",
+    "custo_produto": "Custo_Produto",
+    "preço_de_custo": "Custo_Produto",
+    "preco_de_custo": "Custo_Produto"
+}
+
+ORIGEM_GOOGLE = "google"
+ORIGEM_SNAPSHOT = "snapshot"
+ORIGEM_VAZIO = "vazio"
+
+# df.attrs do DataFrame devolvido por obter(): número da leitura que o gerou.
+# salvar() só aceita como `original` o resultado da leitura atual.
+ATRIBUTO_LEITURA = "leitura_custos"
+
+
+class PlanilhaAlterada(RuntimeError):
+    """Os custos exibidos não são mais a versão atual da planilha; salvar sobrescreveria outras alterações."""
+
+
+def agora_brasilia():
+    return datetime.utcnow() - timedelta(hours=3)
+
+
+def custos_vazios():
+    return pd.DataFrame(columns=COLUNAS_CUSTOS)
+
+
+def corrigir_valor(v):
+    """Converte um custo no formato BR (ex: "R$ 1.234,56") para float."""
+    v = str(v).strip()
+    if v in ["", "-", "nan", "N/A", "None"]:
+        return 0.0
+
+    v = v.replace("R$", "").replace(" ", "")
+    # Detecta o padrão de separadores
+    if "," in v and "." in v:
+        # Ex: 1.234,56 → 1234.56
+        v = v.replace(".", "").replace(",", ".")
+    elif "," in v and "." not in v:
+        # Ex: 162,49 → 162.49
+        v = v.replace(",", ".")
+    elif "." in v and "," not in v:
+        # Ex: 162.49 → 162.49 (mantém)
+        pass
+
+    try:
+        val = float(v)
+        # Corrige apenas valores absurdos (erro de escala)
+        # A lógica de correção de escala foi mantida como estava no script original
+        if val > 999:
+            val = val / 100
+        return round(val, 2)
+    except:
+        return 0.0
+
+
+def montar_custos(dados):
+    """Valores do get_all_values() (tudo texto) → DataFrame de custos com colunas e valores corrigidos."""
+    if not dados or len(dados) < 2:
+        return custos_vazios()
+
+    df_custos = pd.DataFrame(dados[1:], columns=dados[0])
+    df_custos.columns = df_custos.columns.str.strip()
+    df_custos.rename(columns={c: MAPA_COLUNAS_CUSTOS.get(c.lower(), c) for c in df_custos.columns}, inplace=True)
+
+    # 🔢 Converte custos respeitando o formato BR (cada texto distinto uma vez só)
+    if "Custo_Produto" in df_custos.columns:
+        valores = df_custos["Custo_Produto"]
+        convertidos = {v: corrigir_valor(v) for v in pd.unique(valores)}
+        df_custos["Custo_Produto"] = valores.map(convertidos).astype(float)
+
+    return df_custos
+
+
+def carregar_snapshot(caminho=ARQUIVO_CUSTOS):
+    """Última cópia local dos custos, ou None se não existir/não puder ser lida."""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return None
+    try:
+        df = pd.read_excel(caminho, dtype=str, keep_default_na=False)
+    except Exception:
+        return None
+    df.columns = df.columns.str.strip()
+    if "Custo_Produto" in df.columns:
+        df["Custo_Produto"] = pd.to_numeric(df["Custo_Produto"], errors="coerce").fillna(0.0)
+    return df
+
+
+def salvar_snapshot(df, caminho=ARQUIVO_CUSTOS):
+    """Grava a cópia local (arquivo temporário + troca, para nunca deixar um xlsx pela metade)."""
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f"{caminho.stem}.tmp{caminho.suffix}")
+    df.to_excel(temporario, index=False)
+    temporario.replace(caminho)
+
+
+class FonteCustosGoogle:
+    """
+    Custos da planilha do Google com cache, verificação de alteração e cópia local.
+
+    `client` só precisa de `open(nome)` devolvendo um objeto com
+    `sheet1.get_all_values()` (e, opcionalmente, `get_lastUpdateTime()`),
+    então um cliente falso em memória serve para testes. Sem cliente
+    (não autenticado), a fonte usa apenas a cópia local.
+    """
+
+    def __init__(self, client, nome_planilha=NOME_PLANILHA, ttl=TTL_CUSTOS,
+                 arquivo_snapshot=ARQUIVO_CUSTOS, relogio=time.monotonic):
+        self.client = client
+        self.nome_planilha = nome_planilha
+        self.ttl = ttl
+        self.arquivo_snapshot = Path(arquivo_snapshot)
+        self.relogio = relogio
+
+        self.origem = None
+        self.erro = None
+        self.atualizado_em = None  # horário (Brasília) da última leitura da planilha
+
+        self._df = None
+        self._leitura = 0  # aumenta a cada troca de _df
+        self._planilha = None
+        self._versao_remota = None
+        self._verificado_em = None
+        self._futuro = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="custos_google")
+
+    # === LEITURA ===
+    def obter(self, esperar=False):
+        """
+        Retorna (df, origem) sem esperar pela rede quando já há custos em
+        memória ou na cópia local; a verificação vencida roda em segundo plano.
+        Com `esperar=True` (ou sem nenhum dado ainda), aguarda a verificação.
+        """
+        futuro = None
+        with self._lock:
+            if self._df is None:
+                snapshot = carregar_snapshot(self.arquivo_snapshot)
+                if snapshot is not None:
+                    self._trocar_df(snapshot, ORIGEM_SNAPSHOT)
+            if self._vencido():
+                futuro = self._agendar()
+            elif self._futuro is not None and not self._futuro.done():
+                futuro = self._futuro
+            aguardar = futuro is not None and (esperar or self._df is None)
+
+        if aguardar:
+            futuro.result()
+
+        with self._lock:
+            if self._df is None:
+                return custos_vazios(), ORIGEM_VAZIO
+            df = self._df.copy()
+            df.attrs[ATRIBUTO_LEITURA] = self._leitura
+            return df, self.origem
+
+    def invalidar(self):
+        """Força baixar a planilha na próxima leitura (ex: depois de salvar)."""
+        with self._lock:
+            self._verificado_em = None
+            self._versao_remota = None
+
+    def atualizando(self):
+        with self._lock:
+            return self._futuro is not None and not self._futuro.done()
+
+    def _vencido(self):
+        return self._verificado_em is None or self.relogio() - self._verificado_em >= self.ttl
+
+    def _trocar_df(self, df, origem):
+        self._df, self.origem = df, origem
+        self._leitura += 1
+
+    def _agendar(self):
+        if self._futuro is None or self._futuro.done():
+            self._futuro = self._executor.submit(self._atualizar)
+        return self._futuro
+
+    # === ATUALIZAÇÃO (THREAD EM SEGUNDO PLANO) ===
+    @staticmethod
+    def _versao_planilha(planilha):
+        """Data de modificação no Drive; None quando não der para consultar (aí sempre baixa)."""
+        consultar = getattr(planilha, "get_lastUpdateTime", None)
+        if consultar is None:
+            return None
+        try:
+            return consultar()
+        except Exception:
+            return None
+
+    def _atualizar(self):
+        try:
+            if self.client is None:
+                raise RuntimeError("Google Sheets não autenticado.")
+            if self._planilha is None:
+                self._planilha = self.client.open(self.nome_planilha)
+
+            versao = self._versao_planilha(self._planilha)
+            with self._lock:
+                inalterada = (
+                    versao is not None
+                    and versao == self._versao_remota
+                    and self.origem == ORIGEM_GOOGLE
+                )
+            if inalterada:
+                with self._lock:
+                    self._verificado_em = self.relogio()
+                    self.erro = None
+                return
+
+            self._baixar(self._planilha, versao)
+
+        except Exception as e:
+            with self._lock:
+                # Tenta de novo só depois do TTL; reabre a planilha na próxima vez
+                self._planilha = None
+                self._verificado_em = self.relogio()
+                self.erro = str(e)
+
+    def _baixar(self, planilha, versao):
+        dados = planilha.sheet1.get_all_values()  # pega TUDO como texto (não tenta converter)
+        df_custos = montar_custos(dados)
+        if not df_custos.empty:
+            try:
+                salvar_snapshot(df_custos, self.arquivo_snapshot)
+            except Exception:
+                pass  # sem cópia local nesta rodada; a memória continua valendo
+
+        with self._lock:
+            self._trocar_df(df_custos, ORIGEM_GOOGLE)
+            self._versao_remota = versao
+            self._verificado_em = self.relogio()
+            self.atualizado_em = agora_brasilia()
+            self.erro = None
+
+    # === ESCRITA ===
+    def salvar(self, original, editado):
+        """
+        Grava no Google só o que mudou entre `original` (o que foi exibido) e
+        `editado`. Retorna o resumo de aplicar_escrita.
+
+        Recusa com PlanilhaAlterada se `original` não veio da leitura atual do
+        Google (cópia local, ou recarregado depois de exibido) ou se a planilha
+        foi modificada por fora desde essa leitura. Roda na mesma thread das
+        atualizações: espera a que estiver em andamento e nenhuma começa no
+        meio da gravação.
+        """
+        if self.client is None:
+            raise RuntimeError("Google Sheets não autenticado.")
+        return self._executor.submit(self._gravar, original, editado).result()
+
+    def _gravar(self, original, editado):
+        with self._lock:
+            origem, leitura, versao_lida = self.origem, self._leitura, self._versao_remota
+        if origem != ORIGEM_GOOGLE:
+            raise PlanilhaAlterada(
+                "Os custos exibidos vêm da cópia local, não do Google Sheets. Recarregue os custos antes de salvar."
+            )
+        if original.attrs.get(ATRIBUTO_LEITURA) != leitura:
+            raise PlanilhaAlterada(
+                "Os custos foram recarregados do Google Sheets depois de exibidos. Recarregue os custos antes de salvar."
+            )
+
+        planilha = self.client.open(self.nome_planilha)
+        if versao_lida is not None:
+            versao_atual = self._versao_planilha(planilha)
+            if versao_atual is not None and versao_atual != versao_lida:
+                raise PlanilhaAlterada(
+                    "A planilha foi alterada no Google Sheets depois de carregada. Recarregue os custos antes de salvar."
+                )
+
+        resumo = aplicar_escrita(planilha.sheet1, planejar_escrita(original, editado))
+
+        # Relê na hora: a próxima gravação compara com o que ficou na planilha
+        # (as linhas mudaram de posição). Se a leitura falhar, volta para a
+        # cópia local, que não pode ser salva até recarregar do Google.
+        try:
+            self._baixar(planilha, self._versao_planilha(planilha))
+        except Exception as e:
+            with self._lock:
+                self._df, self.origem = None, None
+                self._planilha = None
+                self._versao_remota = None
+                self._verificado_em = None
+                self.erro = str(e)
+        return resumo
+
+
+# === ESCRITA POR DIFERENÇA ===
+# Em vez de sheet.clear() + reescrever tudo, compara o DataFrame editado com o
+# que foi carregado (mesma ordem das linhas da planilha, índice preservado pelo
+# st.data_editor) e envia só: linhas alteradas (um batch_update com intervalos
+# contíguos), linhas removidas (delete_rows de baixo para cima) e linhas novas
+# (append_rows). A linha 1 é o cabeçalho; a linha i do DataFrame é a i + 2.
+
+def valor_celula(v):
+    """Valor do pandas → valor aceito pela API do Sheets (NaN/None viram vazio)."""
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return ""
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+
+def linhas_celulas(df):
+    return [[valor_celula(v) for v in linha] for linha in df.itertuples(index=False, name=None)]
+
+
+def planejar_escrita(original, editado):
+    """
+    Compara os dois DataFrames e devolve o plano de escrita:
+    {"atualizar": [(linha_planilha, valores)], "remover": [linha_planilha],
+     "adicionar": [valores], "reescrever": None | [cabeçalho + linhas]}.
+    Se as colunas mudaram, não dá para casar posições: o plano reescreve tudo.
+    """
+    plano = {"atualizar": [], "remover": [], "adicionar": [], "reescrever": None}
+    if list(original.columns) != list(editado.columns) or not original.index.is_unique:
+        plano["reescrever"] = [[str(c) for c in editado.columns]] + linhas_celulas(editado)
+        return plano
+
+    posicoes = pd.Series(np.arange(len(original)) + 2, index=original.index)
+    mantidas = editado.index.intersection(original.index)
+
+    celulas_originais = dict(zip(original.index, linhas_celulas(original)))
+    for rotulo, valores in zip(mantidas, linhas_celulas(editado.loc[mantidas])):
+        if valores != celulas_originais[rotulo]:
+            plano["atualizar"].append((int(posicoes[rotulo]), valores))
+    plano["atualizar"].sort()
+
+    plano["remover"] = sorted(int(posicoes[r]) for r in original.index.difference(editado.index))
+    plano["adicionar"] = linhas_celulas(editado.loc[~editado.index.isin(original.index)])
+    return plano
+
+
+def agrupar_contiguas(linhas):
+    """[2, 3, 4, 7, 9, 10] → [(2, 4), (7, 7), (9, 10)]"""
+    blocos = []
+    for linha in linhas:
+        if blocos and linha == blocos[-1][1] + 1:
+            blocos[-1][1] = linha
+        else:
+            blocos.append([linha, linha])
+    return [tuple(b) for b in blocos]
+
+
+def intervalos_atualizacao(atualizar):
+    """Linhas alteradas → lista de {"range", "values"} para um único batch_update."""
+    valores = dict(atualizar)
+    intervalos = []
+    for inicio, fim in agrupar_contiguas(sorted(valores)):
+        bloco = [valores[linha] for linha in range(inicio, fim + 1)]
+        ultima = letra_coluna(max(len(v) for v in bloco) - 1)
+        intervalos.append({"range": f"A{inicio}:{ultima}{fim}", "values": bloco})
+    return intervalos
+
+
+def aplicar_escrita(aba, plano):
+    """
+    Executa o plano na aba (gspread.Worksheet ou equivalente). Primeiro as
+    atualizações (posições originais), depois as remoções de baixo para cima
+    e por fim as inclusões; se a primeira chamada falhar, nada foi apagado.
+    """
+    if plano["reescrever"] is not None:
+        linhas = plano["reescrever"]
+        antigas = aba.get_all_values()
+        aba.update(linhas, "A1")
+        sobras = []
+        if len(antigas) > len(linhas):
+            sobras.append(f"A{len(linhas) + 1}:{letra_coluna(max(len(l) for l in antigas) - 1)}{len(antigas)}")
+        largura = max(len(l) for l in linhas)
+        largura_antiga = max((len(l) for l in antigas), default=0)
+        if largura_antiga > largura:
+            sobras.append(f"{letra_coluna(largura)}1:{letra_coluna(largura_antiga - 1)}{len(linhas)}")
+        if sobras:
+            aba.batch_clear(sobras)
+        return {"atualizadas": len(linhas) - 1, "removidas": max(len(antigas) - len(linhas), 0), "adicionadas": 0, "reescrita": True}
+
+    if plano["atualizar"]:
+        aba.batch_update(intervalos_atualizacao(plano["atualizar"]))
+    for inicio, fim in reversed(agrupar_contiguas(plano["remover"])):
+        aba.delete_rows(inicio, fim)
+    if plano["adicionar"]:
+        aba.append_rows(plano["adicionar"])
+    return {
+        "atualizadas": len(plano["atualizar"]),
+        "removidas": len(plano["remover"]),
+        "adicionadas": len(plano["adicionar"]),
+        "reescrita": False,
+    }
@@ -0,0 +1,83 @@
+# utils/datas.py
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+MESES_PT = {
+    "janeiro": "01", "fevereiro": "02", "março": "03", "abril": "04",
+    "maio": "05", "junho": "06", "julho": "07", "agosto": "08",
+    "setembro": "09", "outubro": "10", "novembro": "11", "dezembro": "12"
+}
+
+# Formato do relatório do ML (já sem "hs." / "às"): "12 de março de 2025 14:32"
+PADRAO_DATA_PT = re.compile(r"^(\d{1,2}) de ([^\s]+) de (\d{4})(?: (\d{1,2}):(\d{1,2}))?$")
+
+# Nome do mês → número (índice 0 = mês desconhecido)
+_NOMES_MESES = np.array([""] + list(MESES_PT), dtype=object)
+_NUMEROS_MESES = np.array([0] + [int(v) for v in MESES_PT.values()])
+
+
+def parse_data_portugues(texto):
+    if not isinstance(texto, str) or not any(m in texto.lower() for m in MESES_PT):
+        return None
+    try:
+        partes = texto.lower().split(" de ")
+        dia = partes[0].zfill(2)
+        mes = MESES_PT.get(partes[1], "01")
+        ano_e_hora = partes[2].split(" ")
+        ano = ano_e_hora[0]
+        hora = ano_e_hora[1] if len(ano_e_hora) > 1 else "00:00"
+        return datetime.strptime(f"{dia}/{mes}/{ano} {hora}", "%d/%m/%Y %H:%M")
+    except Exception:
+        return None
+
+
+def converter_datas_portugues(serie):
+    """
+    Versão vetorizada de parse_data_portugues para uma coluna inteira.
+
+    Cada texto distinto é convertido uma única vez (o relatório repete muito o
+    mesmo horário). Os que seguem o formato padrão saem de um str.extract e de
+    um único pd.to_datetime por componentes; o resto (formatos fora do padrão)
+    passa pela função original, então quem falhava continua virando NaT.
+    """
+    codigos, unicos = pd.factorize(serie, sort=False)
+    textos = pd.Series(unicos, dtype=object)
+    eh_texto = textos.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    minusculos = textos.where(eh_texto, "").astype(str).str.lower()
+
+    partes = minusculos.str.extract(PADRAO_DATA_PT)
+    nome_mes = pd.Categorical(partes[1], categories=_NOMES_MESES[1:])
+    mes = _NUMEROS_MESES[nome_mes.codes + 1]
+    horas = pd.to_numeric(partes[3]).fillna(0).to_numpy()
+    minutos = pd.to_numeric(partes[4]).fillna(0).to_numpy()
+    # Hora/minuto fora da faixa iriam "virar o dia" no to_datetime; ficam com a regra original
+    padrao = (partes[0].notna() & (mes > 0)).to_numpy() & eh_texto & (horas <= 23) & (minutos <= 59)
+
+    datas = pd.Series(pd.NaT, index=textos.index, dtype="datetime64[ns]")
+    if padrao.any():
+        comp = partes[padrao]
+        datas[padrao] = pd.to_datetime(
+            pd.DataFrame({
+                "year": comp[2].astype(int),
+                "month": mes[padrao],
+                "day": comp[0].astype(int),
+                "hour": horas[padrao],
+                "minute": minutos[padrao],
+            }),
+            errors="coerce",
+        ).to_numpy()
+
+    # Fora do padrão: mantém a regra original (inclusive o mês "01" de reserva)
+    restantes = np.flatnonzero(~padrao & eh_texto)
+    if len(restantes):
+        convertidas = [parse_data_portugues(textos.iat[k]) for k in restantes]
+        datas.iloc[restantes] = pd.to_datetime(
+            pd.Series(convertidas, dtype=object), errors="coerce"
+        ).to_numpy(dtype="datetime64[ns]")
+
+    resultado = datas.to_numpy()[codigos]
+    resultado[codigos < 0] = np.datetime64("NaT")
+    return pd.Series(resultado, index=serie.index, dtype="datetime64[ns]")
@@ -0,0 +1,300 @@
+# utils/exportacao.py
+import zipfile
+from datetime import date, datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# === RELATÓRIO DE AUDITORIA (XLSX COM FÓRMULAS E CORES) ===
+# Gravado em modo constant_memory: cada linha é escrita uma única vez, em
+# ordem, e liberada em seguida. Formatos por classe de linha (mãe/item/normal)
+# e os modelos de fórmula são montados uma vez, antes do laço.
+
+COLUNAS_EXPORTAR = [
+    "Venda", "SKU", "Unidades", "Tipo_Anuncio",
+    "Valor_Venda", "Valor_Recebido",
+    "Tarifa_Venda", "Tarifa_Percentual_%", "Tarifa_Fixa_R$", "Tarifa_Total_R$",
+    "Tarifa_Envio", "Cancelamentos",
+    "Custo_Embalagem", "Custo_Fiscal", "Receita_Envio",
+    "Lucro_Bruto", "Lucro_Real", "Margem_Liquida_%",
+    "Custo_Produto_Unitario", "Custo_Produto_Total",
+    "Lucro_Liquido", "Margem_Final_%", "Markup_%",
+    "Origem_Pacote", "Status"
+]
+
+COLUNAS_PERCENTUAIS = ["Tarifa_Percentual_%", "Margem_Liquida_%", "Margem_Final_%", "Markup_%"]
+
+# (coluna destino, tipo de formato, colunas usadas, modelo com {nome} da coluna)
+FORMULAS = [
+    ("Lucro_Bruto", "money", ["Valor_Venda", "Receita_Envio", "Tarifa_Total_R$", "Tarifa_Envio"],
+     "=IFERROR({Valor_Venda}+{Receita_Envio}-{Tarifa_Total_R$}-{Tarifa_Envio},0)"),
+    ("Lucro_Real", "money", ["Lucro_Bruto", "Custo_Embalagem", "Custo_Fiscal"],
+     "=IFERROR({Lucro_Bruto}-{Custo_Embalagem}-{Custo_Fiscal},0)"),
+    ("Margem_Liquida_%", "pct", ["Lucro_Real", "Valor_Venda"],
+     "=IFERROR({Lucro_Real}/{Valor_Venda},0)"),
+    ("Lucro_Liquido", "money", ["Lucro_Real", "Custo_Produto_Total"],
+     "=IFERROR({Lucro_Real}-{Custo_Produto_Total},0)"),
+    ("Margem_Final_%", "pct", ["Lucro_Liquido", "Valor_Venda"],
+     "=IFERROR({Lucro_Liquido}/{Valor_Venda},0)"),
+    ("Markup_%", "pct", ["Lucro_Liquido", "Custo_Produto_Total"],
+     "=IFERROR({Lucro_Liquido}/{Custo_Produto_Total},0)"),
+]
+
+AJUDA_RELATORIO = [
+    ["Coluna","Descrição","Exemplo"],
+    ["Venda","Número da venda no Mercado Livre.","200009741628937"],
+    ["SKU","Código interno ou SKU composto (pacote).","3888-3937"],
+    ["Unidades","Quantidade vendida.","2"],
+    ["Tipo Anuncio","Clássico (12%), Premium (17%) ou Agrupado.","Premium"],
+    ["Valor Venda","Preço total da venda.","162,49"],
+    ["Valor Recebido","Valor líquido após tarifas.","140,00"],
+    ["Tarifa_Venda","Tarifa percentual do ML.","19,49"],
+    ["Tarifa_Percentual_%","Percentual da tarifa ML.","12%"],
+    ["Tarifa_Fixa_R$","Tarifa fixa cobrada por unidade.","6,75"],
+    ["Tarifa_Total_R$","Soma da tarifa percentual + fixa.","26,24"],
+    ["Tarifa_Envio","Custo de envio pago.","15,71"],
+    ["Cancelamentos","Valores reembolsados.","0,00"],
+    ["Custo_Embalagem","Custo fixo ou rateado por pacote.","2,50"],
+    ["Custo_Fiscal","% fiscal sobre venda.","16,25"],
+    ["Receita_Envio","Valor recebido do comprador (frete).","10,00"],
+    ["Lucro_Bruto","Valor_Venda + Receita_Envio − Tarifas − Frete.","135,25"],
+    ["Lucro_Real","Lucro_Bruto − Custo_Embalagem − Custo_Fiscal.","116,50"],
+    ["Margem_Liquida_%","Lucro_Real ÷ Valor_Venda.","28%"],
+    ["Custo_Produto_Unitario","Custo de aquisição unitário.","95,00"],
+    ["Custo_Produto_Total","Custo total do item.","190,00"],
+    ["Lucro_Liquido","Lucro_Real − Custo_Produto_Total.","55,00"],
+    ["Margem_Final_%","Lucro_Liquido ÷ Valor_Venda.","25%"],
+    ["Markup_%","Lucro_Liquido ÷ Custo_Produto_Total.","29%"],
+    ["Origem_Pacote","Identificador do pacote (mãe/filho).","200009741628937-PACOTE"],
+    ["Status","Normal, Fora da Margem ou Cancelamento.","✅ Normal"]
+]
+
+# Classes de linha (define a cor)
+LINHA_NORMAL, LINHA_MAE, LINHA_ITEM = 0, 1, 2
+
+
+def letra_coluna(idx):
+    """Índice (0-based) → letra da coluna no Excel (0 → A, 26 → AA)."""
+    s = ""
+    while idx >= 0:
+        s = chr(idx % 26 + 65) + s
+        idx = idx // 26 - 1
+    return s
+
+
+def tipo_formato_coluna(col_name):
+    if col_name in ["Unidades"]:
+        return "int"
+    if "%" in col_name:
+        return "pct"
+    if any(x in col_name for x in ["Valor", "Lucro", "Custo", "Tarifa", "Receita"]):
+        return "money"
+    return "txt"
+
+
+def largura_coluna(col_name):
+    return {"int": 10, "pct": 12, "money": 16}.get(tipo_formato_coluna(col_name), 20)
+
+
+def preparar_df_exportacao(df, colunas=COLUNAS_EXPORTAR):
+    """Seleciona as colunas do relatório e converte % para fração (quando > 1 em módulo)."""
+    df_export = df[[c for c in colunas if c in df.columns]].copy()
+    for col in COLUNAS_PERCENTUAIS:
+        if col in df_export.columns:
+            valores = pd.to_numeric(df_export[col], errors="coerce")
+            df_export[col] = valores.where(~(valores.abs() > 1), valores / 100).fillna(0)
+    return df_export
+
+
+def classes_linhas(df_export):
+    if "Tipo_Anuncio" not in df_export.columns:
+        return np.full(len(df_export), LINHA_NORMAL, dtype=np.int8)
+    tipos = df_export["Tipo_Anuncio"].astype(str).str.lower()
+    classes = np.full(len(df_export), LINHA_NORMAL, dtype=np.int8)
+    classes[tipos.str.contains("agrupado (item", regex=False).to_numpy()] = LINHA_ITEM
+    classes[tipos.str.contains("agrupado (pacotes", regex=False).to_numpy()] = LINHA_MAE
+    return classes
+
+
+def _celulas_coluna(serie):
+    """
+    Lista de (método, valor) por célula, com a mesma regra do laço original:
+    vazio → blank, int/float → número, resto → texto.
+    """
+    valores = serie.tolist()
+    vazios = serie.isna().to_numpy()
+    if serie.dtype.kind in "fiu":
+        return [("blank", None) if vazio else ("number", v) for v, vazio in zip(valores, vazios)]
+    celulas = []
+    for v, vazio in zip(valores, vazios):
+        if vazio:
+            celulas.append(("blank", None))
+        elif isinstance(v, (int, float)):
+            celulas.append(("number", v))
+        else:
+            celulas.append(("string", str(v)))
+    return celulas
+
+
+def _criar_formatos(wb):
+    base = {"money": {"num_format": "R$ #,##0.00"}, "pct": {"num_format": "0.00%"},
+            "int": {"num_format": "0"}, "txt": {}}
+    cores = {LINHA_NORMAL: None, LINHA_MAE: "#D9E1F2", LINHA_ITEM: "#FCE4D6"}
+    formatos = {}
+    for classe, cor in cores.items():
+        formatos[classe] = {}
+        for tipo, props in base.items():
+            props = {**props, "border": 1}
+            if cor:
+                props["bg_color"] = cor
+            formatos[classe][tipo] = wb.add_format(props)
+    return formatos
+
+
+def _escrever_ajuda(wb):
+    ws_ajuda = wb.add_worksheet("AJUDA")
+    fmt_header_ajuda = wb.add_format({"bold": True, "bg_color": "#92D050", "align": "center", "valign": "vcenter", "border": 1})
+    fmt_text_ajuda = wb.add_format({"text_wrap": True, "valign": "top", "border": 1})
+    fmt_exemplo = wb.add_format({"italic": True, "color": "#666666", "border": 1})
+    # Mesmo estilo de cabeçalho que o pandas aplica no to_excel
+    fmt_cabecalho = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    ws_ajuda.set_row(0, 28, fmt_header_ajuda)
+    ws_ajuda.set_column("A:A", 25, fmt_text_ajuda)
+    ws_ajuda.set_column("B:B", 80, fmt_text_ajuda)
+    ws_ajuda.set_column("C:C", 25, fmt_exemplo)
+    for j, titulo in enumerate(AJUDA_RELATORIO[0]):
+        ws_ajuda.write_string(0, j, titulo, fmt_cabecalho)
+    for i, linha in enumerate(AJUDA_RELATORIO[1:], start=1):
+        for j, valor in enumerate(linha):
+            ws_ajuda.write_string(i, j, valor)
+
+
+def _escrever_aba_simples(wb, nome, df):
+    """Aba de dados sem formatação (equivalente ao df.to_excel(index=False))."""
+    ws = wb.add_worksheet(nome)
+    fmt_cabecalho = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    fmt_data_hora = wb.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    fmt_data = wb.add_format({"num_format": "yyyy-mm-dd"})
+    for j, col_name in enumerate(df.columns):
+        ws.write_string(0, j, str(col_name), fmt_cabecalho)
+
+    colunas = [df[c].tolist() for c in df.columns]
+    vazios = [df[c].isna().to_numpy() for c in df.columns]
+    for i in range(len(df)):
+        for j, valores in enumerate(colunas):
+            if vazios[j][i]:
+                continue
+            v = valores[i]
+            if isinstance(v, (bool, np.bool_)):
+                ws.write_boolean(i + 1, j, bool(v))
+            elif isinstance(v, (int, float, np.integer, np.floating)):
+                if np.isinf(v):
+                    ws.write_string(i + 1, j, "inf" if v > 0 else "-inf")
+                else:
+                    ws.write_number(i + 1, j, v)
+            elif isinstance(v, datetime):
+                ws.write_datetime(i + 1, j, pd.Timestamp(v).to_pydatetime(), fmt_data_hora)
+            elif isinstance(v, date):
+                ws.write_datetime(i + 1, j, v, fmt_data)
+            elif v != "":
+                ws.write_string(i + 1, j, str(v))
+
+
+def planilha_simples(df, aba):
+    """XLSX com uma única aba de dados, em bytes (exportações rápidas da tela)."""
+    saida = BytesIO()
+    wb = xlsxwriter.Workbook(saida, {"constant_memory": True})
+    _escrever_aba_simples(wb, aba, df)
+    wb.close()
+    return saida.getvalue()
+
+
+def empacotar_zip(arquivos):
+    """Junta {nome_do_arquivo: bytes} num .zip, em bytes."""
+    saida = BytesIO()
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for nome, conteudo in arquivos.items():
+            zf.writestr(nome, conteudo)
+    return saida.getvalue()
+
+
+def gerar_pacote_exportacoes(df, abas_extras, formato="xlsx"):
+    """
+    Todas as exportações de uma vez:
+    - "xlsx": um único workbook (Auditoria + AJUDA + uma aba por item de abas_extras)
+    - "zip":  o relatório e cada aba extra como arquivos .xlsx separados
+    """
+    if formato == "xlsx":
+        return gerar_relatorio_auditoria(df, abas_extras=abas_extras).getvalue()
+    if formato != "zip":
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    arquivos = {"Auditoria_ML.xlsx": gerar_relatorio_auditoria(df).getvalue()}
+    for aba, df_aba in abas_extras.items():
+        arquivos[f"{aba}.xlsx"] = planilha_simples(df_aba, aba)
+    return empacotar_zip(arquivos)
+
+
+def gerar_relatorio_auditoria(df, colunas=COLUNAS_EXPORTAR, destino=None, abas_extras=None):
+    """
+    Gera o relatório XLSX (aba Auditoria com fórmulas e cores + aba AJUDA).
+    abas_extras ({nome: df}) entram como abas de dados simples no mesmo arquivo.
+    Retorna o BytesIO (ou grava em `destino`, se for um caminho).
+    """
+    df_export = preparar_df_exportacao(df, colunas)
+    headers = list(df_export.columns)
+    col_idx = {name: i for i, name in enumerate(headers)}
+
+    saida = BytesIO() if destino is None else destino
+    opcoes = {"constant_memory": True, "in_memory": False}
+    wb = xlsxwriter.Workbook(saida, opcoes)
+    ws = wb.add_worksheet("Auditoria")
+
+    fmt_header = wb.add_format({"bold": True, "bg_color": "#FFFFFF", "align": "center", "valign": "vcenter", "border": 1})
+    formatos = _criar_formatos(wb)
+
+    # === CABEÇALHO E LARGURAS ===
+    ws.set_row(0, 22)
+    for j, col_name in enumerate(headers):
+        ws.write(0, j, col_name, fmt_header)
+        ws.set_column(j, j, largura_coluna(col_name))
+
+    # === MODELOS DE FÓRMULA (letras resolvidas uma vez) ===
+    letras = {name: letra_coluna(i) for name, i in col_idx.items()}
+    formulas = []
+    for destino_col, tipo, usadas, modelo in FORMULAS:
+        if destino_col in col_idx and all(k in col_idx for k in usadas):
+            for nome in usadas:
+                modelo = modelo.replace("{" + nome + "}", letras[nome] + "{linha}")
+            formulas.append((col_idx[destino_col], tipo, modelo))
+    colunas_formula = {j for j, _, _ in formulas}
+
+    tipos_coluna = [tipo_formato_coluna(c) for c in headers]
+    celulas = [_celulas_coluna(df_export[c]) for c in headers]
+    classes = classes_linhas(df_export)
+
+    escrever = {"blank": ws.write_blank, "number": ws.write_number, "string": ws.write_string}
+
+    # === LINHAS (uma passada, em ordem) ===
+    for linha, classe in enumerate(classes.tolist(), start=1):
+        fmts = formatos[classe]
+        mae = classe == LINHA_MAE
+        for j, tipo in enumerate(tipos_coluna):
+            if not mae and j in colunas_formula:
+                continue
+            metodo, valor = celulas[j][linha - 1]
+            escrever[metodo](linha, j, valor, fmts[tipo])
+        if not mae:
+            numero_excel = linha + 1
+            for j, tipo, modelo in formulas:
+                ws.write_formula(linha, j, modelo.format(linha=numero_excel), fmts[tipo])
+
+    _escrever_ajuda(wb)
+    for aba, df_aba in (abas_extras or {}).items():
+        _escrever_aba_simples(wb, aba, df_aba)
+    wb.close()
+
+    if destino is None:
+        saida.seek(0)
+    return saida
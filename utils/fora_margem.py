@@ -0,0 +1,129 @@
+# utils/fora_margem.py
+import numpy as np
+import pandas as pd
+
+from utils.pipeline import STATUS_FORA_MARGEM
+
+# === RANKING DE PRODUTOS FORA DA MARGEM ===
+# Uma passada pelo df: cada linha recebe o código do seu produto (SKU +
+# anúncio + produto, na ordem das chaves, como no groupby) e as contagens e
+# somas saem de np.bincount sobre esse código. As vendas fora da margem ficam
+# agrupadas por produto num arranjo contíguo (como em utils/indice_skus), então
+# abrir o detalhe de um produto do ranking não filtra o df de novo.
+# Linhas com SKU, anúncio ou produto vazio ficam fora do ranking (o groupby
+# sempre as descartou), mas contam nas vendas afetadas do SKU crítico.
+
+CHAVES_PRODUTO = ["SKU", "Anuncio", "Produto"]
+COLUNAS_RANKING = CHAVES_PRODUTO + [
+    "Ocorrências", "Vendas", "%_Vendas_Fora", "Perda_R$", "%Diferença_Media", "Pior_Venda", "Pior_%Diferença",
+]
+
+
+class RankingForaMargem:
+    """
+    Produtos com vendas fora da margem, do que tem mais ocorrências para o que
+    tem menos (empates pela ordem de SKU, anúncio e produto).
+
+        ranking = RankingForaMargem(df, margem_limite)
+        ranking.tabela                # uma linha por SKU + anúncio + produto
+        df.iloc[ranking.posicoes(0)]  # vendas fora da margem do 1º colocado
+
+    Colunas da tabela: ocorrências fora da margem, vendas do produto no
+    anúncio (todas), % delas fora da margem, perda (quanto as tarifas
+    passaram do limite, em R$), %Diferença média e a pior venda.
+    """
+
+    def __init__(self, df, margem_limite):
+        fora = (df["Status"] == STATUS_FORA_MARGEM).to_numpy(dtype=bool)
+        self.posicoes_fora = np.flatnonzero(fora)
+
+        codigos = (
+            df[CHAVES_PRODUTO].astype(object)
+            .groupby(CHAVES_PRODUTO, sort=True).ngroup()
+            .fillna(-1).to_numpy(dtype=np.int64)
+        )
+        total_grupos = int(codigos.max()) + 1 if len(codigos) else 0
+        vendas = np.bincount(codigos[codigos >= 0], minlength=total_grupos)
+
+        # Só as vendas fora da margem com produto completo
+        posicoes = self.posicoes_fora[codigos[self.posicoes_fora] >= 0]
+        grupos = codigos[posicoes]
+        diferenca = pd.to_numeric(df["%Diferença"], errors="coerce").to_numpy(dtype=float)[posicoes]
+        valor_venda = pd.to_numeric(df["Valor_Venda"], errors="coerce").to_numpy(dtype=float)[posicoes]
+        excesso = np.clip(pd.to_numeric(df["Diferença_R$"], errors="coerce").to_numpy(dtype=float)[posicoes]
+                          - valor_venda * (margem_limite / 100), 0, None)
+
+        ocorrencias = np.bincount(grupos, minlength=total_grupos)
+        perda = np.bincount(grupos, weights=np.nan_to_num(excesso), minlength=total_grupos)
+        soma_diferenca = np.bincount(grupos, weights=np.nan_to_num(diferenca), minlength=total_grupos)
+
+        # Vendas de cada produto em ordem do relatório: grupo g → _posicoes[_inicios[g]:_inicios[g + 1]]
+        ordem = np.argsort(grupos, kind="stable")
+        self._posicoes = posicoes[ordem]
+        self._inicios = np.concatenate([[0], np.cumsum(ocorrencias)])
+        # Pior venda: maior %Diferença do grupo (empate → a primeira no relatório)
+        ordem_pior = np.lexsort((posicoes, -np.nan_to_num(diferenca, nan=-np.inf), grupos))
+        pior = np.full(total_grupos, -1, dtype=np.int64)
+        com_fora = np.flatnonzero(ocorrencias)
+        pior[com_fora] = ordem_pior[self._inicios[com_fora]]
+
+        primeira = self._posicoes[self._inicios[com_fora]]
+        chaves = df[CHAVES_PRODUTO].iloc[primeira].astype(object)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tabela = pd.DataFrame({
+                "SKU": chaves["SKU"].to_numpy(),
+                "Anuncio": chaves["Anuncio"].to_numpy(),
+                "Produto": chaves["Produto"].to_numpy(),
+                "Ocorrências": ocorrencias[com_fora],
+                "Vendas": vendas[com_fora],
+                "%_Vendas_Fora": np.round(ocorrencias[com_fora] / vendas[com_fora] * 100, 2),
+                "Perda_R$": np.round(perda[com_fora], 2),
+                "%Diferença_Media": np.round(soma_diferenca[com_fora] / ocorrencias[com_fora], 2),
+                "Pior_Venda": df["Venda"].to_numpy()[posicoes[pior[com_fora]]] if "Venda" in df.columns else None,
+                "Pior_%Diferença": diferenca[pior[com_fora]],
+            }, columns=COLUNAS_RANKING)
+        self._posicao_pior = posicoes[pior[com_fora]]
+
+        # Mais ocorrências primeiro; empates na ordem das chaves (SKU, anúncio,
+        # produto), como saem do groupby. Ordenação estável: o quicksort padrão
+        # embaralhava os empates a partir de 17 produtos e o crítico variava.
+        ordem_ranking = tabela.sort_values("Ocorrências", ascending=False, kind="stable").index.to_numpy()
+        self.tabela = tabela.iloc[ordem_ranking].reset_index(drop=True)
+        self._grupos = com_fora[ordem_ranking]
+        self._posicao_pior = self._posicao_pior[ordem_ranking]
+
+        self.posicoes_critico = None
+        if len(self.tabela):
+            # Vendas afetadas do SKU crítico: todas as fora da margem com o mesmo SKU
+            skus_fora = df["SKU"].iloc[self.posicoes_fora].astype(object).to_numpy()
+            self.posicoes_critico = self.posicoes_fora[skus_fora == self.tabela.at[0, "SKU"]]
+
+    def __len__(self):
+        return len(self.tabela)
+
+    def posicoes(self, i):
+        """Posições (ordem do relatório) das vendas fora da margem do i-ésimo produto do ranking."""
+        grupo = self._grupos[i]
+        return self._posicoes[self._inicios[grupo]:self._inicios[grupo + 1]]
+
+    def posicao_pior(self, i):
+        """Posição da venda com maior %Diferença do i-ésimo produto do ranking."""
+        return int(self._posicao_pior[i])
+
+    def critico(self):
+        """1º do ranking como {"sku", "produto", "anuncio", "ocorrencias"} (None se não houver)."""
+        if not len(self.tabela):
+            return None
+        linha = self.tabela.iloc[0]
+        return {
+            "sku": linha["SKU"],
+            "produto": linha["Produto"],
+            "anuncio": linha["Anuncio"],
+            "ocorrencias": linha["Ocorrências"],
+        }
+
+    def vendas_afetadas(self, df):
+        """Vendas fora da margem do SKU crítico (em qualquer anúncio); None se não houver."""
+        if self.posicoes_critico is None:
+            return None
+        return df.iloc[self.posicoes_critico].copy()
@@ -0,0 +1,50 @@
+# utils/google_sheets.py
+import gspread
+import streamlit as st
+from google.oauth2.service_account import Credentials
+
+# === CLIENTE GOOGLE SHEETS COMPARTILHADO ===
+# Autenticar (ler os secrets, montar as credenciais, gspread.authorize) custava
+# um handshake a cada rerun, em cada app. O cliente agora é criado uma vez por
+# servidor e reaproveitado por todas as sessões das duas apps; a sessão HTTP
+# autorizada do gspread mantém as conexões abertas e renova o token sozinha
+# quando ele expira.
+
+# Escopos obrigatórios do Google Sheets e Drive
+ESCOPOS_GOOGLE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+CHAVE_SECRETS = "gcp_service_account"
+
+
+def corrigir_private_key(info):
+    """Corrige quebras de linha escapadas ("\\n" literal) na private_key."""
+    info = dict(info)
+    chave = info.get("private_key", "")
+    if "\\n" in chave:
+        info["private_key"] = chave.encode().decode("unicode_escape")
+    return info
+
+
+def criar_cliente(info, escopos=ESCOPOS_GOOGLE):
+    """Autentica a conta de serviço e devolve o cliente gspread (sem cache)."""
+    creds = Credentials.from_service_account_info(corrigir_private_key(info), scopes=escopos)
+    return gspread.authorize(creds)
+
+
+@st.cache_resource(show_spinner=False)
+def _cliente_em_cache(email, id_chave, _info):
+    # Email e id da chave identificam a conta: trocar os secrets gera um cliente novo
+    return criar_cliente(_info)
+
+
+def obter_cliente_sheets():
+    """Cliente autenticado compartilhado entre reruns e sessões. Erros não ficam em cache."""
+    if CHAVE_SECRETS not in st.secrets:
+        # Se estiver rodando localmente sem secrets, pode ser um problema.
+        raise ValueError(f"❌ Bloco [{CHAVE_SECRETS}] não encontrado em st.secrets.")
+
+    info = dict(st.secrets[CHAVE_SECRETS])
+    return _cliente_em_cache(info.get("client_email"), info.get("private_key_id"), info)
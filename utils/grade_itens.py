@@ -0,0 +1,58 @@
+# utils/grade_itens.py
+import math
+from datetime import timedelta
+
+import numpy as np
+
+from utils.regras import mascara_contem
+
+# === GRADE DE ITENS AVALIADOS (FILTRO E PAGINAÇÃO NO SERVIDOR) ===
+# A ordem por data (da mais recente para a mais antiga) é calculada uma vez
+# sobre as datas datetime64 que o processamento já converteu (info["datas"]
+# de processar_vendas), não sobre o texto "dd/mm/aaaa hh:mm" da coluna Data
+# (que ordena pelo dia do mês). Os filtros viram máscaras sobre o df inteiro e
+# só a página atual é montada e enviada ao navegador.
+
+TAMANHOS_PAGINA = [50, 100, 250, 500]
+
+
+def ordenar_por_data(datas):
+    """
+    Posições da venda mais recente para a mais antiga (datas datetime64, uma
+    por linha); empates mantêm a ordem do relatório e linhas sem data vão
+    para o fim.
+    """
+    datas = np.asarray(datas, dtype="datetime64[ns]")
+    # Ordena pelo negativo do instante (em ns); sem data recebe a maior chave
+    chave = np.where(np.isnat(datas), np.iinfo(np.int64).max, -datas.view(np.int64))
+    return np.argsort(chave, kind="stable")
+
+
+def filtrar_itens(df, ordem, datas, status=None, tipos=None, sku="", periodo=None):
+    """
+    Posições (já na ordem por data) das linhas que passam nos filtros:
+    status e tipos (listas; vazio = todos), SKU (trecho do texto) e
+    periodo (data inicial, data final) inclusivo.
+    """
+    mascara = np.ones(len(df), dtype=bool)
+    if status:
+        mascara &= df["Status"].isin(status).to_numpy()
+    if tipos and "Tipo_Anuncio" in df.columns:
+        mascara &= df["Tipo_Anuncio"].isin(tipos).to_numpy()
+    if sku and sku.strip():
+        mascara &= mascara_contem(df["SKU"], sku.strip())
+    if periodo is not None:
+        inicio, fim = periodo
+        mascara &= (datas >= np.datetime64(inicio)) & (datas < np.datetime64(fim + timedelta(days=1)))
+    return ordem[mascara[ordem]]
+
+
+def contar_paginas(total_itens, tamanho):
+    return max(1, math.ceil(total_itens / tamanho))
+
+
+def pagina_itens(df, posicoes, pagina, tamanho, colunas):
+    """Linhas de uma página (1 = primeira; fora do intervalo vai para a mais próxima) → (df da página, posição da 1ª linha)."""
+    pagina = min(max(1, int(pagina)), contar_paginas(len(posicoes), tamanho))
+    inicio = (pagina - 1) * tamanho
+    return df.iloc[posicoes[inicio:inicio + tamanho]][colunas], inicio
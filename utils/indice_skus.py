@@ -0,0 +1,166 @@
+# utils/indice_skus.py
+import numpy as np
+import pandas as pd
+
+from sku_utils import PADRAO_COMPOSTO_CX
+from utils.normalizacao import normalizar_sku_custos, normalizar_skus_custos
+from utils.pacotes import mascara_pacotes_mae
+
+# === ÍNDICE DE SKUs E ANÚNCIOS DO RELATÓRIO ===
+# Montado uma vez por relatório processado (as linhas não mudam de posição
+# depois do processamento). Para cada chave (SKU normalizado, componente de
+# kit ou anúncio) guarda as posições das linhas num arranjo contíguo:
+#     chaves (ordenadas) → inicios → posicoes[inicios[i]:inicios[i + 1]]
+# Busca exata e por prefixo são buscas binárias nas chaves ordenadas.
+# Componentes: as partes de SKUs com hífen ("3888-3937" → 3888 e 3937) e a
+# base dos compostos CX ("3990C2" → 3990), incluindo as linhas mãe de pacote.
+
+LIMITE_SKUS_PREFIXO = 50
+
+
+def normalizar_chave(valor):
+    """Texto digitado → chave do índice (mesma limpeza do SKU da planilha de custos, em maiúsculas)."""
+    return normalizar_sku_custos(valor).upper()
+
+
+def _chaves_coluna(df, coluna):
+    """Coluna → chave normalizada por linha (índice 0..n-1); coluna ausente → chaves vazias."""
+    if coluna not in df.columns:
+        return pd.Series("", index=range(len(df)), dtype=object)
+    return normalizar_skus_custos(df[coluna]).str.upper().reset_index(drop=True)
+
+
+def _agrupar_posicoes(chaves, posicoes=None):
+    """
+    Chave por linha → (chaves distintas ordenadas, inícios, posições agrupadas).
+    Chaves vazias ficam de fora.
+    """
+    chaves = pd.Series(chaves, dtype=object).reset_index(drop=True)
+    posicoes = np.arange(len(chaves)) if posicoes is None else np.asarray(posicoes)
+    validas = (chaves != "").to_numpy()
+    codigos, unicas = pd.factorize(chaves[validas], sort=True)
+    ordem = np.argsort(codigos, kind="stable")
+    contagem = np.bincount(codigos, minlength=len(unicas))
+    inicios = np.concatenate([[0], np.cumsum(contagem)])
+    return np.asarray(unicas, dtype=object), inicios, posicoes[validas][ordem]
+
+
+def _faixa(chaves, chave, prefixo):
+    """Intervalo [ini, fim) das chaves iguais a `chave` (ou que começam com ela)."""
+    inicio = np.searchsorted(chaves, chave, side="left")
+    if prefixo:
+        # Toda chave com o prefixo fica antes de prefixo + o maior caractere
+        fim = np.searchsorted(chaves, chave + "\U0010ffff", side="left")
+    else:
+        fim = np.searchsorted(chaves, chave, side="right")
+    return int(inicio), int(fim)
+
+
+def _componentes(skus):
+    """SKUs por linha → (componente, posição) das linhas que são kits (hífen) ou compostos CX."""
+    kits = skus[skus.str.contains("-", regex=False)]
+    partes = kits.str.split("-").explode()
+    partes = partes[partes != ""]
+    base_cx = partes.str.extract(PADRAO_COMPOSTO_CX.pattern, expand=True)[0]
+    # Compostos fora de kit ("3990C2") também apontam para a base
+    simples_cx = skus.str.extract(PADRAO_COMPOSTO_CX.pattern, expand=True)[0].dropna()
+
+    componentes = pd.concat([partes, base_cx.dropna(), simples_cx])
+    pares = pd.DataFrame({"componente": componentes.to_numpy(), "posicao": componentes.index.to_numpy()})
+    pares = pares.drop_duplicates()
+    return pares["componente"], pares["posicao"].to_numpy()
+
+
+class IndiceSkusVendas:
+    """
+    Índice do relatório para a conferência de SKU.
+
+        indice = IndiceSkusVendas(df)
+        achado = indice.buscar("3888")
+        df.iloc[achado["vendas"]]   # vendas do SKU (ou dos SKUs com o prefixo)
+        df.iloc[achado["em_kits"]]  # kits/pacotes/compostos que contêm o SKU
+    """
+
+    def __init__(self, df):
+        self.total_linhas = len(df)
+        skus = _chaves_coluna(df, "SKU")
+        self.skus, self._inicios_sku, self._posicoes_sku = _agrupar_posicoes(skus)
+
+        componentes, posicoes = _componentes(skus)
+        self.componentes, self._inicios_comp, self._posicoes_comp = _agrupar_posicoes(componentes, posicoes)
+
+        anuncios = _chaves_coluna(df, "Anuncio")
+        self.anuncios, self._inicios_anuncio, self._posicoes_anuncio = _agrupar_posicoes(anuncios)
+
+    @staticmethod
+    def _posicoes(chaves, inicios, posicoes, faixa):
+        ini, fim = faixa
+        if ini >= fim:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(posicoes[inicios[ini]:inicios[fim]])
+
+    def buscar(self, texto, prefixo=True, limite_skus=LIMITE_SKUS_PREFIXO):
+        """
+        Busca um SKU ou anúncio. Havendo SKU exatamente igual, usa só ele;
+        senão (com prefixo=True) os até `limite_skus` SKUs que começam com o texto.
+
+        Retorna {"chave", "skus", "vendas", "em_kits", "anuncio", "todas"}: skus é
+        a lista de SKUs encontrados e os demais são posições de linha (ordem do
+        relatório); "todas" junta as três sem repetir.
+        """
+        chave = normalizar_chave(texto)
+        vazio = np.empty(0, dtype=np.int64)
+        if not chave:
+            return {"chave": chave, "skus": [], "vendas": vazio, "em_kits": vazio, "anuncio": vazio, "todas": vazio}
+
+        faixa = _faixa(self.skus, chave, prefixo=False)
+        if faixa[0] == faixa[1] and prefixo:
+            ini, fim = _faixa(self.skus, chave, prefixo=True)
+            faixa = (ini, min(fim, ini + limite_skus))
+        vendas = self._posicoes(self.skus, self._inicios_sku, self._posicoes_sku, faixa)
+
+        em_kits = self._posicoes(
+            self.componentes, self._inicios_comp, self._posicoes_comp, _faixa(self.componentes, chave, prefixo=False)
+        )
+        anuncio = self._posicoes(
+            self.anuncios, self._inicios_anuncio, self._posicoes_anuncio, _faixa(self.anuncios, chave, prefixo=False)
+        )
+        em_kits = np.setdiff1d(em_kits, vendas, assume_unique=True)
+        return {
+            "chave": chave,
+            "skus": self.skus[faixa[0]:faixa[1]].tolist(),
+            "vendas": vendas,
+            "em_kits": em_kits,
+            "anuncio": anuncio,
+            "todas": np.union1d(np.union1d(vendas, em_kits), anuncio),
+        }
+
+
+def resumo_por_sku(df, posicoes, coluna_unidades):
+    """
+    Totais por SKU das linhas indicadas (sem as linhas mãe de pacote):
+    vendas, unidades, receita, lucro e margem média.
+    """
+    linhas = df.iloc[np.asarray(posicoes)]
+    linhas = linhas[~mascara_pacotes_mae(linhas).to_numpy()]
+    colunas = ["SKU", "Vendas", "Unidades", "Receita", "Lucro", "Margem_Media_%"]
+    if linhas.empty:
+        return pd.DataFrame(columns=colunas)
+
+    lucro = "Lucro_Liquido" if "Lucro_Liquido" in linhas.columns else "Lucro_Real"
+    margem = "Margem_Final_%" if "Margem_Final_%" in linhas.columns else "Margem_Liquida_%"
+    resumo = pd.DataFrame({
+        "SKU": linhas["SKU"].astype(str).to_numpy(),
+        "Unidades": linhas[coluna_unidades].to_numpy() if coluna_unidades in linhas.columns else 1,
+        "Receita": linhas["Valor_Venda"].to_numpy(),
+        "Lucro": linhas[lucro].to_numpy(),
+        "Margem": linhas[margem].replace([np.inf, -np.inf], np.nan).to_numpy(),
+    }).groupby("SKU", sort=False).agg(
+        Vendas=("Receita", "size"),
+        Unidades=("Unidades", "sum"),
+        Receita=("Receita", "sum"),
+        Lucro=("Lucro", "sum"),
+        Margem_Media_pct=("Margem", "mean"),
+    ).reset_index()
+    resumo.columns = colunas
+    return resumo.sort_values("Vendas", ascending=False, kind="stable").round(2).reset_index(drop=True)
@@ -0,0 +1,126 @@
+# utils/leitura.py
+import importlib.util
+import re
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# === MOTORES DE LEITURA DO EXCEL ===
+# - "calamine": leitor em Rust (python-calamine), usado se estiver instalado
+# - "openpyxl": modo streaming (read_only + values_only) lendo só as colunas pedidas
+# - "pandas":   pd.read_excel completo (comportamento original)
+# "auto" escolhe calamine quando disponível e, senão, o streaming do openpyxl.
+
+ERROS_EXCEL = {"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"}
+
+
+def normalizar_nome_coluna(nome):
+    """Mesma limpeza aplicada aos cabeçalhos após a leitura (strip + espaços)."""
+    return re.sub(r"\s+", " ", str(nome).strip())
+
+
+def calamine_disponivel():
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def _filtro_colunas(colunas):
+    if colunas is None:
+        return None
+    desejadas = set(colunas)
+    return lambda nome: normalizar_nome_coluna(nome) in desejadas
+
+
+def _converter_valor(valor):
+    # Igual ao _convert_cell do pandas: vazio vira "", inteiro em float vira int
+    if valor is None:
+        return ""
+    if isinstance(valor, float):
+        inteiro = int(valor) if np.isfinite(valor) else None
+        return inteiro if inteiro == valor else valor
+    if isinstance(valor, str) and valor in ERROS_EXCEL:
+        return np.nan
+    return valor
+
+
+def ler_excel_pandas(arquivo, aba, cabecalho, colunas=None):
+    """Leitura original via pd.read_excel (todas as colunas, se colunas=None)."""
+    return pd.read_excel(arquivo, sheet_name=aba, header=cabecalho, usecols=_filtro_colunas(colunas))
+
+
+def ler_excel_calamine(arquivo, aba, cabecalho, colunas=None):
+    """Leitura via calamine (requer python-calamine instalado)."""
+    return pd.read_excel(
+        arquivo, sheet_name=aba, header=cabecalho,
+        usecols=_filtro_colunas(colunas), engine="calamine"
+    )
+
+
+def ler_excel_streaming(arquivo, aba, cabecalho, colunas=None):
+    """
+    Lê a aba em modo read-only do openpyxl, linha a linha, convertendo só as
+    colunas pedidas. O resultado passa pelo mesmo TextParser do pd.read_excel,
+    então os tipos inferidos (int/float/texto/data) são os mesmos.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(arquivo, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[aba]
+        ws.reset_dimensions()
+
+        linhas = ws.iter_rows(values_only=True)
+        for _ in range(cabecalho):
+            if next(linhas, None) is None:
+                break
+
+        cabecalho_bruto = next(linhas, None) or ()
+        if colunas is None:
+            posicoes = list(range(len(cabecalho_bruto)))
+        else:
+            desejadas = set(colunas)
+            posicoes = [
+                j for j, nome in enumerate(cabecalho_bruto)
+                if nome is not None and normalizar_nome_coluna(nome) in desejadas
+            ]
+
+        dados = [[_converter_valor(cabecalho_bruto[j]) for j in posicoes]]
+        ultima_com_dados = 0
+        for linha in linhas:
+            if not any(v is not None and v != "" for v in linha):
+                dados.append([""] * len(posicoes))
+                continue
+            tamanho = len(linha)
+            dados.append([_converter_valor(linha[j]) if j < tamanho else "" for j in posicoes])
+            ultima_com_dados = len(dados) - 1
+    finally:
+        wb.close()
+
+    # Descarta linhas vazias no fim da aba (como o pd.read_excel)
+    del dados[ultima_com_dados + 1:]
+    if not posicoes:
+        return pd.DataFrame(index=range(len(dados) - 1))
+
+    return TextParser(dados, header=0, skip_blank_lines=False).read()
+
+
+MOTORES_LEITURA = {
+    "calamine": ler_excel_calamine,
+    "openpyxl": ler_excel_streaming,
+    "pandas": ler_excel_pandas,
+}
+
+
+def resolver_motor(motor="auto"):
+    if motor == "auto":
+        return "calamine" if calamine_disponivel() else "openpyxl"
+    if motor not in MOTORES_LEITURA:
+        raise ValueError(f"Motor de leitura desconhecido: {motor}")
+    if motor == "calamine" and not calamine_disponivel():
+        return "pandas"
+    return motor
+
+
+def ler_aba_excel(arquivo, aba, cabecalho=0, colunas=None, motor="auto"):
+    """Lê uma aba do Excel com o motor escolhido (ver MOTORES_LEITURA)."""
+    return MOTORES_LEITURA[resolver_motor(motor)](arquivo, aba, cabecalho, colunas)
@@ -0,0 +1,71 @@
+# utils/normalizacao.py
+import re
+
+import numpy as np
+import pandas as pd
+
+# === NORMALIZAÇÃO DE SKU E NÚMERO DE VENDA ===
+# As versões vetorizadas tratam só os valores distintos (SKUs e vendas se
+# repetem muito) e devolvem o resultado mapeado para cada linha.
+# As funções por valor continuam aqui como referência das regras.
+
+HIFENS_UNICODE = "[\u2010\u2011\u2012\u2013\u2014\u2015]"
+
+
+def normalizar_sku_custos(v):
+    if pd.isna(v):
+        return ""
+
+    s = str(v).strip()
+
+    # Normaliza hífens Unicode para hífen normal
+    s = re.sub(HIFENS_UNICODE, "-", s)
+
+    # Remove tudo que não for letra, número ou hífen (mantém C2..C12)
+    s = re.sub(r"[^0-9A-Za-z\-]", "", s)
+
+    # Remove hífens duplicados
+    s = re.sub(r"-{2,}", "-", s)
+
+    # Remove hífen no início/fim
+    s = s.strip("-")
+
+    return s
+
+
+def formatar_venda(valor):
+    if pd.isna(valor):
+        return ""
+    return re.sub(r"[^\d]", "", str(valor))
+
+
+def _por_valores_unicos(serie, normalizar):
+    """Aplica `normalizar` (Series de texto → Series de texto) só nos valores distintos."""
+    # Agrupa pelo texto (1050 e 1050.0 são iguais no factorize, mas não em str())
+    vazios = serie.isna().to_numpy()
+    codigos, unicos = pd.factorize(serie.astype(str), sort=False)
+    codigos = np.where(vazios, -1, codigos)
+    textos = pd.Series(unicos, dtype=object)
+    normalizados = np.append(normalizar(textos).to_numpy(dtype=object), "")
+    # código -1 (valor vazio/NaN) cai na última posição → ""
+    return pd.Series(normalizados[codigos], index=serie.index, dtype=object)
+
+
+def _dobrar_hifens_e_limpar(textos, permitidos):
+    return (
+        textos.str.strip()
+        .str.replace(HIFENS_UNICODE, "-", regex=True)
+        .str.replace(permitidos, "", regex=True)
+        .str.replace(r"-{2,}", "-", regex=True)
+        .str.strip("-")
+    )
+
+
+def normalizar_skus_custos(serie):
+    """Vetorizado: normalizar_sku_custos para uma coluna inteira."""
+    return _por_valores_unicos(serie, lambda t: _dobrar_hifens_e_limpar(t, r"[^0-9A-Za-z\-]"))
+
+
+def formatar_vendas(serie):
+    """Vetorizado: formatar_venda para uma coluna inteira."""
+    return _por_valores_unicos(serie, lambda t: t.str.replace(r"[^\d]", "", regex=True))
@@ -0,0 +1,42 @@
+# utils/numeros.py
+import numpy as np
+
+
+def arredondar(valores, casas=2):
+    """
+    Arredonda um array como o round() nativo do Python, mas de forma vetorizada.
+
+    O np.round multiplica por 10**casas antes de arredondar, o que pode divergir
+    do round() em valores muito próximos de ...5. Esses casos (raros) são
+    refeitos com o round() nativo para manter os centavos idênticos.
+    """
+    arr = np.atleast_1d(np.asarray(valores, dtype=float))
+    resultado = np.round(arr, casas)
+
+    escalado = arr * (10.0 ** casas)
+    fracao = np.abs(escalado - np.trunc(escalado))
+    suspeitos = np.isfinite(escalado) & (
+        np.abs(fracao - 0.5) <= 1e-7 * np.maximum(1.0, np.abs(escalado))
+    )
+    if suspeitos.any():
+        resultado = np.array(resultado, dtype=float, copy=True)
+        resultado[suspeitos] = [round(float(v), casas) for v in arr[suspeitos]]
+    return resultado
+
+
+def somar_por_grupo(valores, inicios, tamanhos):
+    """
+    Soma sequencial (da esquerda para a direita) de grupos contíguos.
+
+    Equivale a `total = 0; for v in grupo: total += v` para cada grupo, mas
+    vetorizado por posição dentro do grupo. Mantém o mesmo resultado em ponto
+    flutuante que o acumulador em Python (np.add.reduceat não garante isso).
+    """
+    valores = np.asarray(valores)
+    inicios = np.asarray(inicios, dtype=np.int64)
+    tamanhos = np.asarray(tamanhos, dtype=np.int64)
+    totais = np.zeros(len(inicios), dtype=np.result_type(valores.dtype, np.float64))
+    for k in range(int(tamanhos.max()) if len(tamanhos) else 0):
+        ativos = tamanhos > k
+        totais[ativos] += valores[inicios[ativos] + k]
+    return totais
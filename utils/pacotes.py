@@ -0,0 +1,289 @@
+# utils/pacotes.py
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.numeros import somar_por_grupo
+from utils.tarifas import calcular_tarifas
+
+PADRAO_PACOTE = r"Pacote de (\d+) produtos"
+
+
+def mascara_pacotes_mae(df):
+    """Linhas 'mãe' de pacotes (Estado = "Pacote de X produtos")."""
+    return df["Estado"].astype(str).str.contains("Pacote de", case=False, na=False)
+
+
+def localizar_pacotes(df):
+    """
+    Posições das mães de pacote e quantidade N de cada uma.
+    Retorna (mães completas, N de cada uma, mães sem N reconhecível,
+    mães incompletas — N além do fim da planilha).
+    """
+    pos_pais = np.flatnonzero(mascara_pacotes_mae(df).to_numpy())
+    qtds = (
+        df["Estado"].iloc[pos_pais].astype(str)
+        .str.extract(PADRAO_PACOTE, flags=re.IGNORECASE, expand=False)
+    )
+    reconhecidos = qtds.notna().to_numpy()
+    pos_sem_quantidade = pos_pais[~reconhecidos]
+    pos_pais, qtds = pos_pais[reconhecidos], qtds[reconhecidos].astype(int).to_numpy()
+
+    incompletos = pos_pais + 1 + qtds > len(df)
+    return pos_pais[~incompletos], qtds[~incompletos], pos_sem_quantidade, pos_pais[incompletos]
+
+
+def posicoes_filhos(pos_pais, qtds):
+    """
+    Itens filhos de cada mãe (os N seguintes), numa passada.
+    Retorna (pacote de cada filho, início de cada pacote em pos_filhos, pos_filhos).
+    """
+    inicios_grupo = np.concatenate(([0], np.cumsum(qtds)[:-1])).astype(np.int64)
+    grupo = np.repeat(np.arange(len(pos_pais)), qtds)
+    pos_filhos = pos_pais[grupo] + 1 + (np.arange(len(grupo)) - inicios_grupo[grupo])
+    return grupo, inicios_grupo, pos_filhos
+
+
+def blocos_pacotes(df):
+    """
+    Agrupa as linhas em blocos: cada mãe de pacote completa forma um bloco
+    com os N itens seguintes; qualquer outra linha é um bloco sozinha.
+    Retorna (bloco por posição, posições das mães incompletas — N além do fim).
+    """
+    inicio_bloco = np.ones(len(df), dtype=bool)
+    pos_pais, qtds, _, pos_incompletos = localizar_pacotes(df)
+    if len(pos_pais):
+        inicio_bloco[posicoes_filhos(pos_pais, qtds)[2]] = False
+    return np.cumsum(inicio_bloco) - 1, pos_incompletos
+
+
+def alocar_pacotes(df, coluna_unidades, custo_embalagem):
+    """
+    Rateia os pacotes agrupados ("Pacote de N produtos") entre os itens filhos.
+
+    Cada linha mãe é seguida pelos seus N itens. Todos os filhos recebem o id
+    da venda mãe numa única passada e os valores (Valor_Recebido, frete,
+    tarifas e embalagem) são calculados em bloco por grupo, com os mesmos
+    arredondamentos do cálculo linha a linha.
+
+    Pressupõe índice sequencial (0..n-1), como o DataFrame lido do Excel.
+    Retorna (df, indices_filhos, avisos).
+    """
+    pos_pais, qtds, pos_sem_quantidade, pos_incompletos = localizar_pacotes(df)
+    avisos = []
+
+    # Pacote sem quantidade reconhecível: sem origem
+    if len(pos_sem_quantidade):
+        df.iloc[pos_sem_quantidade, df.columns.get_loc("Origem_Pacote")] = None
+
+    # Pacotes que ultrapassam o fim da planilha são ignorados
+    for pos in pos_incompletos:
+        avisos.append(
+            f"⚠️ Pacote da venda {df['Venda'].iloc[pos]} na linha {df.index[pos] + 6} "
+            f"está incompleto e foi ignorado."
+        )
+    validos = qtds > 0
+    pos_pais, qtds = pos_pais[validos], qtds[validos]
+
+    if len(pos_pais) == 0:
+        return df, df.index[[]], avisos
+
+    # === ATRIBUI A VENDA MÃE A CADA FILHO (UMA PASSADA) ===
+    grupo, inicios_grupo, pos_filhos = posicoes_filhos(pos_pais, qtds)
+
+    # Valores das linhas mãe
+    pais = df.iloc[pos_pais]
+    total_recebido_pacote = pais["Valor_Recebido"].astype(float).fillna(0).to_numpy()
+    frete_total_pacote = np.abs(pais["Tarifa_Envio"].astype(float).fillna(0).to_numpy())
+
+    # Valores dos filhos
+    filhos = df.iloc[pos_filhos]
+    preco_unit = pd.to_numeric(filhos["Preco_Unitario"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    unidades_item = filhos[coluna_unidades].to_numpy()
+    valor_item_total = preco_unit * unidades_item
+
+    tarifas = calcular_tarifas(preco_unit, filhos["Tipo_Anuncio"], unidades_item, valor_item_total)
+    perc = tarifas["percentual"]
+    tarifa_fixa = tarifas["tarifa_fixa"]
+    tarifa_percentual = tarifas["tarifa_percentual"]
+    tarifa_fixa_total_item = tarifas["tarifa_fixa_total"]
+    tarifa_total_calculada = tarifas["tarifa_total"]
+
+    # === TOTAIS POR PACOTE ===
+    # Soma dos preços como Series.sum (sequencial até 7 itens, pairwise a partir de 8)
+    soma_precos = somar_por_grupo(preco_unit, inicios_grupo, qtds)
+    for g in np.flatnonzero(qtds >= 8):
+        soma_precos[g] = pd.Series(preco_unit[inicios_grupo[g]:inicios_grupo[g] + qtds[g]]).sum()
+    total_unidades_pacote = somar_por_grupo(unidades_item, inicios_grupo, qtds)
+    total_unidades_pacote[total_unidades_pacote == 0] = 1
+
+    # Rateio do Valor Recebido (por preço) e Frete (por unidades)
+    soma_precos_item = soma_precos[grupo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proporcao_venda = np.where(soma_precos_item != 0, preco_unit / soma_precos_item, 0.0)
+    valor_recebido_item = np.round(total_recebido_pacote[grupo] * proporcao_venda, 2)
+    proporcao_unidades = unidades_item / total_unidades_pacote[grupo]
+    frete_item = np.round(frete_total_pacote[grupo] * proporcao_unidades, 2)
+
+    custo_embalagem_unit = np.array([round(float(custo_embalagem) / q, 2) for q in qtds.tolist()])
+    origem = (pais["Venda"].astype(str) + "-PACOTE").to_numpy()
+
+    # === ATRIBUIÇÃO EM BLOCO AOS FILHOS ===
+    colunas_filhos = {
+        "Valor_Venda": valor_item_total,
+        "Valor_Recebido": valor_recebido_item,
+        "Tarifa_Percentual_%": perc * 100,
+        "Tarifa_Fixa_R$": tarifa_fixa,
+        "Tarifa_Venda": tarifa_percentual,
+        "Tarifa_Venda_Calculada": tarifa_percentual,
+        "Tarifa_Total_R$": tarifa_total_calculada,
+        "Tarifa_Envio": frete_item,
+        "Custo_Embalagem": custo_embalagem_unit[grupo],
+        "Origem_Pacote": origem[grupo],
+        "Tipo_Anuncio": "Agrupado (Item)",
+    }
+    for col, valores in colunas_filhos.items():
+        df.iloc[pos_filhos, df.columns.get_loc(col)] = valores
+
+    # === LINHA MÃE (PACOTE) — MOSTRA TOTAIS CALCULADOS ===
+    total_tarifa_percentual = somar_por_grupo(tarifa_percentual, inicios_grupo, qtds)
+    total_tarifa_fixa = somar_por_grupo(tarifa_fixa_total_item, inicios_grupo, qtds)
+    colunas_pais = {
+        "Tipo_Anuncio": "Agrupado (Pacotes)",
+        "Tarifa_Venda": np.round(total_tarifa_percentual, 2),
+        "Tarifa_Total_R$": np.round(total_tarifa_percentual + total_tarifa_fixa, 2),
+        "Custo_Embalagem": round(float(custo_embalagem), 2),
+        "Tarifa_Percentual_%": None,
+        "Tarifa_Fixa_R$": None,
+        "Origem_Pacote": "PACOTE",
+    }
+    for col, valores in colunas_pais.items():
+        df.iloc[pos_pais, df.columns.get_loc(col)] = valores
+
+    return df, df.index[pos_filhos], avisos
+
+
+# Diferença máxima (R$) aceita entre a soma das tarifas dos filhos e a tarifa do pai
+TOLERANCIA_VALIDACAO_PACOTE = 1.01
+
+
+def mascara_pacotes_filhos(df):
+    """Itens filhos de pacotes (Origem_Pacote = "<venda mãe>-PACOTE")."""
+    return df["Origem_Pacote"].astype(str).str.endswith("-PACOTE", na=False)
+
+
+def ratear_embalagem(df, custo_embalagem):
+    """
+    Reforça o rateio do custo de embalagem (uma agregação, sem varrer o
+    DataFrame por pacote):
+    - filhos recebem custo / nº de filhos do pacote;
+    - a mãe recebe a soma rateada (ou o custo cheio se não tiver filhos);
+    - vendas simples recebem o custo cheio.
+    """
+    custo_cheio = round(float(custo_embalagem), 2)
+    mask_mae = mascara_pacotes_mae(df)
+    mask_filho = mascara_pacotes_filhos(df)
+
+    # Nº de filhos por pacote e chave de cada mãe
+    origem_filhos = df.loc[mask_filho, "Origem_Pacote"]
+    qtd_por_pacote = origem_filhos.value_counts()
+    chave_pais = df.loc[mask_mae, "Venda"].astype(str) + "-PACOTE"
+    qtd_por_pacote = qtd_por_pacote[qtd_por_pacote.index.isin(chave_pais)]
+
+    unit_por_pacote = qtd_por_pacote.map(lambda q: round(float(custo_embalagem) / q, 2))
+    total_por_pacote = pd.Series(
+        [round(u * q, 2) for u, q in zip(unit_por_pacote, qtd_por_pacote)],
+        index=qtd_por_pacote.index, dtype=float,
+    )
+
+    filhos_com_pai = origem_filhos[origem_filhos.isin(qtd_por_pacote.index)]
+    df.loc[filhos_com_pai.index, "Custo_Embalagem"] = filhos_com_pai.map(unit_por_pacote).to_numpy()
+    # Se for mãe de pacote sem filhos válidos, assume custo total
+    df.loc[mask_mae, "Custo_Embalagem"] = chave_pais.map(total_por_pacote).fillna(custo_cheio).to_numpy()
+
+    df.loc[~mask_mae & ~mask_filho, "Custo_Embalagem"] = custo_cheio
+    return df
+
+
+def validar_pacotes(df, tolerancia=TOLERANCIA_VALIDACAO_PACOTE):
+    """
+    Marca Tarifa_Validada_ML nos itens filhos: "✔️" quando a soma das
+    tarifas calculadas (total + frete) dos filhos bate com a tarifa reportada
+    pelo ML na linha mãe (Tarifa_Venda + Tarifa_Envio), dentro da tolerância.
+
+    Uma única agregação por Origem_Pacote, cruzada com as linhas mãe.
+    """
+    df["Tarifa_Validada_ML"] = ""
+    mask_filho = mascara_pacotes_filhos(df)
+    if not mask_filho.any():
+        return df
+
+    filhos = df.loc[mask_filho, ["Origem_Pacote", "Tarifa_Total_R$", "Tarifa_Envio"]]
+    somas = filhos.groupby("Origem_Pacote", sort=False)[["Tarifa_Total_R$", "Tarifa_Envio"]].sum()
+    soma_filhas_tarifas = somas["Tarifa_Total_R$"] + somas["Tarifa_Envio"]
+
+    # Tarifa ML reportada (Tarifa de Venda + Tarifa de Envio do PAI), 1ª linha da venda
+    vendas = df["Venda"].astype(str)
+    primeira = ~vendas.duplicated()
+    tarifa_pai_ml_reportada = pd.Series(
+        (df["Tarifa_Venda"] + df["Tarifa_Envio"].abs()).to_numpy()[primeira.to_numpy()],
+        index=vendas[primeira].to_numpy(),
+    )
+
+    venda_pai_id = somas.index.str.split("-").str[0]
+    tem_pai = venda_pai_id.isin(tarifa_pai_ml_reportada.index)
+    diferenca = (soma_filhas_tarifas.to_numpy() - tarifa_pai_ml_reportada.reindex(venda_pai_id).to_numpy())
+    status = pd.Series(
+        np.where(tem_pai, np.where(np.abs(diferenca) < tolerancia, "✔️", "❌"), ""),
+        index=somas.index,
+    )
+
+    df.loc[mask_filho, "Tarifa_Validada_ML"] = filhos["Origem_Pacote"].map(status).to_numpy()
+    return df
+
+
+def combinar_sku_produto_pacotes(df):
+    """
+    Completa as linhas mãe com os SKUs (unidos por hífen) e títulos dos filhos.
+
+    Os filhos de todos os pacotes são localizados de uma vez (como em
+    alocar_pacotes) e os textos distintos de cada pacote, na ordem em que
+    aparecem, saem de um único drop_duplicates por (pacote, texto).
+    """
+    pos_pais, qtds, _, _ = localizar_pacotes(df)
+    validos = qtds > 0
+    pos_pais, qtds = pos_pais[validos], qtds[validos]
+    if len(pos_pais) == 0:
+        return df
+    grupo, _, pos_filhos = posicoes_filhos(pos_pais, qtds)
+
+    def textos_unicos(coluna):
+        textos = df[coluna].iloc[pos_filhos].astype(str).replace("nan", "").to_numpy()
+        return pd.DataFrame({"pacote": grupo, "texto": textos}).drop_duplicates()
+
+    # Formata SKUs concatenando com hífens, sem duplicar zeros ou nulos
+    skus = textos_unicos("SKU")
+    skus = skus[(skus["texto"] != "") & (skus["texto"] != "0")]
+    sku_concat = skus.groupby("pacote")["texto"].agg("-".join)
+
+    # Se houver mais de dois produtos, simplifica o nome
+    produtos = textos_unicos("Produto")
+    por_pacote = produtos.groupby("pacote")["texto"]
+    qtd_produtos = por_pacote.size()
+    unidos = (
+        produtos[produtos["texto"] != ""].groupby("pacote")["texto"].agg(" + ".join)
+        .reindex(qtd_produtos.index, fill_value="")
+    )
+    resumidos = por_pacote.first() + " + " + (qtd_produtos - 1).astype(str) + " outros"
+    produto_concat = resumidos.where(qtd_produtos > 2, unidos)
+
+    # Atualiza apenas se houver algo válido
+    for coluna, valores in (("SKU", sku_concat), ("Produto", produto_concat)):
+        valores = valores[valores != ""]
+        if valores.empty:
+            continue
+        if df[coluna].dtype != object:
+            df[coluna] = df[coluna].astype(object)
+        df.iloc[pos_pais[valores.index.to_numpy()], df.columns.get_loc(coluna)] = valores.to_numpy()
+    return df
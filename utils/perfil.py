@@ -0,0 +1,118 @@
+# utils/perfil.py
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# === PERFIL DAS ETAPAS DA AUDITORIA ===
+# Tempo, linhas e pico de memória de cada etapa de uma execução, para saber
+# onde a auditoria está lenta (planilha de custos, leitura do Excel, pacotes,
+# custos, status, exportação...). O tempo é sempre medido (custo desprezível);
+# a memória usa tracemalloc, que deixa o Python mais lento enquanto ativo, então
+# só é medida quando pedida. O tracemalloc vê o processo inteiro: com várias
+# sessões ao mesmo tempo o pico inclui o que as outras alocaram.
+
+ARQUIVO_LOG_PERFIL = Path("dados") / "perfil_auditoria.jsonl"
+
+MB = 1024 * 1024
+
+
+class PerfilExecucao:
+    """
+    Registro das etapas de uma execução (um rerun da app ou uma auditoria da CLI).
+
+        perfil = PerfilExecucao(medir_memoria=True)
+        with perfil.etapa("leitura") as etapa:
+            df = ler(...)
+            etapa["linhas"] = len(df)
+
+    Etapas podem ser aninhadas; o pico da etapa de fora inclui o das de dentro.
+    """
+
+    def __init__(self, medir_memoria=False):
+        self.medir_memoria = medir_memoria
+        self.data = datetime.now()
+        self.etapas = []
+        self._inicio = time.perf_counter()
+        self._abertas = []  # [pico já visto antes de uma etapa interna zerar o pico]
+        self._iniciou_tracemalloc = False
+
+    @contextmanager
+    def etapa(self, nome, linhas=None):
+        registro = {"etapa": nome, "segundos": None, "linhas": linhas, "pico_mb": None}
+        self.etapas.append(registro)
+
+        medir = self.medir_memoria
+        if medir:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._iniciou_tracemalloc = True
+            base, pico = tracemalloc.get_traced_memory()
+            if self._abertas:
+                self._abertas[-1] = max(self._abertas[-1], pico)
+            tracemalloc.reset_peak()
+        self._abertas.append(0)
+
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro["segundos"] = round(time.perf_counter() - inicio, 4)
+            pico_interno = self._abertas.pop()
+            if medir and tracemalloc.is_tracing():
+                pico = max(tracemalloc.get_traced_memory()[1], pico_interno)
+                registro["pico_mb"] = round(max(pico - base, 0) / MB, 2)
+                if self._abertas:
+                    self._abertas[-1] = max(self._abertas[-1], pico)
+
+    def finalizar(self):
+        """Encerra o tracemalloc (se foi este perfil que o ligou) e devolve o total em segundos."""
+        if self._iniciou_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+        return round(time.perf_counter() - self._inicio, 4)
+
+    def tabela(self):
+        """Etapas como DataFrame (Etapa, Segundos, Linhas, Pico_MB) para exibição."""
+        df = pd.DataFrame(self.etapas, columns=["etapa", "segundos", "linhas", "pico_mb"])
+        df.columns = ["Etapa", "Segundos", "Linhas", "Pico_MB"]
+        df["Linhas"] = df["Linhas"].astype("Int64")
+        return df
+
+    def registro(self, **extras):
+        """Execução como um dict serializável (uma linha do log JSONL)."""
+        return {
+            "data": self.data.isoformat(timespec="seconds"),
+            "total_segundos": round(time.perf_counter() - self._inicio, 4),
+            "memoria_medida": self.medir_memoria,
+            **extras,
+            "etapas": self.etapas,
+        }
+
+    def gravar_jsonl(self, caminho=ARQUIVO_LOG_PERFIL, **extras):
+        """Acrescenta a execução ao log (uma linha JSON por execução)."""
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        with open(caminho, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.registro(**extras), ensure_ascii=False, default=str) + "\n")
+        return caminho
+
+
+def ler_log_perfil(caminho=ARQUIVO_LOG_PERFIL):
+    """Log JSONL → DataFrame com uma linha por etapa (data, etapa, segundos, linhas, pico_mb...)."""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return pd.DataFrame(columns=["data", "etapa", "segundos", "linhas", "pico_mb"])
+    linhas = []
+    with open(caminho, encoding="utf-8") as f:
+        for texto in f:
+            if not texto.strip():
+                continue
+            execucao = json.loads(texto)
+            comum = {k: v for k, v in execucao.items() if k != "etapas"}
+            linhas.extend({**comum, **etapa} for etapa in execucao.get("etapas", []))
+    return pd.DataFrame(linhas)
@@ -0,0 +1,449 @@
+# utils/pipeline.py
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from utils.datas import converter_datas_portugues
+from utils.leitura import ler_aba_excel
+from utils.normalizacao import formatar_vendas
+from utils.pacotes import (
+    TOLERANCIA_VALIDACAO_PACOTE,
+    alocar_pacotes,
+    blocos_pacotes,
+    combinar_sku_produto_pacotes,
+    mascara_pacotes_mae,
+    ratear_embalagem,
+    validar_pacotes,
+)
+from utils.regras import avaliar_regras, categorias_regras
+from utils.tarifas import aplicar_tarifas_unitarias
+
+# === ETAPAS DO PROCESSAMENTO ===
+# 1. ler_planilha_vendas  → leitura da aba "Vendas BR" (mais cara)
+# 2. normalizar_vendas    → unidades, renomeação e valores numéricos
+# 3. processar_vendas     → pacotes, tarifas, embalagem, SKU, venda e data
+# 4. aplicar_custos       → custo dos produtos (sku_utils)
+# 5. calcular_resultados  → fiscal, lucro, status e margens (barato, depende
+#                           só das configurações da barra lateral)
+# Planilha de custos editada com o resto igual: aplicar_custos(linhas=...) e
+# atualizar_lucros refazem só as linhas cujos SKUs tiveram o custo alterado.
+
+POSSIVEIS_COLUNAS_UNIDADES = ["Unidades", "Quantidade", "Qtde", "Qtd"]
+
+# --- MAPEAMENTO PRINCIPAL ---
+COL_MAP = {
+    "N.º de venda": "Venda",
+    "Data da venda": "Data",
+    "Estado": "Estado",
+    "Receita por produtos (BRL)": "Valor_Venda",
+    "Total (BRL)": "Valor_Recebido",
+    "Tarifa de venda e impostos (BRL)": "Tarifa_Venda",
+    "Tarifas de envio (BRL)": "Tarifa_Envio",
+    "Cancelamentos e reembolsos (BRL)": "Cancelamentos",
+    "Preço unitário de venda do anúncio (BRL)": "Preco_Unitario",
+    "SKU": "SKU",
+    "# de anúncio": "Anuncio",
+    "Título do anúncio": "Produto",
+    "Tipo de anúncio": "Tipo_Anuncio"
+}
+
+# Colunas lidas do relatório: mapeadas + unidades + receita de envio
+COLUNAS_LEITURA = list(COL_MAP) + POSSIVEIS_COLUNAS_UNIDADES + ["Receita por envio (BRL)"]
+
+STATUS_CANCELAMENTO = "🟦 Cancelamento Correto"
+STATUS_FORA_MARGEM = "⚠️ Acima da Margem"
+STATUS_NORMAL = "✅ Normal"
+STATUS_PACOTE = "🔹 Pacote Agrupado (Somente Controle)"
+TIPO_ANUNCIO_VAZIO = "Unitário/Simples"
+
+# Regras do Status, em ordem de prioridade (a primeira que casar vale; sem
+# nenhuma, STATUS_NORMAL). Formato e exemplos em utils/regras.py.
+REGRAS_STATUS = [
+    {"status": STATUS_PACOTE, "condicoes": [{"coluna": "Estado", "operador": "contem", "valor": "Pacote de"}]},
+    {"status": STATUS_CANCELAMENTO, "condicoes": [{"coluna": "Cancelamento_Correto", "operador": "verdadeiro"}]},
+    {"status": STATUS_FORA_MARGEM, "condicoes": [{"coluna": "%Diferença", "operador": ">", "parametro": "margem_limite"}]},
+]
+
+# === TIPOS DAS COLUNAS ===
+# Textos que se repetem muito (estado, tipo, status, e SKU/anúncio/produto,
+# que se repetem a cada venda do mesmo item) ficam como category: um código
+# por linha em vez de uma string Python repetida; as colunas derivadas de tarifa
+# e embalagem nascem float (NaN = sem valor) em vez de objetos None.
+# Valores em R$ seguem float64: float32 mudaria os arredondamentos de centavos.
+COLUNAS_CATEGORICAS = ["Estado", "Tipo_Anuncio", "Tarifa_Validada_ML", "SKU", "Anuncio", "Produto"]
+COLUNAS_DERIVADAS_FLOAT = [
+    "Tarifa_Percentual_%", "Tarifa_Fixa_R$", "Tarifa_Total_R$", "Custo_Embalagem", "Tarifa_Venda_Calculada",
+]
+CATEGORIAS_STATUS = categorias_regras(REGRAS_STATUS, STATUS_NORMAL)
+
+
+def hash_conteudo(conteudo):
+    """Hash do conteúdo de um arquivo enviado (chave dos caches)."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def ler_planilha_vendas(arquivo, motor="auto", colunas=COLUNAS_LEITURA):
+    """
+    Lê a aba "Vendas BR" (cabeçalho na linha 6) e limpa os nomes das colunas.
+    Por padrão só as colunas usadas na auditoria são lidas (colunas=None lê todas).
+    """
+    df = ler_aba_excel(arquivo, "Vendas BR", cabecalho=5, colunas=colunas, motor=motor)
+    df.columns = df.columns.str.strip().str.replace(r"\s+", " ", regex=True)
+    return df
+
+
+def normalizar_vendas(df):
+    """
+    Normaliza a coluna de unidades, renomeia as colunas do ML e converte os
+    valores monetários. Retorna (df, coluna_unidades).
+    """
+    # === COLUNA DE UNIDADES ===
+    coluna_unidades = next((c for c in POSSIVEIS_COLUNAS_UNIDADES if c in df.columns), None)
+    if coluna_unidades:
+        df[coluna_unidades] = (
+            df[coluna_unidades]
+            .astype(str)
+            .str.strip()
+            .replace({"": "1", "-": "1", "–": "1", "—": "1", "nan": "1"}, regex=True)
+            .str.extract(r"(\d+)", expand=False)
+            .fillna("1")
+            .astype(int)
+        )
+    else:
+        df["Unidades"] = 1
+        coluna_unidades = "Unidades"
+
+    # Renomeia apenas o que consta no mapeamento
+    df.rename(columns={c: COL_MAP[c] for c in COL_MAP if c in df.columns}, inplace=True)
+
+    # --- Conversões iniciais de valores para processamento
+    for c in ["Valor_Venda", "Valor_Recebido", "Tarifa_Venda", "Tarifa_Envio", "Cancelamentos", "Preco_Unitario"]:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).abs().round(2)
+    return df, coluna_unidades
+
+
+# === VÁRIOS RELATÓRIOS (CONSOLIDAÇÃO) ===
+def ler_vendas_normalizadas(conteudo, motor="auto"):
+    """Bytes de um .xlsx do ML → (df normalizado, coluna_unidades). Roda nos processos de leitura."""
+    return normalizar_vendas(ler_planilha_vendas(BytesIO(conteudo), motor=motor))
+
+
+def ler_varios_relatorios(conteudos, processos=None, motor="auto", contexto="spawn"):
+    """
+    Lê e normaliza vários relatórios em paralelo (um processo por arquivo,
+    até `processos`), mantendo a ordem. "spawn" evita fork de um servidor com threads.
+    """
+    processos = max(1, min(processos or os.cpu_count() or 1, len(conteudos)))
+    if processos == 1:
+        return [ler_vendas_normalizadas(c, motor) for c in conteudos]
+    with ProcessPoolExecutor(processos, mp_context=multiprocessing.get_context(contexto)) as executor:
+        return list(executor.map(ler_vendas_normalizadas, conteudos, [motor] * len(conteudos)))
+
+
+def consolidar_vendas(relatorios):
+    """
+    Junta relatórios já normalizados [(df, coluna_unidades), ...] num só,
+    antes dos pacotes e custos, descartando vendas repetidas entre eles.
+
+    - A repetição é por Venda (mesma regra de formatar_vendas), e um pacote
+      inteiro (mãe + itens) conta como uma venda só, para nunca separar a mãe
+      dos filhos. Fica a última ocorrência: o relatório enviado por último
+      traz o estado mais recente da venda.
+    - Linhas sem número de venda nunca são descartadas.
+    - Mães de pacote incompletas (itens além do fim do próprio arquivo) vão
+      para o fim, para não "adotarem" as linhas do relatório seguinte.
+
+    Retorna (df, coluna_unidades, info) com o índice 0..n-1.
+    """
+    coluna_unidades = relatorios[0][1]
+    partes, blocos, chaves, incompletas = [], [], [], []
+    total_blocos = 0
+    for df, unidades in relatorios:
+        if unidades != coluna_unidades:
+            df = df.rename(columns={unidades: coluna_unidades})
+        df = df.reset_index(drop=True)
+        bloco, pos_incompletos = blocos_pacotes(df)
+
+        if "Venda" in df.columns:
+            vendas = formatar_vendas(df["Venda"]).to_numpy(dtype=object)
+        else:
+            vendas = np.full(len(df), "", dtype=object)
+        # Chave do bloco = venda da primeira linha (a mãe, nos pacotes)
+        inicios = np.flatnonzero(np.diff(bloco, prepend=-1))
+        chaves.append(vendas[inicios])
+        blocos.append(bloco + total_blocos)
+        total_blocos += len(inicios)
+
+        incompleta = np.zeros(len(df), dtype=bool)
+        incompleta[pos_incompletos] = True
+        partes.append(df)
+        incompletas.append(incompleta)
+
+    df = pd.concat(partes, ignore_index=True)
+    bloco = np.concatenate(blocos)
+    chave = pd.Series(np.concatenate(chaves), dtype=object)
+    repetido = ((chave != "") & chave.duplicated(keep="last")).to_numpy()
+    manter = ~repetido[bloco]
+    incompleta = np.concatenate(incompletas)
+
+    ordem = np.concatenate([np.flatnonzero(manter & ~incompleta), np.flatnonzero(manter & incompleta)])
+    df = df.iloc[ordem].reset_index(drop=True)
+    info = {
+        "arquivos": len(relatorios),
+        "linhas_lidas": len(manter),
+        "linhas_repetidas": int((~manter).sum()),
+        "vendas_repetidas": int(repetido.sum()),
+    }
+    return df, coluna_unidades, info
+
+
+def processar_vendas(df, coluna_unidades, custo_embalagem, tolerancia=TOLERANCIA_VALIDACAO_PACOTE):
+    """
+    Pacotes, tarifas, embalagem, validação, SKU/venda/data e os valores que
+    não dependem das configurações de margem e custo fiscal.
+
+    Retorna (df, info) — info traz os avisos de pacotes, o período das vendas
+    e as datas convertidas (datetime64, na ordem das linhas; a coluna Data
+    fica como texto "dd/mm/aaaa hh:mm").
+    """
+    # Garante que todas as colunas necessárias existam (numéricas já como float)
+    for col in ["Tarifa_Percentual_%", "Tarifa_Fixa_R$", "Tarifa_Total_R$",
+                "Origem_Pacote", "Custo_Embalagem", "Tarifa_Venda_Calculada"]:
+        if col not in df.columns:
+            df[col] = np.nan if col in COLUNAS_DERIVADAS_FLOAT else None
+
+    # === PROCESSA PACOTES AGRUPADOS (com cálculo de tarifas e rateio automático) ===
+    df_pacotes = df[mascara_pacotes_mae(df)]
+    df, indices_pacotes_filhos, avisos_pacotes = alocar_pacotes(df, coluna_unidades, custo_embalagem)
+
+    # === CORREÇÃO 1: APLICA TARIFA E TAXA FIXA EM VENDAS NÃO AGRUPADAS (Unitárias) ===
+    # Máscara para itens que não são pais e não são filhos (vendas simples)
+    mask_unitario = df.index.difference(df_pacotes.index).difference(indices_pacotes_filhos)
+
+    # A Tarifa_Venda (coluna original do ML) *deve* conter a tarifa total (percentual + fixa).
+    # Usamos Tarifa_Total_R$ para conferência e Tarifa_Venda_Calculada para o valor percentual puro.
+    df = aplicar_tarifas_unitarias(df, mask_unitario, coluna_unidades)
+    # Custo de Embalagem: aplica o valor cheio
+    df.loc[mask_unitario, "Custo_Embalagem"] = round(float(custo_embalagem), 2)
+
+    # === NORMALIZA CAMPOS NUMÉRICOS (Tarifas) ===
+    for col_fix in ["Tarifa_Venda", "Tarifa_Fixa_R$", "Tarifa_Total_R$", "Tarifa_Envio", "Custo_Embalagem", "Tarifa_Venda_Calculada"]:
+        if col_fix in df.columns:
+            df[col_fix] = pd.to_numeric(df[col_fix], errors="coerce").fillna(0).abs().round(2)
+
+    # === CORREÇÃO 2: REFORÇA O RATEIO DO CUSTO DE EMBALAGEM ===
+    df = ratear_embalagem(df, custo_embalagem)
+
+    # === VALIDAÇÃO DOS PACOTES (Melhorada para usar Tarifa Total Calculada) ===
+    df = validar_pacotes(df, tolerancia)
+
+    # === COMPLETA DADOS DE PACOTES COM SKUs E TÍTULOS AGRUPADOS ===
+    df = combinar_sku_produto_pacotes(df)
+
+    # === AJUSTE VENDA ===
+    df["Venda"] = formatar_vendas(df["Venda"])
+
+    # === DATA ===
+    df["Data"] = df["Data"].astype(str).str.replace(r"(hs\.?|às)", "", regex=True).str.strip()
+    datas = converter_datas_portugues(df["Data"])
+    periodo = (datas.min(), datas.max())
+    df["Data"] = datas.dt.strftime("%d/%m/%Y %H:%M")
+
+    # === AUDITORIA INICIAL (independe das configurações) ===
+    # A Tarifa_Venda é a tarifa PERCENTUAL calculada no loop de pacotes/unitários.
+    # O Valor_Recebido é o Total (BRL) do ML, que já é líquido das taxas.
+    df["Verificacao_Cancelamento"] = df["Valor_Venda"] - (df["Tarifa_Venda"] + df["Tarifa_Envio"] + df["Cancelamentos"])
+    df["Cancelamento_Correto"] = (df["Valor_Recebido"] == 0) & (abs(df["Verificacao_Cancelamento"]) <= 0.1)
+    df["Diferença_R$"] = df["Valor_Venda"] - df["Valor_Recebido"]
+
+    # Adiciona tratamento de divisão por zero
+    df["%Diferença"] = ((1 - (df["Valor_Recebido"] / df["Valor_Venda"].replace(0, np.nan))) * 100).round(2).fillna(0)
+
+    # Se houver receita de envio, soma ao cálculo (senão, considera 0)
+    if "Receita por envio (BRL)" in df.columns:
+        df["Receita_Envio"] = pd.to_numeric(df["Receita por envio (BRL)"], errors="coerce").fillna(0)
+        # A coluna original do ML não é mais usada depois daqui
+        df = df.drop(columns="Receita por envio (BRL)")
+    else:
+        df["Receita_Envio"] = 0
+
+    # Lucro Bruto agora considera a Receita_Envio e as tarifas TOTAL (Tarifa_Venda original + Taxa Fixa, que é a Tarifa_Total_R$)
+    # Para ser coerente, usaremos a coluna Tarifa_Total_R$ que foi calculada/ajustada (Tarifa % + Taxa Fixa) para o Lucro Bruto.
+    # Se a Tarifa_Total_R$ for 0 (caso o cálculo falhe), usaremos a Tarifa_Venda original do ML (Valor líquido).
+
+    # Cria uma coluna de tarifa ML Líquida: usa Tarifa_Total_R$ se for calculada, senão usa a Tarifa_Venda do ML (que é líquida)
+    # Comparação elemento a elemento com None (NaN também conta como "tem origem", como no teste `is not None`)
+    tem_origem = df["Origem_Pacote"].to_numpy(dtype=object) != None  # noqa: E711
+    df["Tarifa_Total_Liquida"] = np.where(
+        tem_origem | (df["Tarifa_Total_R$"] > 0).to_numpy(), df["Tarifa_Total_R$"], df["Tarifa_Venda"]
+    )
+    df["Tarifa_Total_Liquida"] = df["Tarifa_Total_Liquida"].abs().round(2)
+
+    df["Lucro_Bruto"] = (
+        df["Valor_Venda"] + df["Receita_Envio"] - (df["Tarifa_Total_Liquida"] + df["Tarifa_Envio"])
+    ).round(2)
+
+    # === TIPO DE ANÚNCIO (vazios → "Unitário/Simples", antes de virar category) ===
+    if "Tipo_Anuncio" in df.columns:
+        df["Tipo_Anuncio"] = preencher_tipos_anuncio(df["Tipo_Anuncio"])
+
+    return compactar_tipos(df), {"avisos": avisos_pacotes, "periodo": periodo, "datas": datas.to_numpy()}
+
+
+def preencher_tipos_anuncio(tipos):
+    """Tipo de anúncio como texto sem espaços nas bordas; vazios viram TIPO_ANUNCIO_VAZIO."""
+    return (
+        tipos
+        .astype(str)
+        .str.strip()
+        .replace(["nan", "None", ""], TIPO_ANUNCIO_VAZIO) # Ajustado para refletir o que é um item não agrupado
+    )
+
+
+def compactar_tipos(df):
+    """Converte os textos de poucos valores (COLUNAS_CATEGORICAS) em category."""
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+# Ordem final das colunas derivadas (mesma ordem em que o relatório sempre as criou)
+COLUNAS_DERIVADAS = [
+    "Verificacao_Cancelamento", "Cancelamento_Correto", "Diferença_R$", "%Diferença",
+    "Status", "Custo_Fiscal", "Receita_Envio", "Tarifa_Total_Liquida", "Lucro_Bruto", "Lucro_Real",
+    "Custo_Produto_Unitario", "Custo_Produto_Total", "Lucro_Liquido", "Margem_Final_%", "Markup_%",
+    "Margem_Liquida_%",
+]
+COLUNAS_DERIVADAS_SEM_CUSTO = [
+    "Verificacao_Cancelamento", "Cancelamento_Correto", "Diferença_R$", "%Diferença",
+    "Status", "Custo_Fiscal", "Receita_Envio", "Tarifa_Total_Liquida", "Lucro_Bruto", "Lucro_Real",
+    "Margem_Final_%", "Lucro_Liquido", "Margem_Liquida_%",
+]
+
+
+# Colunas de custo/lucro zeradas na linha mãe do pacote
+CAMPOS_ZERADOS_PACOTE = [
+    "Lucro_Real", "Lucro_Liquido", "Margem_Liquida_%",
+    "Margem_Final_%", "Markup_%", "Lucro_Bruto",
+    "Custo_Produto_Total", "Tarifa_Total_Liquida", "Tarifa_Total_R$",
+]
+# Colunas refeitas por atualizar_lucros quando o custo de uma linha muda
+COLUNAS_LUCRO_CUSTO = ["Lucro_Liquido", "Margem_Final_%", "Markup_%"]
+
+
+def _lucros_com_custo(lucro_real, custo_total, valor_venda):
+    """
+    Lucro Líquido = Lucro Real (já com fiscal/embalagem) - Custo do Produto Total,
+    e as margens sobre a venda e sobre o custo. Séries → (lucro, margem %, markup %).
+    """
+    lucro_liquido = (lucro_real - custo_total).round(2)
+    margem = ((lucro_liquido / valor_venda.replace(0, np.nan)) * 100).round(2)
+    markup = ((lucro_liquido / custo_total.replace(0, np.nan)) * 100).round(2)
+    return lucro_liquido, margem, markup
+
+
+def calcular_resultados(df, margem_limite, custo_fiscal, custo_carregado, regras=REGRAS_STATUS):
+    """
+    Colunas que dependem das configurações (margem limite e custo fiscal):
+    Status, Custo_Fiscal, Lucro_Real, Lucro_Liquido e margens.
+    O Status sai da tabela de regras (REGRAS_STATUS ou outra no mesmo formato).
+    """
+    df["Status"] = avaliar_regras(
+        df, regras, {"margem_limite": margem_limite, "custo_fiscal": custo_fiscal}, padrao=STATUS_NORMAL
+    )
+
+    df["Custo_Fiscal"] = (df["Valor_Venda"] * (custo_fiscal / 100)).round(2)
+
+    df["Lucro_Real"] = (
+        df["Lucro_Bruto"] - (df["Custo_Embalagem"] + df["Custo_Fiscal"])
+    ).round(2)
+
+    if custo_carregado:
+        df["Custo_Embalagem"] = pd.to_numeric(df["Custo_Embalagem"], errors="coerce").fillna(0)
+
+        # Garante que Custo_Produto_Total exista
+        if "Custo_Produto_Total" not in df.columns:
+            df["Custo_Produto_Total"] = 0.0
+
+        # --- Lucro e Margens completas ---
+        df["Lucro_Liquido"], df["Margem_Final_%"], df["Markup_%"] = _lucros_com_custo(
+            df["Lucro_Real"], df["Custo_Produto_Total"], df["Valor_Venda"]
+        )
+    else:
+        # Garante que as colunas existam para o bloco de métricas, mesmo que o merge de custo falhe
+        df["Margem_Final_%"] = 0.0
+        df["Lucro_Liquido"] = df["Lucro_Real"].copy()
+
+    # Define Margem_Liquida_% (baseada em Lucro_Real para o caso sem custos de produto)
+    df["Margem_Liquida_%"] = (
+        (df["Lucro_Real"] / df["Valor_Venda"].replace(0, np.nan)) * 100
+    ).round(2).fillna(0)
+
+    # === AJUSTE FINAL: ZERA PACOTES APÓS REDISTRIBUIÇÃO ===
+    if "Estado" in df.columns:
+        mask_pacotes = df["Estado"].str.contains("Pacote de", case=False, na=False)
+        for campo in CAMPOS_ZERADOS_PACOTE:
+            if campo in df.columns:
+                df.loc[mask_pacotes, campo] = 0.0
+
+    derivadas = COLUNAS_DERIVADAS if custo_carregado else COLUNAS_DERIVADAS_SEM_CUSTO
+    derivadas = [c for c in derivadas if c in df.columns]
+    return df[[c for c in df.columns if c not in derivadas] + derivadas]
+
+
+def atualizar_lucros(df, linhas):
+    """
+    Refaz Lucro_Liquido, Margem_Final_% e Markup_% só nas linhas indicadas
+    (posições), num df que já passou por calcular_resultados com custos e
+    cujo Custo_Produto_* dessas linhas acabou de mudar. Atualiza no lugar.
+    """
+    if len(linhas) == 0:
+        return df
+    lucros = _lucros_com_custo(
+        df["Lucro_Real"].iloc[linhas], df["Custo_Produto_Total"].iloc[linhas], df["Valor_Venda"].iloc[linhas]
+    )
+    for coluna, valores in zip(COLUNAS_LUCRO_CUSTO, lucros):
+        df.iloc[linhas, df.columns.get_loc(coluna)] = valores.to_numpy()
+
+    if "Estado" in df.columns:
+        mae = df["Estado"].iloc[linhas].str.contains("Pacote de", case=False, na=False).to_numpy(dtype=bool)
+        if mae.any():
+            for campo in ["Custo_Produto_Total"] + COLUNAS_LUCRO_CUSTO:
+                df.iloc[linhas[mae], df.columns.get_loc(campo)] = 0.0
+    return df
+
+
+def calcular_metricas(df, custo_carregado):
+    """Métricas do painel (vendas válidas = sem cancelamentos e sem linhas mãe de pacote)."""
+    # === EXCLUI CANCELAMENTOS DO CÁLCULO ===
+    df_validas = df[df["Status"] != STATUS_CANCELAMENTO]
+
+    # Exclui também os pais de pacotes
+    mask_validas = ~df_validas["Estado"].astype(str).str.contains("Pacote de", case=False, na=False, regex=False)
+    df_validas = df_validas[mask_validas]
+
+    if custo_carregado:
+        lucro_total = df_validas["Lucro_Liquido"].sum()
+        prejuizo_total = abs(df_validas.loc[df_validas["Lucro_Liquido"] < 0, "Lucro_Liquido"].sum())
+        margem_media = df_validas["Margem_Final_%"].replace([np.inf, -np.inf], np.nan).mean()
+    else:
+        lucro_total = df_validas["Lucro_Real"].sum()
+        prejuizo_total = abs(df_validas.loc[df_validas["Lucro_Real"] < 0, "Lucro_Real"].sum())
+        margem_media = df_validas["Margem_Liquida_%"].replace([np.inf, -np.inf], np.nan).mean()
+
+    return {
+        "total_vendas": len(df[~df["Estado"].astype(str).str.contains("Pacote de", case=False, na=False, regex=False)]),
+        "fora_margem": (df["Status"] == STATUS_FORA_MARGEM).sum(),
+        "cancelamentos": (df["Status"] == STATUS_CANCELAMENTO).sum(),
+        "lucro_total": lucro_total,
+        "margem_media": margem_media,
+        "prejuizo_total": prejuizo_total,
+        "receita_total": df_validas["Valor_Venda"].sum(),
+    }
@@ -0,0 +1,130 @@
+# utils/regras.py
+import json
+import operator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# === REGRAS DE STATUS (TABELA DECLARATIVA) ===
+# Cada regra é um dict {"status": rótulo, "condicoes": [condição, ...]}; todas
+# as condições de uma regra precisam valer (E). As regras são avaliadas em
+# ordem e a primeira que casar define o Status da linha (np.select); linhas
+# sem regra ficam com o status padrão. Tudo com máscaras sobre as colunas
+# inteiras, sem laço por linha.
+#
+# Condição: {"coluna": nome, "operador": op, e "valor" fixo ou "parametro"}
+#   - op: ">", ">=", "<", "<=", "==", "!=" (número, ou texto se o valor for
+#     texto), "contem" (texto, sem diferenciar maiúsculas) ou "verdadeiro"
+#     (coluna booleana, sem valor);
+#   - "parametro" pega o valor das configurações (ex: "margem_limite");
+#   - "percentual_de": coluna → compara coluna / percentual_de × 100.
+# Ex: frete acima de 20% da venda:
+#   {"status": "🚚 Frete Alto", "condicoes": [
+#       {"coluna": "Tarifa_Envio", "percentual_de": "Valor_Venda", "operador": ">", "valor": 20}]}
+
+OPERADORES = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+OPERADORES_TEXTO = ["contem", "verdadeiro"]
+
+
+def validar_regras(regras):
+    """Confere a estrutura da tabela; levanta ValueError com a regra problemática."""
+    for i, regra in enumerate(regras, start=1):
+        if not isinstance(regra, dict) or not regra.get("status") or not isinstance(regra.get("condicoes"), list):
+            raise ValueError(f"Regra {i}: precisa de \"status\" e de uma lista \"condicoes\".")
+        for condicao in regra["condicoes"]:
+            op = condicao.get("operador")
+            if op not in OPERADORES and op not in OPERADORES_TEXTO:
+                raise ValueError(f"Regra {i} ({regra['status']}): operador desconhecido {op!r}.")
+            if not condicao.get("coluna"):
+                raise ValueError(f"Regra {i} ({regra['status']}): condição sem \"coluna\".")
+            if op != "verdadeiro" and "valor" not in condicao and "parametro" not in condicao:
+                raise ValueError(f"Regra {i} ({regra['status']}): condição sem \"valor\" nem \"parametro\".")
+    return regras
+
+
+def carregar_regras(caminho, padrao):
+    """Tabela de regras de um JSON (lista de regras); sem o arquivo, devolve `padrao`."""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return padrao
+    with open(caminho, encoding="utf-8") as f:
+        return validar_regras(json.load(f))
+
+
+def mascara_contem(serie, texto):
+    """Linhas cujo texto contém `texto` (sem diferenciar maiúsculas), como array booleano."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Testa só as categorias; código -1 (vazio) cai no False do fim
+        casa = serie.cat.categories.astype(str).str.contains(str(texto), case=False, regex=False)
+        return np.append(np.asarray(casa, dtype=bool), False)[serie.cat.codes.to_numpy()]
+    return serie.astype(str).str.contains(str(texto), case=False, na=False, regex=False).to_numpy(dtype=bool)
+
+
+def mascara_condicao(df, condicao, parametros):
+    """Máscara booleana (numpy) de uma condição. Coluna ausente → nenhuma linha."""
+    coluna, op = condicao["coluna"], condicao["operador"]
+    if coluna not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    serie = df[coluna]
+
+    if op == "verdadeiro":
+        return serie.eq(True).to_numpy(dtype=bool)
+    valor = parametros[condicao["parametro"]] if "parametro" in condicao else condicao["valor"]
+    if op == "contem":
+        return mascara_contem(serie, valor)
+
+    if isinstance(valor, str) and op in ("==", "!="):
+        return OPERADORES[op](serie.astype(str).to_numpy(), valor).astype(bool)
+
+    valores = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float)
+    base = condicao.get("percentual_de")
+    if base:
+        if base in df.columns:
+            divisor = pd.to_numeric(df[base], errors="coerce").to_numpy(dtype=float)
+        else:
+            divisor = np.full(len(df), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            valores = np.where(divisor != 0, valores / divisor * 100, np.nan)
+    # NaN nunca casa (comparações com NaN são falsas)
+    return OPERADORES[op](valores, float(valor))
+
+
+def categorias_regras(regras, padrao):
+    """Rótulos possíveis do Status, na ordem: padrão e depois o das regras."""
+    return list(dict.fromkeys([padrao] + [r["status"] for r in regras]))
+
+
+def colunas_regras(regras):
+    """Colunas lidas pelas regras (inclusive as de "percentual_de")."""
+    colunas = set()
+    for regra in regras:
+        for condicao in regra["condicoes"]:
+            colunas.add(condicao["coluna"])
+            if condicao.get("percentual_de"):
+                colunas.add(condicao["percentual_de"])
+    return colunas
+
+
+def avaliar_regras(df, regras, parametros=None, padrao=""):
+    """Status de cada linha pela primeira regra que casar (Categorical alinhado ao df)."""
+    parametros = parametros or {}
+    mascaras = []
+    for regra in regras:
+        mascara = np.ones(len(df), dtype=bool)
+        for condicao in regra["condicoes"]:
+            mascara &= mascara_condicao(df, condicao, parametros)
+        mascaras.append(mascara)
+
+    categorias = categorias_regras(regras, padrao)
+    if not regras:
+        return pd.Categorical.from_codes(np.zeros(len(df), dtype=int), categories=categorias)
+    codigos = np.select(mascaras, [categorias.index(r["status"]) for r in regras], default=0)
+    return pd.Categorical.from_codes(codigos, categories=categorias)
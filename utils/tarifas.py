@@ -0,0 +1,130 @@
+# utils/tarifas.py
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.numeros import arredondar
+
+# Tabela de tarifas do ML (faixas da tarifa fixa e percentual por tipo de anúncio).
+# Quando o ML mudar as tarifas, basta editar o JSON — sem alterar código.
+ARQUIVO_TARIFAS = Path(__file__).with_name("tarifas_ml.json")
+
+
+def carregar_tabela_tarifas(caminho=ARQUIVO_TARIFAS):
+    """Lê a tabela de tarifas (faixas de tarifa fixa e percentuais por tipo)."""
+    with open(caminho, encoding="utf-8") as f:
+        tabela = json.load(f)
+    # Faixas sempre em ordem crescente de limite (necessário para a busca binária)
+    tabela["faixas_tarifa_fixa"] = sorted(tabela["faixas_tarifa_fixa"], key=lambda f: f["limite"])
+    return tabela
+
+
+TABELA_TARIFAS = carregar_tabela_tarifas()
+
+
+def calcular_tarifa_fixa_vetor(precos, tabela=None):
+    """
+    Tarifa Fixa unitária (R$) para um array de preços.
+
+    Cada preço cai na primeira faixa com preço < limite (busca binária);
+    acima da última faixa vale `tarifa_fixa_acima`. Faixas com
+    `percentual_preco` cobram um percentual do preço (arredondado como round()).
+    """
+    tabela = tabela or TABELA_TARIFAS
+    faixas = tabela["faixas_tarifa_fixa"]
+    limites = np.array([f["limite"] for f in faixas], dtype=float)
+    valores = np.array([f.get("valor", 0.0) for f in faixas] + [tabela["tarifa_fixa_acima"]], dtype=float)
+    percentuais = np.array([f.get("percentual_preco", 0.0) for f in faixas] + [0.0], dtype=float)
+
+    precos = np.asarray(precos, dtype=float)
+    faixa = np.searchsorted(limites, precos, side="right")
+
+    tarifa = valores[faixa]
+    pct = percentuais[faixa]
+    usa_pct = pct != 0
+    if usa_pct.any():
+        tarifa[usa_pct] = arredondar(precos[usa_pct] * pct[usa_pct])
+    return tarifa
+
+
+def calcular_percentual_vetor(tipos_anuncio, tabela=None):
+    """
+    Percentual de tarifa para uma coluna de tipos de anúncio.
+
+    Os textos são convertidos em categorias: a regra roda uma vez por
+    categoria e o resultado é distribuído pelos códigos.
+    """
+    tabela = tabela or TABELA_TARIFAS
+    categorias = pd.Categorical(pd.Series(tipos_anuncio, copy=False).astype(str))
+    por_categoria = np.array(
+        [calcular_percentual(c, tabela) for c in categorias.categories], dtype=float
+    )
+    return por_categoria[categorias.codes]
+
+
+def calcular_tarifas(precos, tipos_anuncio, unidades, valores_item, tabela=None):
+    """
+    Calcula todas as tarifas de uma vez (arrays alinhados por linha).
+
+    Retorna dict com percentual, tarifa_fixa (unitária), tarifa_percentual,
+    tarifa_fixa_total e tarifa_total — mesmos arredondamentos do cálculo por linha.
+    """
+    perc = calcular_percentual_vetor(tipos_anuncio, tabela)
+    tarifa_fixa = calcular_tarifa_fixa_vetor(precos, tabela)
+    unidades = np.asarray(unidades)
+
+    tarifa_percentual = np.round(np.asarray(valores_item, dtype=float) * perc, 2)
+    tarifa_fixa_total = np.round(tarifa_fixa * unidades, 2)
+    return {
+        "percentual": perc,
+        "tarifa_fixa": tarifa_fixa,
+        "tarifa_percentual": tarifa_percentual,
+        "tarifa_fixa_total": tarifa_fixa_total,
+        "tarifa_total": np.round(tarifa_percentual + tarifa_fixa_total, 2),
+    }
+
+
+def aplicar_tarifas_unitarias(df, indices, coluna_unidades, tabela=None):
+    """
+    Preenche Tarifa_Percentual_%, Tarifa_Fixa_R$, Tarifa_Venda_Calculada e
+    Tarifa_Total_R$ das vendas simples (não agrupadas) em poucas operações.
+    """
+    linhas = df.loc[indices]
+    if linhas.empty:
+        return df
+
+    if "Preco_Unitario" in linhas.columns:
+        precos = pd.to_numeric(linhas["Preco_Unitario"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    else:
+        precos = np.zeros(len(linhas))
+    if coluna_unidades in linhas.columns:
+        unidades = linhas[coluna_unidades].to_numpy()
+    else:
+        unidades = np.ones(len(linhas), dtype=np.int64)
+    tipos = linhas["Tipo_Anuncio"] if "Tipo_Anuncio" in linhas.columns else pd.Series("", index=linhas.index)
+
+    tarifas = calcular_tarifas(precos, tipos, unidades, linhas["Valor_Venda"].to_numpy(dtype=float), tabela)
+
+    df.loc[indices, "Tarifa_Percentual_%"] = tarifas["percentual"] * 100
+    df.loc[indices, "Tarifa_Fixa_R$"] = tarifas["tarifa_fixa"]
+    df.loc[indices, "Tarifa_Venda_Calculada"] = tarifas["tarifa_percentual"]
+    df.loc[indices, "Tarifa_Total_R$"] = tarifas["tarifa_total"]
+    return df
+
+
+# A Tarifa Fixa original está complexa, mas mantida para replicar a regra do usuário
+def calcular_tarifa_fixa_unit(preco_unit, tabela=None):
+    """Calcula a Tarifa Fixa unitária (R$) com base na lógica fornecida no script original."""
+    return float(calcular_tarifa_fixa_vetor([preco_unit], tabela)[0])
+
+
+def calcular_percentual(tipo_anuncio, tabela=None):
+    """Calcula o percentual de tarifa com base no tipo de anúncio."""
+    tabela = tabela or TABELA_TARIFAS
+    tipo = str(tipo_anuncio).strip().lower()
+    for regra in tabela["percentuais_tipo_anuncio"]:
+        if regra["contem"] in tipo:
+            return regra["percentual"]
+    return tabela["percentual_padrao"] # Padrão para casos não identificados